@@ -0,0 +1,131 @@
+"""Benchmark for the latency of POST /conversations/ with and without a warm pool.
+
+Starts N conversations with the same profile (llm and tools) through the API,
+one after another with a pause between them (So the pool has a chance to refill,
+as it would between real requests), and reports latency percentiles for each
+pool size.
+
+Usage:
+    uv run python benchmarks/conversation_start_benchmark.py --num-requests 100
+"""
+
+import argparse
+import asyncio
+import json
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI
+
+from openhands_server.sdk_server import conversation_router
+from openhands_server.sdk_server.agent_pool import AgentPool
+from openhands_server.sdk_server.conversation_service import ConversationService
+from openhands_server.sdk_server.mcp_pool import MCPPool
+
+
+def percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+async def time_starts(
+    path: Path, pool_size: int, num_requests: int, interval: float, tools: list
+) -> dict:
+    mcp_pool = MCPPool()
+    service = ConversationService(
+        event_services_path=path / "conversations",
+        workspace_path=path / "workspace",
+        idle_timeout=None,
+        max_active_conversations=None,
+        mcp_pool=mcp_pool,
+        agent_pool=AgentPool(mcp_pool=mcp_pool, size=pool_size) if pool_size else None,
+    )
+    # Route handlers look up the service from the router module when called
+    conversation_router.conversation_service = service
+    api = FastAPI()
+    api.include_router(conversation_router.router)
+    request = {
+        "llm": {"model": "litellm_proxy/anthropic/claude-sonnet-4", "api_key": "x"},
+        "tools": tools,
+    }
+    latencies = []
+    async with service:
+        transport = httpx.ASGITransport(app=api)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://b"
+        ) as client:
+            if pool_size:
+                # The pool learns profiles from requests - warm it up first
+                response = await client.post("/conversations/", json=request)
+                response.raise_for_status()
+                await asyncio.sleep(interval * pool_size)
+            for _ in range(num_requests):
+                start = time.perf_counter()
+                response = await client.post("/conversations/", json=request)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+                await asyncio.sleep(interval)
+    return {
+        "pool_size": pool_size,
+        "num_requests": num_requests,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+    }
+
+
+async def run(
+    num_requests: int, pool_sizes: list[int], interval: float, tools: list
+) -> list[dict]:
+    results = []
+    for pool_size in pool_sizes:
+        path = Path(tempfile.mkdtemp(prefix="conversation_start_benchmark_"))
+        try:
+            tools_for_run = json.loads(
+                json.dumps(tools).replace("{workspace}", str(path / "workspace"))
+            )
+            results.append(
+                await time_starts(
+                    path, pool_size, num_requests, interval, tools_for_run
+                )
+            )
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--num-requests", type=int, default=50)
+    parser.add_argument("--pool-size", type=int, nargs="+", default=[0, 2])
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.5,
+        help="Seconds between requests",
+    )
+    parser.add_argument(
+        "--tools",
+        default=json.dumps(
+            [
+                {"name": "BashTool", "params": {"working_dir": "{workspace}"}},
+                {"name": "FileEditorTool", "params": {}},
+            ]
+        ),
+        help="Json list of tool specs ({workspace} is replaced with a temp dir)",
+    )
+    args = parser.parse_args()
+    results = asyncio.run(
+        run(args.num_requests, args.pool_size, args.interval, json.loads(args.tools))
+    )
+    for result in results:
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
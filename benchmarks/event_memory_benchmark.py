@@ -0,0 +1,145 @@
+"""Benchmark for the memory held to serve reads of the events of a conversation.
+
+Persists N events (With large observations) as the SDK does, then compares the
+memory used by holding every decoded event in a list (As reads were previously
+served from) with a TieredEvents view after the same read workload: paging through
+every event, then reading random events by id. Also reports read latencies for
+the tiered view, where older events come from disk.
+
+Usage:
+    uv run python benchmarks/event_memory_benchmark.py --sizes 1000 10000
+"""
+
+import argparse
+import json
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from openhands.sdk import EventBase, Message, MessageEvent, TextContent
+from openhands.sdk.io import LocalFileStore
+from openhands_server.sdk_server.event_index import EventIndex, page_events
+from openhands_server.sdk_server.tiered_events import EVENTS_DIR, TieredEvents
+
+
+def write_events(file_store: LocalFileStore, num_events: int, event_size: int):
+    for position in range(num_events):
+        event = MessageEvent(
+            source="environment",
+            llm_message=Message(
+                role="tool", content=[TextContent(text="x" * event_size)]
+            ),
+        )
+        name = f"{EVENTS_DIR}/event-{position:05d}-{event.id}.json"
+        file_store.write(name, event.model_dump_json())
+
+
+def measure(fn) -> tuple[object, int]:
+    """Call the function given, returning its result along with the number of
+    bytes it allocated which are still held"""
+    tracemalloc.start()
+    try:
+        result = fn()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current
+
+
+def load_all(file_store: LocalFileStore) -> list[EventBase]:
+    names = sorted(
+        file_store.list(EVENTS_DIR), key=lambda name: int(name.split("-")[1])
+    )
+    return [EventBase.model_validate_json(file_store.read(name)) for name in names]
+
+
+def read_workload(events, index: EventIndex, num_reads: int) -> list[float]:
+    page_id = None
+    while True:
+        page = page_events(events, index, page_id, limit=100)
+        page_id = page.next_page_id
+        if not page_id:
+            break
+    latencies = []
+    for position in random.choices(range(len(events)), k=num_reads):
+        event_id = index.get_id(position)
+        start = time.perf_counter()
+        events[index.get_position(event_id)]
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def run(
+    num_events: int, event_size: int, hot_size: int, cache_size: int, num_reads: int
+) -> dict:
+    path = tempfile.mkdtemp(prefix="event_memory_benchmark_")
+    try:
+        file_store = LocalFileStore(path)
+        write_events(file_store, num_events, event_size)
+
+        def full():
+            events = load_all(file_store)
+            index = EventIndex()
+            index.sync(events)
+            read_workload(events, index, num_reads)
+            return events
+
+        _, full_bytes = measure(full)
+
+        def tiered():
+            events = TieredEvents(
+                lambda: file_store, EventIndex(), hot_size, cache_size
+            )
+            latencies = read_workload(events, events.index, num_reads)
+            return events, latencies
+
+        (events, latencies), tiered_bytes = measure(tiered)
+        start = time.perf_counter()
+        page_events(events, events.index, limit=100)
+        first_page_seconds = time.perf_counter() - start
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+    return {
+        "num_events": num_events,
+        "event_size": event_size,
+        "full_resident_mb": round(full_bytes / 1024 / 1024, 2),
+        "tiered_resident_mb": round(tiered_bytes / 1024 / 1024, 2),
+        "tiered_read_p50_us": round(percentile(latencies, 50) * 1_000_000, 2),
+        "tiered_read_p99_us": round(percentile(latencies, 99) * 1_000_000, 2),
+        "tiered_read_mean_us": round(statistics.mean(latencies) * 1_000_000, 2),
+        "tiered_first_page_ms": round(first_page_seconds * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument(
+        "--event-size", type=int, default=4000, help="Bytes of text per event"
+    )
+    parser.add_argument("--hot-size", type=int, default=256)
+    parser.add_argument("--cache-size", type=int, default=1024)
+    parser.add_argument("--num-reads", type=int, default=2000)
+    args = parser.parse_args()
+    for num_events in args.sizes:
+        result = run(
+            num_events,
+            args.event_size,
+            args.hot_size,
+            args.cache_size,
+            args.num_reads,
+        )
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Benchmark for contention between reads of events and a running agent.
+
+Simulates an agent thread which appends events while holding the conversation
+state lock (As the SDK does for each step, including waiting on the LLM and
+tools), while reader threads poll the latest page of events - either under the
+same lock from the list of events held by the conversation (As reads were
+previously served), or from a TieredEvents view, which takes no lock shared with
+the agent. Reports the throughput of the agent and read latencies for each number
+of readers.
+
+Usage:
+    uv run python benchmarks/event_read_contention_benchmark.py --readers 0 4 16
+"""
+
+import argparse
+import asyncio
+import json
+import shutil
+import tempfile
+import threading
+import time
+
+from openhands.sdk import Message, MessageEvent, TextContent
+from openhands.sdk.io import LocalFileStore
+from openhands_server.sdk_server.event_index import EventIndex, page_events
+from openhands_server.sdk_server.models import EventSortOrder
+from openhands_server.sdk_server.tiered_events import EVENTS_DIR, TieredEvents
+
+
+def percentile(values: list[float], percent: float) -> float:
+    if not values:
+        return 0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def create_event(event_size: int) -> MessageEvent:
+    return MessageEvent(
+        source="environment",
+        llm_message=Message(role="tool", content=[TextContent(text="x" * event_size)]),
+    )
+
+
+async def run(
+    mode: str,
+    num_readers: int,
+    duration: float,
+    event_size: int,
+    step_work: float,
+    poll_interval: float,
+) -> dict:
+    path = tempfile.mkdtemp(prefix="event_read_contention_benchmark_")
+    loop = asyncio.get_running_loop()
+    state_lock = threading.RLock()
+    state_events: list = []
+    file_store = LocalFileStore(path)
+    index = EventIndex()
+    tiered = TieredEvents(lambda: file_store, index)
+    tiered.load()
+    stop = threading.Event()
+    steps = 0
+    latencies: list[float] = []
+
+    def agent():
+        nonlocal steps
+        while not stop.is_set():
+            with state_lock:
+                event = create_event(event_size)
+                name = f"{EVENTS_DIR}/event-{len(state_events):05d}-{event.id}.json"
+                file_store.write(name, event.model_dump_json())
+                state_events.append(event)
+                # Waiting on the LLM / tools while holding the lock
+                time.sleep(step_work)
+            # Callbacks are run on the event loop, as with AsyncCallbackWrapper
+            asyncio.run_coroutine_threadsafe(tiered(event), loop)
+            steps += 1
+
+    def reader():
+        read_index = EventIndex()
+        while not stop.is_set():
+            start = time.perf_counter()
+            if mode == "locked":
+                with state_lock:
+                    page_events(
+                        state_events,
+                        read_index,
+                        limit=100,
+                        sort_order=EventSortOrder.TIMESTAMP_DESC,
+                    )
+            else:
+                page_events(
+                    tiered, index, limit=100, sort_order=EventSortOrder.TIMESTAMP_DESC
+                )
+            latencies.append(time.perf_counter() - start)
+            time.sleep(poll_interval)
+
+    threads = [threading.Thread(target=agent)]
+    threads += [threading.Thread(target=reader) for _ in range(num_readers)]
+    try:
+        for thread in threads:
+            thread.start()
+        await asyncio.sleep(duration)
+        stop.set()
+        for thread in threads:
+            await asyncio.to_thread(thread.join)
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+    return {
+        "mode": mode,
+        "num_readers": num_readers,
+        "agent_steps_per_sec": round(steps / duration, 1),
+        "reads_per_sec": round(len(latencies) / duration, 1),
+        "read_p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "read_p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--readers", type=int, nargs="+", default=[0, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=5, help="Seconds per run")
+    parser.add_argument("--event-size", type=int, default=1000)
+    parser.add_argument(
+        "--step-work",
+        type=float,
+        default=0.005,
+        help="Seconds the agent holds the state lock for in each step",
+    )
+    parser.add_argument(
+        "--poll-interval", type=float, default=0.01, help="Seconds between reads"
+    )
+    args = parser.parse_args()
+    for num_readers in args.readers:
+        for mode in ("locked", "snapshot"):
+            result = asyncio.run(
+                run(
+                    mode,
+                    num_readers,
+                    args.duration,
+                    args.event_size,
+                    args.step_work,
+                    args.poll_interval,
+                )
+            )
+            print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
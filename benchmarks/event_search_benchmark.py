@@ -0,0 +1,93 @@
+"""Benchmark for paging through the events of a conversation.
+
+Measures the latency of fetching a page of events at the start, middle and end
+of conversations of increasing length, following next_page_id cursors as a client
+would - both unfiltered, and filtered to a sparse kind of event (One in every
+--sparse-every events). Page latency should be flat with respect to conversation
+length, and to how sparse the kind is.
+
+Usage:
+    uv run python benchmarks/event_search_benchmark.py --sizes 1000 10000 50000
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from openhands.sdk import Message, MessageEvent, TextContent
+from openhands_server.sdk_server.event_index import (
+    EventIndex,
+    encode_page_id,
+    page_events,
+)
+from openhands_server.sdk_server.models import EventSortOrder
+
+
+class SparseEvent(MessageEvent):
+    """A kind of event which only a few of the events in a conversation are"""
+
+
+def create_events(num_events: int, sparse_every: int) -> list[MessageEvent]:
+    return [
+        (SparseEvent if i % sparse_every == 0 else MessageEvent)(
+            source="user",
+            llm_message=Message(
+                role="user", content=[TextContent(text=f"Message {i}")]
+            ),
+        )
+        for i in range(num_events)
+    ]
+
+
+def time_page(
+    events,
+    index: EventIndex,
+    page_id: str | None,
+    sort_order: EventSortOrder,
+    limit: int,
+    kinds: set[str] | None,
+) -> float:
+    start = time.perf_counter()
+    page_events(events, index, page_id, limit, sort_order, kinds=kinds)
+    return time.perf_counter() - start
+
+
+def run(num_events: int, limit: int, repeats: int, sparse_every: int) -> dict:
+    events = create_events(num_events, sparse_every)
+    index = EventIndex()
+    index.sync(events)
+    result: dict = {"num_events": num_events, "limit": limit}
+    for label, position in (
+        ("first", 0),
+        ("middle", num_events // 2),
+        ("last", max(num_events - limit, 0)),
+    ):
+        page_id = encode_page_id(position, events[position].id) if position else None
+        for kinds in (None, {SparseEvent.__name__}):
+            for sort_order in EventSortOrder:
+                timings = [
+                    time_page(events, index, page_id, sort_order, limit, kinds)
+                    for _ in range(repeats)
+                ]
+                key = f"{label}_{sort_order.value.lower()}"
+                if kinds:
+                    key += "_sparse_kind"
+                result[f"{key}_ms"] = round(statistics.median(timings) * 1000, 4)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--sparse-every", type=int, default=100)
+    args = parser.parse_args()
+    for num_events in args.sizes:
+        result = run(num_events, args.limit, args.repeats, args.sparse_every)
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
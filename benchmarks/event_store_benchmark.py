@@ -0,0 +1,118 @@
+"""Benchmark for loading and reading events with each event store.
+
+Writes N events (As the SDK names them) with a LocalFileStore (A file per event)
+and a SegmentedFileStore, then measures for each: the time to open the store and
+list the events (As a conversation does when loaded), the time to read every
+event, and the latency of reading random events. Files are in the page cache, so
+this measures the overhead of the layout rather than of the disk.
+
+Usage:
+    uv run python benchmarks/event_store_benchmark.py --sizes 1000 10000 100000
+"""
+
+import argparse
+import json
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+from collections.abc import Callable
+from pathlib import Path
+
+from openhands.sdk.io import FileStore, LocalFileStore
+from openhands_server.sdk_server.segmented_file_store import SegmentedFileStore
+
+
+STORES: dict[str, Callable[[str], FileStore]] = {
+    "file": LocalFileStore,
+    "segmented": SegmentedFileStore,
+}
+
+
+def create_event(index: int, event_size: int) -> tuple[str, str]:
+    event_id = str(uuid.uuid4())
+    event = {
+        "id": event_id,
+        "kind": "MessageEvent",
+        "source": "user",
+        "llm_message": {
+            "role": "user",
+            "content": [{"type": "text", "text": "x" * event_size}],
+        },
+    }
+    return f"events/event-{index:05d}-{event_id}.json", json.dumps(event)
+
+
+def percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def close(file_store: FileStore):
+    if isinstance(file_store, SegmentedFileStore):
+        file_store.close()
+
+
+def run(store: str, num_events: int, event_size: int, num_reads: int) -> dict:
+    path = tempfile.mkdtemp(prefix="event_store_benchmark_")
+    try:
+        events = [create_event(i, event_size) for i in range(num_events)]
+        file_store = STORES[store](path)
+        start = time.perf_counter()
+        for name, contents in events:
+            file_store.write(name, contents)
+        write_seconds = time.perf_counter() - start
+        close(file_store)
+
+        start = time.perf_counter()
+        file_store = STORES[store](path)
+        names = sorted(file_store.list("events"))
+        load_seconds = time.perf_counter() - start
+        assert len(names) == num_events
+
+        start = time.perf_counter()
+        for name in names:
+            file_store.read(name)
+        read_all_seconds = time.perf_counter() - start
+
+        latencies = []
+        for name in random.choices(names, k=num_reads):
+            start = time.perf_counter()
+            file_store.read(name)
+            latencies.append(time.perf_counter() - start)
+        close(file_store)
+        disk_bytes = sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+    return {
+        "store": store,
+        "num_events": num_events,
+        "write_ms": round(write_seconds * 1000, 2),
+        "load_ms": round(load_seconds * 1000, 2),
+        "read_all_ms": round(read_all_seconds * 1000, 2),
+        "random_read_p50_us": round(percentile(latencies, 50) * 1_000_000, 2),
+        "random_read_p99_us": round(percentile(latencies, 99) * 1_000_000, 2),
+        "random_read_mean_us": round(statistics.mean(latencies) * 1_000_000, 2),
+        "disk_bytes": disk_bytes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--stores", nargs="+", default=list(STORES), choices=STORES)
+    parser.add_argument(
+        "--event-size", type=int, default=1000, help="Bytes of text per event"
+    )
+    parser.add_argument("--num-reads", type=int, default=2000)
+    args = parser.parse_args()
+    for num_events in args.sizes:
+        for store in args.stores:
+            print(json.dumps(run(store, num_events, args.event_size, args.num_reads)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Deterministic stand-in for an OpenAI compatible LLM, for load tests.
+
+Serves POST /v1/chat/completions (Streaming and non streaming) and GET /v1/models.
+Every completion is a plain assistant message (No tool calls, so the agent
+finishes after one step) of --response-tokens tokens, delivered after
+--time-to-first-token seconds plus --token-latency seconds per token. The content
+is derived from the number of messages in the request, so runs are repeatable.
+
+Conversations use it with an llm of:
+    {"model": "openai/fake", "base_url": "http://127.0.0.1:<port>/v1",
+     "api_key": "fake"}
+
+Usage:
+    uv run python benchmarks/fake_llm.py --port 9000 --token-latency 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+WORDS = ("alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel")
+
+
+def create_app(
+    time_to_first_token: float, token_latency: float, response_tokens: int
+) -> FastAPI:
+    app = FastAPI()
+    stats = {"requests": 0, "tokens": 0}
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "fake", "object": "model"}]}
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        seed = len(body.get("messages", []))
+        tokens = [
+            WORDS[(seed + index) % len(WORDS)] for index in range(response_tokens)
+        ]
+        stats["requests"] += 1
+        stats["tokens"] += response_tokens
+        completion_id = f"chatcmpl-{seed}-{stats['requests']}"
+        model = body.get("model", "fake")
+        usage = {
+            "prompt_tokens": sum(
+                len(str(message.get("content", "")).split())
+                for message in body.get("messages", [])
+            ),
+            "completion_tokens": response_tokens,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + response_tokens
+        if body.get("stream"):
+            return StreamingResponse(
+                stream_chunks(completion_id, model, tokens, usage),
+                media_type="text/event-stream",
+            )
+        await asyncio.sleep(time_to_first_token + token_latency * len(tokens))
+        return JSONResponse(
+            {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": " ".join(tokens)},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage,
+            }
+        )
+
+    async def stream_chunks(
+        completion_id: str, model: str, tokens: list[str], usage: dict
+    ) -> AsyncIterator[str]:
+        await asyncio.sleep(time_to_first_token)
+        for index, token in enumerate(tokens):
+            delta: dict = {"content": token if index == 0 else f" {token}"}
+            if index == 0:
+                delta["role"] = "assistant"
+            yield chunk(completion_id, model, delta, None)
+            await asyncio.sleep(token_latency)
+        yield chunk(completion_id, model, {}, "stop", usage)
+        yield "data: [DONE]\n\n"
+
+    return app
+
+
+def chunk(
+    completion_id: str,
+    model: str,
+    delta: dict,
+    finish_reason: str | None,
+    usage: dict | None = None,
+) -> str:
+    data = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    if usage:
+        data["usage"] = usage
+    return f"data: {json.dumps(data)}\n\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--time-to-first-token", type=float, default=0.2)
+    parser.add_argument(
+        "--token-latency", type=float, default=0.01, help="Seconds per token"
+    )
+    parser.add_argument("--response-tokens", type=int, default=50)
+    args = parser.parse_args()
+    app = create_app(args.time_to_first_token, args.token_latency, args.response_tokens)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,608 @@
+"""Load test for the server, against a local fake LLM.
+
+Starts the fake LLM (benchmarks/fake_llm.py) and the server (uvicorn serving
+openhands_server.sdk_server.api:api, with its data in a temporary directory) as
+subprocesses, then drives workloads against the server over HTTP / WebSockets:
+
+- conversations: start --conversations conversations at once, each with an
+  initial message which is run, and wait for every run to finish
+- message_burst: send --messages messages to every conversation at once
+- websocket_viewers: attach --viewers WebSocket clients to every conversation,
+  and measure the time from sending a message until each viewer receives it
+- pagination: page through a conversation of --events events in both orders
+- cold_start: restart the server (With --stored-conversations more stored
+  conversations than were created by the workloads), and measure the time until
+  it accepts requests and until every conversation is loaded
+
+Prints one JSON object per workload with the throughput and p50 / p95 / p99
+latencies (ms), the max lag of the server's event loop during the workload (From
+/metrics), and the commit tested - so results may be compared across commits.
+
+Usage:
+    uv run python benchmarks/load_benchmark.py --conversations 50 --viewers 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from uuid import uuid4
+
+import httpx
+from websockets.asyncio.client import connect
+
+from openhands.sdk import LLM
+from openhands_server.sdk_server.config import CONFIG_ENV_VAR
+from openhands_server.sdk_server.models import StoredConversation
+
+
+WORKLOADS = (
+    "conversations",
+    "message_burst",
+    "websocket_viewers",
+    "pagination",
+    "cold_start",
+)
+_LOOP_LAG_MAX = re.compile(r"^openhands_event_loop_lag_max_seconds (\S+)$", re.M)
+_MARKER = re.compile(r"marker-\d+-[0-9a-f]+")
+
+
+def percentile(values: list[float], percent: float) -> float:
+    if not values:
+        return 0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def get_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def summarize(workload: str, latencies: list[float], duration: float, **extra) -> dict:
+    return {
+        "workload": workload,
+        "count": len(latencies),
+        "duration_s": round(duration, 3),
+        "throughput_per_s": round(len(latencies) / duration, 2) if duration else 0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies, default=0) * 1000, 2),
+        **extra,
+    }
+
+
+def text_message(text: str, run: bool) -> dict:
+    return {"role": "user", "content": [{"type": "text", "text": text}], "run": run}
+
+
+@dataclass
+class Servers:
+    """The fake LLM and the server under test, each in its own process"""
+
+    path: Path
+    server_config: dict
+    llm_args: list[str]
+    llm_port: int = field(default_factory=get_free_port)
+    server_port: int = field(default_factory=get_free_port)
+    _llm: asyncio.subprocess.Process | None = None
+    _server: asyncio.subprocess.Process | None = None
+
+    @property
+    def llm(self) -> dict:
+        return {
+            "model": "openai/fake",
+            "base_url": f"http://127.0.0.1:{self.llm_port}/v1",
+            "api_key": "fake",
+        }
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    async def start_llm(self):
+        self._llm = await asyncio.create_subprocess_exec(
+            sys.executable,
+            str(Path(__file__).parent / "fake_llm.py"),
+            "--port",
+            str(self.llm_port),
+            *self.llm_args,
+        )
+        await wait_for(f"http://127.0.0.1:{self.llm_port}/v1/models")
+
+    async def start_server(self) -> tuple[float, float]:
+        """Start the server, returning the seconds until it accepted requests and
+        until every conversation was loaded"""
+        config = {
+            "conversations_path": str(self.path / "conversations"),
+            "workspace_path": str(self.path / "workspace"),
+            **self.server_config,
+        }
+        start = time.perf_counter()
+        self._server = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "openhands_server.sdk_server.api:api",
+            "--port",
+            str(self.server_port),
+            "--log-level",
+            "warning",
+            env={**os.environ, CONFIG_ENV_VAR: json.dumps(config)},
+        )
+        await wait_for(f"{self.base_url}/ready")
+        accepting = time.perf_counter() - start
+        await wait_for(
+            f"{self.base_url}/startup_progress",
+            until=lambda response: response.json()["complete"],
+        )
+        return accepting, time.perf_counter() - start
+
+    async def stop_server(self):
+        await _stop(self._server)
+        self._server = None
+
+    async def close(self):
+        await self.stop_server()
+        await _stop(self._llm)
+        self._llm = None
+
+
+async def _stop(process: asyncio.subprocess.Process | None):
+    if process and process.returncode is None:
+        process.terminate()
+        await process.wait()
+
+
+async def wait_for(
+    url: str,
+    timeout: float = 120,
+    until: Callable[[httpx.Response], bool] | None = None,
+):
+    """Wait until a GET of the url given succeeds (And the response satisfies the
+    condition given, if any)"""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                response = await client.get(url)
+                if response.status_code == 200 and (until is None or until(response)):
+                    return
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutError(url)
+            await asyncio.sleep(0.02)
+
+
+async def wait_until_idle(client: httpx.AsyncClient, conversation_id: str):
+    """Wait until the conversation has no runs queued or running, and nothing in
+    its mailbox (Twice in a row, so a follow up run is not missed)"""
+    idle_count = 0
+    while idle_count < 2:
+        await asyncio.sleep(0.05)
+        response = await client.get(f"/conversations/{conversation_id}/run_queue")
+        response.raise_for_status()
+        info = response.json()
+        if info["state"] == "IDLE" and not info.get("mailbox_depth"):
+            idle_count += 1
+        else:
+            idle_count = 0
+
+
+async def get_status(client: httpx.AsyncClient, conversation_id: str) -> str:
+    response = await client.get(f"/conversations/{conversation_id}")
+    response.raise_for_status()
+    return response.json()["status"]
+
+
+async def get_loop_lag_max(client: httpx.AsyncClient) -> float | None:
+    response = await client.get("/metrics")
+    match = _LOOP_LAG_MAX.search(response.text)
+    return round(float(match.group(1)) * 1000, 2) if match else None
+
+
+async def create_conversations(
+    client: httpx.AsyncClient, llm: dict, count: int
+) -> list[str]:
+    responses = await asyncio.gather(
+        *[client.post("/conversations/", json={"llm": llm}) for _ in range(count)]
+    )
+    for response in responses:
+        response.raise_for_status()
+    return [response.json()["id"] for response in responses]
+
+
+async def run_conversations(
+    client: httpx.AsyncClient, llm: dict, count: int
+) -> tuple[dict, list[str]]:
+    """Start conversations which each run an initial message, measuring the time
+    from the request until the run is done"""
+    start_latencies: list[float] = []
+    run_latencies: list[float] = []
+
+    async def start_and_run() -> str:
+        start = time.perf_counter()
+        response = await client.post(
+            "/conversations/",
+            json={"llm": llm, "initial_message": text_message("hello", True)},
+        )
+        response.raise_for_status()
+        start_latencies.append(time.perf_counter() - start)
+        conversation_id = response.json()["id"]
+        await wait_until_idle(client, conversation_id)
+        run_latencies.append(time.perf_counter() - start)
+        return conversation_id
+
+    start = time.perf_counter()
+    conversation_ids = await asyncio.gather(*[start_and_run() for _ in range(count)])
+    duration = time.perf_counter() - start
+    statuses = await asyncio.gather(
+        *[get_status(client, conversation_id) for conversation_id in conversation_ids]
+    )
+    result = summarize(
+        "conversations",
+        run_latencies,
+        duration,
+        start_p50_ms=round(percentile(start_latencies, 50) * 1000, 2),
+        start_p99_ms=round(percentile(start_latencies, 99) * 1000, 2),
+        errors=sum(1 for status in statuses if status == "error"),
+    )
+    return result, list(conversation_ids)
+
+
+async def run_message_burst(
+    client: httpx.AsyncClient, conversation_ids: list[str], num_messages: int
+) -> dict:
+    """Send a burst of messages to every conversation at once (Each requesting a
+    run, which the server coalesces), measuring the latency of each send and the
+    time until every conversation is idle again"""
+    latencies: list[float] = []
+
+    async def send(conversation_id: str, index: int):
+        start = time.perf_counter()
+        response = await client.post(
+            f"/conversations/{conversation_id}/events/",
+            json=text_message(f"burst {index}", True),
+        )
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[
+            send(conversation_id, index)
+            for index in range(num_messages)
+            for conversation_id in conversation_ids
+        ]
+    )
+    duration = time.perf_counter() - start
+    await asyncio.gather(
+        *[
+            wait_until_idle(client, conversation_id)
+            for conversation_id in conversation_ids
+        ]
+    )
+    return summarize(
+        "message_burst",
+        latencies,
+        duration,
+        conversations=len(conversation_ids),
+        settle_s=round(time.perf_counter() - start, 3),
+    )
+
+
+async def run_websocket_viewers(
+    client: httpx.AsyncClient,
+    ws_url: str,
+    conversation_ids: list[str],
+    num_viewers: int,
+    num_rounds: int,
+) -> dict:
+    """Attach viewers to every conversation, then send messages (Without running
+    the agent) and measure the time until each viewer receives each message"""
+    sent_at: dict[str, float] = {}
+    latencies: list[float] = []
+    expected = len(conversation_ids) * num_viewers
+    received: dict[str, int] = {}
+    all_received = asyncio.Event()
+
+    async def view(conversation_id: str, connected: asyncio.Event):
+        url = f"{ws_url}/conversations/{conversation_id}/events/socket"
+        async with connect(url, max_size=None) as websocket:
+            connected.set()
+            async for frame in websocket:
+                now = time.perf_counter()
+                text = frame if isinstance(frame, str) else frame.decode()
+                for marker in _MARKER.findall(text):
+                    if marker in sent_at:
+                        latencies.append(now - sent_at[marker])
+                        received[marker] = received.get(marker, 0) + 1
+                        if received[marker] == expected:
+                            all_received.set()
+
+    tasks = []
+    for conversation_id in conversation_ids:
+        for _ in range(num_viewers):
+            connected = asyncio.Event()
+            tasks.append(asyncio.create_task(view(conversation_id, connected)))
+            await connected.wait()
+    missed = 0
+    start = time.perf_counter()
+    try:
+        for round_index in range(num_rounds):
+            all_received.clear()
+            markers = {
+                conversation_id: f"marker-{round_index}-{uuid4().hex}"
+                for conversation_id in conversation_ids
+            }
+            expected_total = len(markers) * num_viewers
+
+            async def send(conversation_id: str, marker: str):
+                sent_at[marker] = time.perf_counter()
+                response = await client.post(
+                    f"/conversations/{conversation_id}/events/",
+                    json=text_message(marker, False),
+                )
+                response.raise_for_status()
+
+            await asyncio.gather(
+                *[
+                    send(conversation_id, marker)
+                    for conversation_id, marker in markers.items()
+                ]
+            )
+            deadline = time.monotonic() + 10
+            while (
+                sum(received.get(marker, 0) for marker in markers.values())
+                < expected_total
+                and time.monotonic() < deadline
+            ):
+                await asyncio.sleep(0.01)
+            missed += expected_total - sum(
+                received.get(marker, 0) for marker in markers.values()
+            )
+        duration = time.perf_counter() - start
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return summarize(
+        "websocket_viewers",
+        latencies,
+        duration,
+        conversations=len(conversation_ids),
+        viewers=len(tasks),
+        missed=missed,
+    )
+
+
+async def run_pagination(client: httpx.AsyncClient, llm: dict, num_events: int) -> dict:
+    """Fill a conversation with events, then page through all of them in both
+    orders, measuring the latency of each page"""
+    (conversation_id,) = await create_conversations(client, llm, 1)
+    semaphore = asyncio.Semaphore(16)
+
+    async def send(index: int):
+        async with semaphore:
+            response = await client.post(
+                f"/conversations/{conversation_id}/events/",
+                json=text_message(f"event {index}", False),
+            )
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[send(index) for index in range(num_events)])
+    fill_duration = time.perf_counter() - start
+
+    latencies: list[float] = []
+    num_read = 0
+    start = time.perf_counter()
+    for sort_order in ("TIMESTAMP", "TIMESTAMP_DESC"):
+        page_id = None
+        while True:
+            params = {"limit": 100, "sort_order": sort_order}
+            if page_id:
+                params["page_id"] = page_id
+            page_start = time.perf_counter()
+            response = await client.get(
+                f"/conversations/{conversation_id}/events/search", params=params
+            )
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - page_start)
+            page = response.json()
+            num_read += len(page["items"])
+            page_id = page.get("next_page_id")
+            if not page_id:
+                break
+    duration = time.perf_counter() - start
+    return summarize(
+        "pagination",
+        latencies,
+        duration,
+        events=num_events,
+        events_read=num_read,
+        fill_events_per_s=round(num_events / fill_duration, 2),
+    )
+
+
+def seed_conversations(path: Path, llm: dict, count: int):
+    """Write stored conversations directly, as a server with a file metadata
+    store would have left them"""
+    for _ in range(count):
+        stored = StoredConversation(id=uuid4(), llm=LLM(**llm))
+        conversation_dir = path / stored.id.hex
+        conversation_dir.mkdir(parents=True)
+        (conversation_dir / "meta.json").write_text(stored.model_dump_json())
+
+
+async def run_cold_start(servers: Servers, num_runs: int) -> dict:
+    """Restart the server, measuring the time until it accepts requests and until
+    every stored conversation is loaded"""
+    loaded_times: list[float] = []
+    accept_times: list[float] = []
+    start = time.perf_counter()
+    for _ in range(num_runs):
+        await servers.stop_server()
+        accepting, loaded = await servers.start_server()
+        accept_times.append(accepting)
+        loaded_times.append(loaded)
+    duration = time.perf_counter() - start
+    async with httpx.AsyncClient(base_url=servers.base_url) as client:
+        response = await client.get("/conversations/count")
+        stored = response.json()
+    return summarize(
+        "cold_start",
+        loaded_times,
+        duration,
+        stored_conversations=stored,
+        accept_p50_ms=round(percentile(accept_times, 50) * 1000, 2),
+    )
+
+
+async def run(args) -> list[dict]:
+    path = Path(tempfile.mkdtemp(prefix="load_benchmark_"))
+    llm_args = [
+        "--time-to-first-token",
+        str(args.time_to_first_token),
+        "--token-latency",
+        str(args.token_latency),
+        "--response-tokens",
+        str(args.response_tokens),
+    ]
+    servers = Servers(path, json.loads(args.server_config), llm_args)
+    commit = get_commit()
+    results = []
+    try:
+        await servers.start_llm()
+        if "cold_start" in args.workloads and args.stored_conversations:
+            # Only file metadata stores pick these up, so they are written before
+            # the first start (Which is when sqlite stores import them)
+            seed_conversations(
+                path / "conversations", servers.llm, args.stored_conversations
+            )
+        await servers.start_server()
+        ws_url = servers.base_url.replace("http", "ws", 1)
+        async with httpx.AsyncClient(
+            base_url=servers.base_url,
+            timeout=args.timeout,
+            limits=httpx.Limits(max_connections=args.max_connections),
+        ) as client:
+            conversation_ids: list[str] = []
+            for workload in args.workloads:
+                # The max loop lag covers the last minute or more (Waiting out its
+                # window would take too long), so may include earlier workloads
+                if workload == "conversations":
+                    result, conversation_ids = await run_conversations(
+                        client, servers.llm, args.conversations
+                    )
+                elif workload == "message_burst":
+                    if not conversation_ids:
+                        conversation_ids = await create_conversations(
+                            client, servers.llm, args.conversations
+                        )
+                    result = await run_message_burst(
+                        client, conversation_ids, args.messages
+                    )
+                elif workload == "websocket_viewers":
+                    if not conversation_ids:
+                        conversation_ids = await create_conversations(
+                            client, servers.llm, args.conversations
+                        )
+                    result = await run_websocket_viewers(
+                        client,
+                        ws_url,
+                        conversation_ids[: args.viewed_conversations],
+                        args.viewers,
+                        args.rounds,
+                    )
+                elif workload == "pagination":
+                    result = await run_pagination(client, servers.llm, args.events)
+                else:
+                    result = await run_cold_start(servers, args.cold_start_runs)
+                result["server_loop_lag_max_ms"] = await get_loop_lag_max(client)
+                result["commit"] = commit
+                print(json.dumps(result), flush=True)
+                results.append(result)
+    finally:
+        await servers.close()
+        shutil.rmtree(path, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--workloads", nargs="+", default=list(WORKLOADS), choices=WORKLOADS
+    )
+    parser.add_argument("--conversations", type=int, default=20)
+    parser.add_argument(
+        "--messages", type=int, default=5, help="Messages per conversation in a burst"
+    )
+    parser.add_argument(
+        "--viewers", type=int, default=10, help="WebSocket viewers per conversation"
+    )
+    parser.add_argument(
+        "--viewed-conversations",
+        type=int,
+        default=10,
+        help="The number of conversations given viewers",
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=20, help="Messages sent to viewed conversations"
+    )
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--stored-conversations", type=int, default=1000)
+    parser.add_argument("--cold-start-runs", type=int, default=3)
+    parser.add_argument("--time-to-first-token", type=float, default=0.2)
+    parser.add_argument(
+        "--token-latency", type=float, default=0.01, help="Seconds per token"
+    )
+    parser.add_argument("--response-tokens", type=int, default=50)
+    parser.add_argument(
+        "--server-config",
+        default="{}",
+        help='JSON of Config fields for the server (e.g.: \'{"event_store": '
+        '"segmented"}\')',
+    )
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument(
+        "--output", type=Path, help="Optional file to append results to (JSON lines)"
+    )
+    args = parser.parse_args()
+    results = asyncio.run(run(args))
+    if args.output:
+        with args.output.open("a") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
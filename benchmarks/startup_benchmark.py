@@ -0,0 +1,104 @@
+"""Benchmark for server startup with many stored conversations.
+
+Generates N synthetic conversation directories, then measures how long the
+ConversationService takes to accept requests and how long until all conversations
+are loaded (time-to-ready), for each metadata store and load concurrency.
+
+Usage:
+    uv run python benchmarks/startup_benchmark.py --num-conversations 10000
+"""
+
+import argparse
+import asyncio
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from uuid import uuid4
+
+from openhands.sdk import LLM
+from openhands_server.sdk_server.conversation_service import ConversationService
+from openhands_server.sdk_server.conversation_store import (
+    ConversationStore,
+    FileConversationStore,
+    SqliteConversationStore,
+)
+from openhands_server.sdk_server.models import StoredConversation
+
+
+def generate_conversations(path: Path, num_conversations: int):
+    for _ in range(num_conversations):
+        stored = StoredConversation(
+            id=uuid4(), llm=LLM(model="litellm_proxy/anthropic/claude-sonnet-4")
+        )
+        conversation_dir = path / stored.id.hex
+        conversation_dir.mkdir(parents=True)
+        (conversation_dir / "meta.json").write_text(stored.model_dump_json())
+
+
+async def time_startup(path: Path, conversation_store: ConversationStore) -> dict:
+    service = ConversationService(
+        event_services_path=path,
+        workspace_path=path / "workspace",
+        conversation_store=conversation_store,
+        idle_timeout=None,
+        max_active_conversations=None,
+    )
+    start = time.perf_counter()
+    async with service:
+        accepting = time.perf_counter() - start
+        await service.wait_until_ready()
+        ready = time.perf_counter() - start
+        loaded = service.get_startup_progress().loaded
+    return {
+        "time_to_accept_s": round(accepting, 4),
+        "time_to_ready_s": round(ready, 4),
+        "loaded": loaded,
+    }
+
+
+async def run(num_conversations: int, concurrencies: list[int]) -> list[dict]:
+    results = []
+    path = Path(tempfile.mkdtemp(prefix="startup_benchmark_"))
+    try:
+        generate_conversations(path, num_conversations)
+        for load_concurrency in concurrencies:
+            result = await time_startup(
+                path, FileConversationStore(path, load_concurrency=load_concurrency)
+            )
+            results.append(
+                {
+                    "store": "file",
+                    "load_concurrency": load_concurrency,
+                    "num_conversations": num_conversations,
+                    **result,
+                }
+            )
+        # The first run includes the one time import from meta.json files
+        for label in ("sqlite_import", "sqlite"):
+            result = await time_startup(
+                path,
+                SqliteConversationStore(
+                    db_path=path / "conversations.db", import_path=path
+                ),
+            )
+            results.append(
+                {"store": label, "num_conversations": num_conversations, **result}
+            )
+    finally:
+        shutil.rmtree(path)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--num-conversations", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    args = parser.parse_args()
+    for result in asyncio.run(run(args.num_conversations, args.concurrency)):
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Microbenchmark for broadcasting events to WebSocket subscribers.
+
+Publishes events through a PubSub to 1/10/100 subscribers, comparing the legacy
+path (model_dump + send_json per subscriber) against encoding each event once and
+sharing the buffer, for JSON text frames, JSON and (if installed) msgpack binary
+frames.
+
+Usage:
+    uv run python benchmarks/websocket_fanout_benchmark.py --num-events 1000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from openhands.sdk import Message, MessageEvent, TextContent
+from openhands_server.sdk_server.event_encoding import (
+    EncodedEventCache,
+    EventEncoding,
+    get_supported_encodings,
+)
+from openhands_server.sdk_server.event_router import _WebSocketSubscriber
+from openhands_server.sdk_server.pub_sub import PubSub
+
+
+class _NullWebSocket:
+    """Stand in for a WebSocket which discards everything sent to it."""
+
+    def __init__(self):
+        self.bytes_sent = 0
+
+    async def send_json(self, data):
+        self.bytes_sent += len(json.dumps(data))
+
+    async def send_text(self, data: str):
+        self.bytes_sent += len(data)
+
+    async def send_bytes(self, data: bytes):
+        self.bytes_sent += len(data)
+
+
+class _LegacySubscriber:
+    """The previous subscriber, which dumped each event for every socket"""
+
+    def __init__(self, websocket: _NullWebSocket):
+        self.websocket = websocket
+
+    async def __call__(self, event):
+        await self.websocket.send_json(event.model_dump())
+
+
+def create_events(num_events: int, content_size: int) -> list[MessageEvent]:
+    return [
+        MessageEvent(
+            source="agent",
+            llm_message=Message(
+                role="assistant", content=[TextContent(text="x" * content_size)]
+            ),
+        )
+        for _ in range(num_events)
+    ]
+
+
+async def time_broadcast(events, subscribers) -> float:
+    pub_sub = PubSub()
+    for subscriber in subscribers:
+        pub_sub.subscribe(subscriber, max_queue_size=None)
+    start = time.perf_counter()
+    for event in events:
+        await pub_sub(event)
+    while any(stats.queue_depth for stats in pub_sub.get_stats()):
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    pub_sub.clear()
+    return elapsed
+
+
+def create_subscribers(mode: str, num_subscribers: int) -> list:
+    if mode == "legacy":
+        return [_LegacySubscriber(_NullWebSocket()) for _ in range(num_subscribers)]
+    # All subscribers share a cache, as they do in the server
+    cache = EncodedEventCache()
+    if mode == "text":
+        return [
+            _WebSocketSubscriber(
+                _NullWebSocket(),  # type: ignore
+                EventEncoding.JSON,
+                cache,
+                text_frames=True,
+            )
+            for _ in range(num_subscribers)
+        ]
+    encoding = EventEncoding[mode.upper()]
+    return [
+        _WebSocketSubscriber(_NullWebSocket(), encoding, cache)  # type: ignore
+        for _ in range(num_subscribers)
+    ]
+
+
+async def run(num_events: int, content_size: int, subscriber_counts: list[int]):
+    events = create_events(num_events, content_size)
+    modes = ["legacy", "text"] + [e.name.lower() for e in get_supported_encodings()]
+    results = []
+    for num_subscribers in subscriber_counts:
+        for mode in modes:
+            subscribers = create_subscribers(mode, num_subscribers)
+            elapsed = await time_broadcast(events, subscribers)
+            results.append(
+                {
+                    "mode": mode,
+                    "num_subscribers": num_subscribers,
+                    "num_events": num_events,
+                    "content_size": content_size,
+                    "total_ms": round(elapsed * 1000, 3),
+                    "per_event_us": round(elapsed / num_events * 1_000_000, 3),
+                }
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--num-events", type=int, default=1000)
+    parser.add_argument("--content-size", type=int, default=4096)
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+    results = asyncio.run(run(args.num_events, args.content_size, args.subscribers))
+    for result in results:
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
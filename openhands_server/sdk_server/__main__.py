@@ -13,15 +13,39 @@ def main():
     )
     parser.add_argument(
         "--reload",
-        default=True,
+        default=None,
         action="store_true",
-        help="Enable auto-reload for development",
+        help=(
+            "Enable auto-reload for development (The default, unless running "
+            "multiple workers, which does not support it)"
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help=(
+            "Number of worker processes. Conversations are sharded across workers "
+            "by id, behind a front process on the host and port (default: 1)"
+        ),
     )
 
     args = parser.parse_args()
+    if args.reload is None:
+        args.reload = args.workers == 1
+    elif args.workers > 1:
+        parser.error("--reload is not supported with --workers")
 
     print(f"🚀 Starting OpenHands SDK Server on {args.host}:{args.port}")
     print(f"📖 API docs will be available at http://{args.host}:{args.port}/docs")
+    if args.workers > 1:
+        from openhands_server.sdk_server.proxy import create_proxy_api
+
+        print(f"🧵 Workers: {args.workers}")
+        print()
+        uvicorn.run(create_proxy_api(args.workers), host=args.host, port=args.port)
+        return
+
     print(f"🔄 Auto-reload: {'enabled' if args.reload else 'disabled'}")
     print()
 
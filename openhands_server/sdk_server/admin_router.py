@@ -0,0 +1,55 @@
+"""Admin router for OpenHands SDK, with diagnostics for the live process."""
+
+import asyncio
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from openhands_server.sdk_server.config import get_default_config
+from openhands_server.sdk_server.diagnostics import sample_stacks
+from openhands_server.sdk_server.middleware import is_valid_session_api_key
+
+
+def require_session_api_key(
+    x_session_api_key: Annotated[str | None, Header()] = None,
+):
+    """Admin endpoints are only available on servers secured with a session api
+    key, and always require it"""
+    session_api_key = get_default_config().session_api_key
+    if session_api_key is None:
+        raise HTTPException(
+            status.HTTP_403_FORBIDDEN, detail="admin_requires_session_api_key"
+        )
+    if not is_valid_session_api_key(x_session_api_key, session_api_key):
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED)
+
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_session_api_key)])
+_profile_lock = asyncio.Lock()
+
+
+@router.get(
+    "/profile",
+    response_class=PlainTextResponse,
+    responses={409: {"description": "A profile is already in progress"}},
+)
+async def profile(
+    duration: Annotated[
+        float,
+        Query(title="Seconds for which to sample", gt=0, le=60),
+    ] = 10,
+    interval: Annotated[
+        float,
+        Query(title="Seconds between samples", ge=0.001, le=1),
+    ] = 0.005,
+) -> PlainTextResponse:
+    """Sample the stacks of every thread in the process (The event loop, agent
+    runs and executor threads) for the duration given, returning them in the
+    collapsed stack format read by flamegraph.pl and speedscope. Sampling runs
+    in its own thread, and only one profile runs at a time."""
+    if _profile_lock.locked():
+        raise HTTPException(status.HTTP_409_CONFLICT, detail="profile_in_progress")
+    async with _profile_lock:
+        stacks = await asyncio.to_thread(sample_stacks, duration, interval)
+    return PlainTextResponse(stacks)
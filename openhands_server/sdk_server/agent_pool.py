@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import json
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any
+
+import openhands.tools
+from openhands.sdk import Agent, ToolSpec
+from openhands.sdk.logger import get_logger
+from openhands_server.sdk_server.mcp_pool import MCPPool, get_shared_tools
+from openhands_server.sdk_server.models import StartConversationRequest
+
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class WarmAgent:
+    """An agent along with the tools created for it, and the pooled MCP tools it
+    holds (if any)"""
+
+    agent: Agent
+    mcp_tools: list | None = None
+    tools: list = field(default_factory=list)
+
+
+def create_tools(tool_specs: list[ToolSpec]) -> list:
+    """Create tools from tool specs, skipping any which are unknown"""
+    tools = []
+    for tool_spec in tool_specs:
+        if tool_spec.name not in openhands.tools.__dict__:
+            continue
+        tool_class = openhands.tools.__dict__[tool_spec.name]
+        tools.append(tool_class.create(**tool_spec.params))
+    return tools
+
+
+async def create_agent(spec: StartConversationRequest, mcp_pool: MCPPool) -> WarmAgent:
+    """Create an agent for the llm, tools, mcp_config and agent_context given.
+    Tools are created in a thread, as some start processes."""
+    created_tools = await asyncio.to_thread(create_tools, spec.tools)
+    tools = list(created_tools)
+    mcp_tools = None
+    if spec.mcp_config:
+        # Shared with other conversations using the same servers
+        mcp_tools = await mcp_pool.acquire(spec.mcp_config)
+        tools.extend(get_shared_tools(mcp_tools))
+    try:
+        agent = Agent(llm=spec.llm, tools=tools, agent_context=spec.agent_context)
+    except Exception:
+        if mcp_tools is not None:
+            await mcp_pool.release(mcp_tools)
+        raise
+    return WarmAgent(agent=agent, mcp_tools=mcp_tools, tools=created_tools)
+
+
+@dataclass
+class _Profile:
+    spec: StartConversationRequest
+    warm: deque[WarmAgent] = field(default_factory=deque)
+    refill_task: asyncio.Task | None = None
+
+
+@dataclass
+class AgentPool:
+    """Pool of pre-built agents (with their tools already created), so that
+    starting a conversation does not wait for tools to start.
+
+    Agents are kept for each profile (The llm, tools, mcp_config and
+    agent_context of a request) for which a conversation was recently started,
+    keyed by a hash of the profile. Each agent is used by a single conversation,
+    and the pool is refilled in the background after one is taken. Profiles
+    beyond max_profiles are dropped (Least recently used first).
+    """
+
+    mcp_pool: MCPPool
+    size: int = 2
+    max_profiles: int = 8
+    _profiles: OrderedDict[str, _Profile] = field(
+        default_factory=OrderedDict, init=False
+    )
+
+    async def take(self, spec: StartConversationRequest) -> WarmAgent | None:
+        """Take a warm agent for the profile of the request given, if there is
+        one. The pool for the profile is refilled in the background."""
+        if self.size <= 0:
+            return None
+        profile = await self._get_profile(spec)
+        warm_agent = profile.warm.popleft() if profile.warm else None
+        self._refill(profile)
+        return warm_agent
+
+    def get_warm_count(self, spec: StartConversationRequest) -> int:
+        profile = self._profiles.get(get_profile_key(spec))
+        return len(profile.warm) if profile else 0
+
+    async def close(self):
+        """Close all warm agents and stop refilling"""
+        profiles = list(self._profiles.values())
+        self._profiles.clear()
+        for profile in profiles:
+            await self._close_profile(profile)
+
+    async def _get_profile(self, spec: StartConversationRequest) -> _Profile:
+        key = get_profile_key(spec)
+        profile = self._profiles.get(key)
+        if profile is None:
+            profile = _Profile(
+                spec=StartConversationRequest(
+                    llm=spec.llm,
+                    tools=spec.tools,
+                    mcp_config=spec.mcp_config,
+                    agent_context=spec.agent_context,
+                )
+            )
+            self._profiles[key] = profile
+            while len(self._profiles) > max(self.max_profiles, 1):
+                _, evicted = self._profiles.popitem(last=False)
+                await self._close_profile(evicted)
+        self._profiles.move_to_end(key)
+        return profile
+
+    def _refill(self, profile: _Profile):
+        if profile.refill_task is None or profile.refill_task.done():
+            profile.refill_task = asyncio.create_task(self._fill(profile))
+
+    async def _fill(self, profile: _Profile):
+        while len(profile.warm) < self.size:
+            # Each agent has its own copy of the llm, as it accumulates metrics
+            # for the conversation using it
+            spec = profile.spec.model_copy(
+                update={"llm": profile.spec.llm.model_copy(deep=True)}
+            )
+            try:
+                warm_agent = await create_agent(spec, self.mcp_pool)
+            except Exception:
+                logger.exception("error_creating_warm_agent", stack_info=True)
+                return
+            if profile not in self._profiles.values():
+                # The profile was evicted while the agent was being created
+                await self._close_warm_agent(warm_agent)
+                return
+            profile.warm.append(warm_agent)
+
+    async def _close_profile(self, profile: _Profile):
+        if profile.refill_task:
+            profile.refill_task.cancel()
+        while profile.warm:
+            await self._close_warm_agent(profile.warm.popleft())
+
+    async def _close_warm_agent(self, warm_agent: WarmAgent):
+        # Pooled MCP tools are left to the pool
+        for tool in warm_agent.tools:
+            if tool.executor is None:
+                continue
+            try:
+                await asyncio.to_thread(tool.executor.close)
+            except Exception:
+                logger.exception("error_closing_tool", stack_info=True)
+        if warm_agent.mcp_tools is not None:
+            await self.mcp_pool.release(warm_agent.mcp_tools)
+
+
+def get_profile_key(spec: StartConversationRequest) -> str:
+    """Get a key for the profile of a request (The llm, tools, mcp_config and
+    agent_context), which is the same for equivalent requests"""
+    profile = {
+        "llm": spec.llm.model_dump(),
+        "tools": [tool.model_dump() for tool in spec.tools],
+        "mcp_config": spec.mcp_config,
+        "agent_context": (
+            spec.agent_context.model_dump() if spec.agent_context else None
+        ),
+    }
+    normalized = json.dumps(
+        profile, sort_keys=True, separators=(",", ":"), default=_encode_value
+    )
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def _encode_value(value: Any) -> Any:
+    # Secrets are part of the profile - agents must not be shared between keys
+    get_secret_value = getattr(value, "get_secret_value", None)
+    if callable(get_secret_value):
+        return get_secret_value()
+    return str(value)
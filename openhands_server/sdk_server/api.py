@@ -3,6 +3,8 @@ from typing import AsyncIterator
 
 from fastapi import FastAPI
 
+from openhands_server.sdk_server.admin_router import router as admin_router
+from openhands_server.sdk_server.cluster import ClusterMiddleware, check_ring_change
 from openhands_server.sdk_server.config import (
     get_default_config,
 )
@@ -12,19 +14,34 @@ from openhands_server.sdk_server.conversation_router import (
 from openhands_server.sdk_server.conversation_service import (
     get_default_conversation_service,
 )
+from openhands_server.sdk_server.diagnostics import LoopLagMonitor
 from openhands_server.sdk_server.event_router import (
     router as conversation_event_router,
 )
 from openhands_server.sdk_server.middleware import (
     LocalhostCORSMiddleware,
+    MetricsMiddleware,
     ValidateSessionAPIKeyMiddleware,
 )
+from openhands_server.sdk_server.server_details_router import (
+    router as server_details_router,
+)
 
 
 @asynccontextmanager
 async def api_lifespan(api: FastAPI) -> AsyncIterator[None]:
+    if config.cluster_nodes:
+        check_ring_change(
+            config.conversations_path,
+            config.cluster_nodes,
+            config.cluster_fallback_nodes,
+        )
     service = get_default_conversation_service()
-    async with service:
+    monitor = LoopLagMonitor(
+        interval=config.loop_lag_interval,
+        block_threshold=config.loop_block_threshold,
+    )
+    async with service, monitor:
         yield
 
 
@@ -35,8 +52,18 @@ config = get_default_config()
 # Add routers
 api.include_router(conversation_event_router)
 api.include_router(conversation_router)
+api.include_router(server_details_router)
+api.include_router(admin_router)
 
-# Add middleware
+# Add middleware (The last added is the outermost)
+if config.cluster_nodes:
+    api.add_middleware(
+        ClusterMiddleware,
+        config=config,
+        conversation_service=get_default_conversation_service(),
+    )
 api.add_middleware(LocalhostCORSMiddleware, config.allow_cors_origins)
 if config.session_api_key:
     api.add_middleware(ValidateSessionAPIKeyMiddleware, config.session_api_key)
+# Outermost, so requests rejected or proxied by the others are also recorded
+api.add_middleware(MetricsMiddleware)
@@ -0,0 +1,354 @@
+"""
+Cluster mode, in which conversations are spread across several nodes (Each with
+its own disk) using a consistent hash ring defined in the Config. No external
+coordination service is required - every node has the same ring, so every node
+agrees on the owner of a conversation.
+
+Conversations are never moved between nodes. When nodes are added, a conversation
+is found on the node where it was created by checking the cluster_fallback_nodes
+nodes after its new owner on the ring. This only works if at most that many nodes
+have been added since the conversation was created, so each node records the ring
+it started with and refuses to start if more nodes than this have been added since
+(See check_ring_change). Removing a node makes its conversations unavailable.
+"""
+
+import asyncio
+import json
+import re
+from pathlib import Path
+from uuid import UUID
+
+import httpx
+from fastapi import Request, Response, status
+from fastapi.responses import JSONResponse, RedirectResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from starlette.websockets import WebSocket
+
+from openhands.sdk.logger import get_logger
+from openhands_server.sdk_server.config import Config
+from openhands_server.sdk_server.conversation_service import ConversationService
+from openhands_server.sdk_server.hash_ring import HashRing
+from openhands_server.sdk_server.models import ConversationSortOrder
+from openhands_server.sdk_server.proxy import (
+    fan_out,
+    forward_headers,
+    get_path_with_query,
+    merge_conversation_pages,
+    proxy_websocket,
+    send_upstream,
+    stream_response,
+    to_response,
+)
+
+
+logger = get_logger(__name__)
+FORWARDED_HEADER = "X-OpenHands-Forwarded"
+RING_FILE = "cluster_ring.json"
+_CONVERSATION_PATH = re.compile(r"^/conversations/([0-9a-fA-F-]{32,36})(/.*)?$")
+
+
+class ClusterMiddleware:
+    """Middleware routing requests for conversations to the node which owns them.
+
+    Requests and WebSockets for a conversation owned by another node are proxied
+    to it (HTTP requests may instead be redirected). If the owner does not have
+    the conversation, the next nodes on the ring are tried, as this is where it
+    lived before nodes were added - so adding a node moves ownership of only
+    about 1/N of conversations, and nothing needs to be copied for them to
+    remain available. New conversations are always created on the node which
+    receives the request, with an id the ring maps to that node.
+
+    Searches and counts are sent to every node and merged. Forwarded requests
+    are marked with a header and always handled locally, so they never loop.
+    """
+
+    def __init__(
+        self, app: ASGIApp, config: Config, conversation_service: ConversationService
+    ) -> None:
+        assert config.cluster_node_url is not None
+        self.app = app
+        self.node_url = config.cluster_node_url
+        self.ring = HashRing(config.cluster_nodes, config.cluster_virtual_nodes)
+        self.fallback_nodes = config.cluster_fallback_nodes
+        self.redirect = config.cluster_redirect
+        self.conversation_service = conversation_service
+        self._clients: dict[str, httpx.AsyncClient] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self.app(scope, self._close_on_shutdown(receive), send)
+            return
+        if scope["type"] not in ("http", "websocket") or _is_forwarded(scope):
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        if scope["type"] == "http" and scope["method"] == "GET":
+            handler = {
+                "/conversations/search": self._search,
+                "/conversations/count": self._count,
+                "/conversations/": self._batch_get,
+            }.get(path)
+            if handler:
+                response = await handler(Request(scope, receive))
+                await response(scope, receive, send)
+                return
+        conversation_id = _get_conversation_id(path)
+        if conversation_id is None:
+            await self.app(scope, receive, send)
+            return
+        nodes = self.ring.get_preference_list(conversation_id, 1 + self.fallback_nodes)
+        if scope["type"] == "websocket":
+            await self._route_websocket(scope, receive, send, conversation_id, nodes)
+        else:
+            await self._route_http(scope, receive, send, conversation_id, nodes)
+
+    async def _route_http(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        conversation_id: UUID,
+        nodes: list[str],
+    ):
+        request = Request(scope, receive)
+        if self.redirect and nodes[0] != self.node_url:
+            # The owner checks the fallback nodes itself if required
+            url = nodes[0] + get_path_with_query(request)
+            response = RedirectResponse(url, status.HTTP_307_TEMPORARY_REDIRECT)
+            await response(scope, receive, send)
+            return
+        body: bytes | None = None
+        for node in nodes:
+            if node == self.node_url:
+                if await self._has_local(conversation_id):
+                    break
+                continue
+            if body is None:
+                body = await request.body()
+            headers = {**forward_headers(request), FORWARDED_HEADER: "1"}
+            response = await send_upstream(
+                request, self._get_client(node), body, headers
+            )
+            if response is None:
+                logger.warning(f"cluster_node_unreachable:{node}")
+                continue
+            if response.status_code == status.HTTP_404_NOT_FOUND:
+                await response.aclose()
+                continue
+            await stream_response(response)(scope, receive, send)
+            return
+        # Handle locally - either this node has the conversation, or no node
+        # does and the local app responds accordingly
+        if body is not None:
+            receive = _replay_body(body, receive)
+        await self.app(scope, receive, send)
+
+    async def _route_websocket(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        conversation_id: UUID,
+        nodes: list[str],
+    ):
+        websocket = WebSocket(scope, receive, send)
+        node = await self._locate(websocket, conversation_id, nodes)
+        if node is None or node == self.node_url:
+            await self.app(scope, receive, send)
+            return
+        uri = re.sub(r"^http", "ws", node) + get_path_with_query(websocket)
+        await proxy_websocket(websocket, uri, extra_headers={FORWARDED_HEADER: "1"})
+
+    async def _locate(
+        self, websocket: WebSocket, conversation_id: UUID, nodes: list[str]
+    ) -> str | None:
+        """Find the first node in the list given which has the conversation"""
+        headers = {
+            key: value
+            for key, value in websocket.headers.items()
+            if key.lower() in ("x-session-api-key", "authorization")
+        }
+        headers[FORWARDED_HEADER] = "1"
+        for node in nodes:
+            if node == self.node_url:
+                if await self._has_local(conversation_id):
+                    return node
+                continue
+            try:
+                response = await self._get_client(node).get(
+                    f"/conversations/{conversation_id}", headers=headers
+                )
+            except httpx.TransportError:
+                logger.warning(f"cluster_node_unreachable:{node}")
+                continue
+            if response.status_code == status.HTTP_200_OK:
+                return node
+        return None
+
+    async def _search(self, request: Request) -> Response:
+        params = request.query_params
+        responses = await fan_out(
+            self._get_all_clients(),
+            "GET",
+            "/conversations/search",
+            params=params,
+            headers=self._get_forward_headers(request),
+        )
+        for response in responses:
+            if response.status_code != status.HTTP_200_OK:
+                return to_response(response)
+        sort_order = ConversationSortOrder(
+            params.get("sort_order", ConversationSortOrder.CREATED_AT.value)
+        )
+        limit = int(params.get("limit", 100))
+        pages = [response.json() for response in responses]
+        return JSONResponse(merge_conversation_pages(pages, sort_order, limit))
+
+    async def _count(self, request: Request) -> Response:
+        responses = await fan_out(
+            self._get_all_clients(),
+            "GET",
+            "/conversations/count",
+            params=request.query_params,
+            headers=self._get_forward_headers(request),
+        )
+        for response in responses:
+            if response.status_code != status.HTTP_200_OK:
+                return to_response(response)
+        return JSONResponse(sum(response.json() for response in responses))
+
+    async def _batch_get(self, request: Request) -> Response:
+        try:
+            ids = [UUID(id) for id in request.query_params.getlist("ids")]
+        except ValueError:
+            return JSONResponse(
+                {"detail": "invalid_id"}, status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        headers = self._get_forward_headers(request)
+        results: dict[UUID, dict] = {}
+        pending = ids
+        # Ask the owners first, then the fallback nodes for anything missing
+        for attempt in range(1 + self.fallback_nodes):
+            by_node: dict[str, list[UUID]] = {}
+            for conversation_id in pending:
+                nodes = self.ring.get_preference_list(
+                    conversation_id, 1 + self.fallback_nodes
+                )
+                if attempt < len(nodes):
+                    by_node.setdefault(nodes[attempt], []).append(conversation_id)
+            if not by_node:
+                break
+            node_urls = list(by_node)
+            responses = await asyncio.gather(
+                *[
+                    self._get_client(node).get(
+                        "/conversations/",
+                        params={"ids": [id.hex for id in by_node[node]]},
+                        headers=headers,
+                    )
+                    for node in node_urls
+                ],
+                return_exceptions=True,
+            )
+            for node, response in zip(node_urls, responses):
+                if isinstance(response, httpx.TransportError):
+                    logger.warning(f"cluster_node_unreachable:{node}")
+                    continue
+                if isinstance(response, BaseException):
+                    raise response
+                if response.status_code != status.HTTP_200_OK:
+                    return to_response(response)
+                for conversation_id, item in zip(by_node[node], response.json()):
+                    if item is not None:
+                        results[conversation_id] = item
+            pending = [id for id in pending if id not in results]
+            if not pending:
+                break
+        return JSONResponse([results.get(id) for id in ids])
+
+    async def _has_local(self, conversation_id: UUID) -> bool:
+        service = self.conversation_service
+        return await service.get_event_service(conversation_id) is not None
+
+    def _get_forward_headers(self, request: Request) -> dict[str, str]:
+        headers = forward_headers(request)
+        headers.pop("content-length", None)
+        headers[FORWARDED_HEADER] = "1"
+        return headers
+
+    def _get_client(self, node: str) -> httpx.AsyncClient:
+        client = self._clients.get(node)
+        if client is None:
+            client = httpx.AsyncClient(base_url=node, timeout=None)
+            self._clients[node] = client
+        return client
+
+    def _get_all_clients(self) -> list[httpx.AsyncClient]:
+        return [self._get_client(node) for node in dict.fromkeys(self.ring.nodes)]
+
+    async def aclose(self):
+        """Close the clients for other nodes"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        await asyncio.gather(*[client.aclose() for client in clients])
+
+    def _close_on_shutdown(self, receive: Receive) -> Receive:
+        """Get a receive function for the lifespan which closes the clients for
+        other nodes once the server is shutting down"""
+
+        async def receive_lifespan() -> Message:
+            message = await receive()
+            if message["type"] == "lifespan.shutdown":
+                await self.aclose()
+            return message
+
+        return receive_lifespan
+
+
+def check_ring_change(path: Path, nodes: list[str], fallback_nodes: int):
+    """Check that conversations on this node are still reachable with the ring
+    given. The nodes of the ring are recorded in the directory given the first
+    time this is called, and a ValueError is raised if more than fallback_nodes
+    nodes have been added to the ring since, as conversations created before
+    then may no longer be found. Once conversations have been moved to their
+    new owners, the record may be deleted to accept the ring as it is."""
+    ring_file = path / RING_FILE
+    if not ring_file.exists():
+        path.mkdir(parents=True, exist_ok=True)
+        ring_file.write_text(json.dumps({"nodes": nodes}))
+        return
+    recorded = json.loads(ring_file.read_text())["nodes"]
+    added = set(nodes) - set(recorded)
+    if len(added) > fallback_nodes:
+        raise ValueError(
+            f"cluster_ring_change_exceeds_fallback_nodes:{len(added)}:{fallback_nodes}"
+        )
+
+
+def _is_forwarded(scope: Scope) -> bool:
+    header = FORWARDED_HEADER.lower().encode()
+    return any(key == header for key, _ in scope.get("headers", ()))
+
+
+def _get_conversation_id(path: str) -> UUID | None:
+    match = _CONVERSATION_PATH.match(path)
+    if match is None:
+        return None
+    try:
+        return UUID(match.group(1))
+    except ValueError:
+        return None
+
+
+def _replay_body(body: bytes, receive: Receive) -> Receive:
+    """Get a receive function which returns a body which was already read"""
+    replayed = False
+
+    async def replay() -> Message:
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return replay
@@ -1,6 +1,8 @@
+import os
 from pathlib import Path
+from typing import Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 # TODO: Add a unit test to make sure this class does not import anything from
@@ -39,15 +41,249 @@ class Config(BaseModel):
             "The location of the directory where conversations and events are stored."
         ),
     )
+    metadata_store: Literal["file", "sqlite"] = Field(
+        default="file",
+        description=(
+            "Where conversation metadata is stored. 'file' keeps a meta.json in the "
+            "directory for each conversation. 'sqlite' keeps it in an indexed "
+            "database within the conversations directory (Existing meta.json files "
+            "are imported the first time it is used)."
+        ),
+    )
+    event_store: Literal["file", "segmented"] = Field(
+        default="file",
+        description=(
+            "How conversation events are stored. 'file' keeps a json file per "
+            "event. 'segmented' appends them to segment files with a binary index, "
+            "which is faster to load and read (Existing events are imported the "
+            "first time a conversation is opened). The import is one way: "
+            "conversations imported are not opened with 'file' again."
+        ),
+    )
+    event_hot_size: int = Field(
+        default=256,
+        description=(
+            "The number of most recent events of each conversation kept in memory "
+            "for reads. Older events are read from disk when requested."
+        ),
+    )
+    event_cache_size: int = Field(
+        default=1024,
+        description=(
+            "The max number of older events of each conversation kept in memory "
+            "after being read from disk (Least recently used are dropped first)."
+        ),
+    )
+    metadata_fsync: bool = Field(
+        default=True,
+        description=(
+            "Whether metadata writes (And events, with the segmented event_store) "
+            "are synced to disk before they are considered done. Writes are atomic "
+            "either way, but without this the latest changes may be lost if the "
+            "machine crashes."
+        ),
+    )
+    metadata_checkpoint_debounce: float = Field(
+        default=1,
+        description=(
+            "Seconds without further changes after which changed conversation "
+            "metadata is saved in the background."
+        ),
+    )
+    metadata_checkpoint_max_staleness: float = Field(
+        default=10,
+        description=(
+            "The max seconds for which changed conversation metadata goes unsaved "
+            "while changes keep arriving."
+        ),
+    )
+    startup_load_concurrency: int = Field(
+        default=16,
+        description=(
+            "The max number of conversation metadata files read at once (In the "
+            "file_io pool) when the server starts."
+        ),
+    )
+    file_io_workers: int = Field(
+        default=16,
+        description=(
+            "The max number of threads used for blocking file operations (Reading "
+            "events, saving metadata, creating and deleting conversations)."
+        ),
+    )
+    trash_reap_concurrency: int = Field(
+        default=2,
+        description=(
+            "The max number of deleted conversations whose files are removed from "
+            "disk at once, in the background."
+        ),
+    )
+    loop_lag_interval: float = Field(
+        default=0.1,
+        description=(
+            "Seconds between measurements of the lag of the event loop (Exposed in "
+            "/metrics)."
+        ),
+    )
+    loop_block_threshold: float | None = Field(
+        default=0.5,
+        description=(
+            "Seconds for which the event loop may be blocked before the stack of "
+            "what is blocking it is logged. None disables this."
+        ),
+    )
+    conversation_idle_timeout: float | None = Field(
+        default=600,
+        description=(
+            "Seconds after which a conversation which has not been accessed and is "
+            "not running is hibernated (Checkpointed to disk and released from "
+            "memory). It wakes transparently on next access. None disables this."
+        ),
+    )
+    max_active_conversations: int | None = Field(
+        default=64,
+        description=(
+            "The max number of conversations to keep in memory. When exceeded, the "
+            "least recently used conversations which are not running are "
+            "hibernated. None implies no limit."
+        ),
+    )
+    max_running_conversations: int = Field(
+        default=16,
+        description=(
+            "The max number of conversations with agents running at once. Runs "
+            "beyond this are queued (FIFO within a priority)."
+        ),
+    )
+    control_workers: int = Field(
+        default=4,
+        description=(
+            "Threads reserved for short operations on conversations (Sending "
+            "messages, pausing, closing), so these never wait for running agents."
+        ),
+    )
+    max_concurrent_starts: int = Field(
+        default=8,
+        description=(
+            "The max number of conversations from batches which are started at "
+            "once (Across all batches). The rest wait for a start to finish."
+        ),
+    )
+    max_batch_size: int = Field(
+        default=100,
+        description=(
+            "The max number of conversations in a single batch start request. "
+            "Larger batches are rejected (422)."
+        ),
+    )
+    mcp_pool_max_size: int = Field(
+        default=16,
+        description=(
+            "The max number of distinct MCP configs whose servers are kept running "
+            "and shared between conversations."
+        ),
+    )
+    mcp_pool_idle_ttl: float = Field(
+        default=300,
+        description=(
+            "Seconds after the last conversation using a set of MCP servers is "
+            "closed or hibernated before the servers are stopped."
+        ),
+    )
+    agent_pool_size: int = Field(
+        default=0,
+        description=(
+            "The number of pre-built agents (with tools already started) kept for "
+            "each recently used profile (llm, tools, mcp_config and agent_context), "
+            "so that starting a conversation does not wait for them. 0 disables "
+            "the pool."
+        ),
+    )
+    agent_pool_max_profiles: int = Field(
+        default=8,
+        description="The max number of profiles for which agents are kept warm.",
+    )
+    shard_index: int = Field(
+        default=0,
+        description=(
+            "The shard of conversations owned by this server. Set by the front "
+            "process when running with multiple worker processes."
+        ),
+    )
+    shard_count: int = Field(
+        default=1,
+        description=(
+            "The total number of shards. Each server only loads and creates "
+            "conversations whose id maps to its shard_index."
+        ),
+    )
+    prepare_storage: bool = Field(
+        default=True,
+        description=(
+            "Whether to migrate the metadata database, import meta.json files and "
+            "remove deleted conversations left in the trash on startup. The front "
+            "process does this once before starting worker processes, so they do "
+            "not race each other, and starts them with this unset."
+        ),
+    )
+    cluster_nodes: list[str] = Field(
+        default_factory=list,
+        description=(
+            "Base urls of every node in the cluster (Including this one). "
+            "Conversation ids are mapped to nodes with a consistent hash ring, and "
+            "requests reaching the wrong node are forwarded to the owner. Empty "
+            "disables cluster mode."
+        ),
+    )
+    cluster_node_url: str | None = Field(
+        default=None,
+        description="The base url of this node. Required if cluster_nodes is set.",
+    )
+    cluster_virtual_nodes: int = Field(
+        default=64,
+        description="Number of points on the hash ring for each node.",
+    )
+    cluster_fallback_nodes: int = Field(
+        default=2,
+        description=(
+            "Number of nodes after the owner on the ring which are checked for a "
+            "conversation the owner does not have (Where it most likely lived "
+            "before nodes were added). Conversations are not moved, so a node "
+            "refuses to start if more nodes than this have been added to the ring "
+            "since it first started."
+        ),
+    )
+    cluster_redirect: bool = Field(
+        default=False,
+        description=(
+            "Redirect HTTP requests for conversations on other nodes (307) rather "
+            "than proxying them. WebSockets are always proxied."
+        ),
+    )
     model_config = {"frozen": True}
 
+    @model_validator(mode="after")
+    def _validate_cluster(self) -> "Config":
+        if self.cluster_nodes and self.cluster_node_url not in self.cluster_nodes:
+            raise ValueError("cluster_node_url must be one of the cluster_nodes")
+        return self
+
 
 _default_config: Config | None = None
 
 
+CONFIG_ENV_VAR = "OPENHANDS_SERVER_CONFIG"
+
+
 def get_default_config():
-    """Get the default local server config shared across the server"""
+    """Get the default local server config shared across the server. If the
+    OPENHANDS_SERVER_CONFIG environment variable is set, it is parsed as a json
+    Config (This is how worker processes receive their config)."""
     global _default_config
     if _default_config is None:
-        _default_config = Config()
+        config_json = os.environ.get(CONFIG_ENV_VAR)
+        if config_json:
+            _default_config = Config.model_validate_json(config_json)
+        else:
+            _default_config = Config()
     return _default_config
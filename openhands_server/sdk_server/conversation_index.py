@@ -0,0 +1,124 @@
+import base64
+import binascii
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass, field
+from datetime import datetime
+from uuid import UUID
+
+from openhands.sdk.conversation.state import AgentExecutionStatus
+from openhands_server.sdk_server.models import ConversationSortOrder
+
+
+_Key = tuple[datetime, UUID]
+
+
+@dataclass
+class _IndexEntry:
+    created_at: datetime
+    updated_at: datetime
+    status: AgentExecutionStatus
+
+
+@dataclass
+class ConversationIndex:
+    """In memory secondary indexes over conversations. Ids are kept sorted by
+    created_at and updated_at, both overall and bucketed by status, so that a
+    filtered and sorted page of conversations may be found with a binary search
+    followed by a slice. Cursors encode the sort key of the next item, so they
+    remain valid as conversations are added, updated and removed.
+    """
+
+    _entries: dict[UUID, _IndexEntry] = field(default_factory=dict)
+    _sorted: dict[tuple[str, AgentExecutionStatus | None], list[_Key]] = field(
+        default_factory=dict
+    )
+
+    def update(
+        self,
+        conversation_id: UUID,
+        created_at: datetime,
+        updated_at: datetime,
+        status: AgentExecutionStatus,
+    ) -> None:
+        """Add a conversation to the index, or update its entry"""
+        entry = self._entries.get(conversation_id)
+        if entry:
+            if (
+                entry.created_at == created_at
+                and entry.updated_at == updated_at
+                and entry.status == status
+            ):
+                return
+            self.remove(conversation_id)
+        entry = _IndexEntry(created_at, updated_at, status)
+        self._entries[conversation_id] = entry
+        for attr, bucket in self._get_buckets(entry):
+            key = (getattr(entry, attr), conversation_id)
+            insort(self._sorted.setdefault((attr, bucket), []), key)
+
+    def remove(self, conversation_id: UUID) -> bool:
+        """Remove a conversation from the index"""
+        entry = self._entries.pop(conversation_id, None)
+        if entry is None:
+            return False
+        for attr, bucket in self._get_buckets(entry):
+            keys = self._sorted[(attr, bucket)]
+            key = (getattr(entry, attr), conversation_id)
+            del keys[bisect_left(keys, key)]
+        return True
+
+    def count(self, status: AgentExecutionStatus | None = None) -> int:
+        """Count conversations, optionally filtering by status"""
+        return len(self._sorted.get(("created_at", status), ()))
+
+    def search(
+        self,
+        page_id: str | None = None,
+        limit: int = 100,
+        sort_order: ConversationSortOrder = ConversationSortOrder.CREATED_AT,
+        status: AgentExecutionStatus | None = None,
+    ) -> tuple[list[UUID], str | None]:
+        """Get a page of conversation ids, along with the next_page_id (if any).
+        Raises a ValueError if the page_id is not valid."""
+        attr = "created_at"
+        if sort_order.value.startswith("UPDATED_AT"):
+            attr = "updated_at"
+        keys = self._sorted.get((attr, status), [])
+        cursor = decode_page_id(page_id) if page_id else None
+        if sort_order.value.endswith("_DESC"):
+            start = len(keys) - 1
+            if cursor:
+                start = bisect_right(keys, cursor) - 1
+            page = keys[max(start - limit + 1, 0) : start + 1][::-1]
+            next_index = start - limit
+            has_next = next_index >= 0
+        else:
+            start = bisect_left(keys, cursor) if cursor else 0
+            page = keys[start : start + limit]
+            next_index = start + limit
+            has_next = next_index < len(keys)
+        next_page_id = encode_page_id(keys[next_index]) if has_next else None
+        return [conversation_id for _, conversation_id in page], next_page_id
+
+    def _get_buckets(self, entry: _IndexEntry):
+        for attr in ("created_at", "updated_at"):
+            yield attr, None
+            yield attr, entry.status
+
+
+def encode_page_id(key: _Key) -> str:
+    """Encode an opaque cursor for the sort key given"""
+    cursor = f"{key[0].isoformat()}|{key[1].hex}".encode()
+    return base64.urlsafe_b64encode(cursor).decode().rstrip("=")
+
+
+def decode_page_id(page_id: str) -> _Key:
+    """Decode a cursor produced by encode_page_id, raising a ValueError if it is
+    not valid"""
+    try:
+        padding = "=" * (-len(page_id) % 4)
+        cursor = base64.urlsafe_b64decode(page_id + padding).decode()
+        timestamp, conversation_id = cursor.split("|", 1)
+        return datetime.fromisoformat(timestamp), UUID(conversation_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("invalid_page_id")
@@ -3,14 +3,19 @@
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, HTTPException, Query, status
+from fastapi import APIRouter, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 
+from openhands.sdk.conversation.state import AgentExecutionStatus
 from openhands_server.sdk_server.conversation_service import (
     get_default_conversation_service,
 )
 from openhands_server.sdk_server.models import (
+    BatchStartResult,
     ConversationInfo,
     ConversationPage,
+    ConversationSortOrder,
+    RunQueueInfo,
     StartConversationRequest,
     Success,
 )
@@ -33,11 +38,37 @@ async def search_conversations(
         int,
         Query(title="The max number of results in the page", gt=0, lte=100),
     ] = 100,
+    sort_order: Annotated[
+        ConversationSortOrder,
+        Query(title="The order in which to return conversations"),
+    ] = ConversationSortOrder.CREATED_AT,
+    status_eq: Annotated[
+        AgentExecutionStatus | None,
+        Query(title="Optional filter - only conversations with this status"),
+    ] = None,
 ) -> ConversationPage:
     """Search / List local conversations"""
     assert limit > 0
     assert limit <= 100
-    return await conversation_service.search_conversations(page_id, limit)
+    try:
+        return await conversation_service.search_conversations(
+            page_id, limit, sort_order=sort_order, status=status_eq
+        )
+    except ValueError as e:
+        if str(e) == "invalid_page_id":
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(e))
+        raise
+
+
+@router.get("/count")
+async def count_conversations(
+    status_eq: Annotated[
+        AgentExecutionStatus | None,
+        Query(title="Optional filter - only conversations with this status"),
+    ] = None,
+) -> int:
+    """Count local conversations"""
+    return await conversation_service.count_conversations(status_eq)
 
 
 @router.get("/{conversation_id}", responses={404: {"description": "Item not found"}})
@@ -49,6 +80,18 @@ async def get_conversation(conversation_id: UUID) -> ConversationInfo:
     return conversation
 
 
+@router.get(
+    "/{conversation_id}/run_queue", responses={404: {"description": "Item not found"}}
+)
+async def get_run_queue_info(conversation_id: UUID) -> RunQueueInfo:
+    """Get the position of a conversation in the queue of runs, and how long it
+    has been waiting"""
+    info = await conversation_service.get_run_queue_info(conversation_id)
+    if info is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND)
+    return info
+
+
 @router.get("/")
 async def batch_get_conversations(
     ids: Annotated[list[UUID], Query()],
@@ -72,6 +115,42 @@ async def start_conversation(
     return info
 
 
+@router.post(
+    "/batch",
+    response_model=list[BatchStartResult],
+    responses={422: {"description": "More requests than max_batch_size"}},
+)
+async def batch_start_conversations(
+    requests: list[StartConversationRequest],
+    stream: Annotated[
+        bool,
+        Query(
+            title=(
+                "If true, results are streamed as newline delimited json as each "
+                "becomes ready (In any order)"
+            )
+        ),
+    ] = False,
+) -> Response | list[BatchStartResult | None]:
+    """Start a batch of local conversations concurrently, returning a result or
+    error for each request (In the order given unless streaming)"""
+    # Checked before any results are streamed
+    if len(requests) > conversation_service.max_batch_size:
+        raise HTTPException(
+            status.HTTP_422_UNPROCESSABLE_ENTITY, detail="batch_too_large"
+        )
+    results = conversation_service.batch_start_conversations(requests)
+    if stream:
+        return StreamingResponse(
+            (result.model_dump_json() + "\n" async for result in results),
+            media_type="application/x-ndjson",
+        )
+    ordered: list[BatchStartResult | None] = [None] * len(requests)
+    async for result in results:
+        ordered[result.index] = result
+    return ordered
+
+
 @router.post(
     "/{conversation_id}/pause", responses={404: {"description": "Item not found"}}
 )
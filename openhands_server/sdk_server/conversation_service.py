@@ -1,20 +1,47 @@
 import asyncio
 import logging
-import shutil
+import time
+from collections.abc import AsyncIterator
 from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Literal
 from uuid import UUID, uuid4
 
 from openhands.sdk import Event, Message
+from openhands.sdk.conversation.state import AgentExecutionStatus
+from openhands_server.sdk_server.agent_pool import AgentPool
 from openhands_server.sdk_server.config import Config
+from openhands_server.sdk_server.conversation_index import ConversationIndex
+from openhands_server.sdk_server.conversation_store import (
+    ConversationStore,
+    FileConversationStore,
+    SqliteConversationStore,
+)
 from openhands_server.sdk_server.event_service import EventService
+from openhands_server.sdk_server.file_io import AsyncFileIO, Trash, get_default_file_io
+from openhands_server.sdk_server.hash_ring import HashRing
+from openhands_server.sdk_server.mcp_pool import MCPPool, get_mcp_config_key
+from openhands_server.sdk_server.meta_checkpointer import MetaCheckpointer
+from openhands_server.sdk_server.metrics import (
+    CONVERSATIONS,
+    EVENT_SUBSCRIBERS,
+    EXECUTOR_QUEUE_DEPTH,
+    RUNS_ACTIVE,
+    RUNS_PENDING,
+    STARTUP_LOAD_DURATION,
+)
 from openhands_server.sdk_server.models import (
+    BatchStartResult,
     ConversationInfo,
     ConversationPage,
+    ConversationSortOrder,
+    RunQueueInfo,
     StartConversationRequest,
+    StartupProgress,
     StoredConversation,
 )
-from openhands_server.sdk_server.utils import utc_now
+from openhands_server.sdk_server.run_scheduler import RunScheduler
+from openhands_server.sdk_server.utils import get_shard, utc_now
 
 
 logger = logging.getLogger(__name__)
@@ -24,49 +51,108 @@ logger = logging.getLogger(__name__)
 class ConversationService:
     """
     Conversation service which stores to a local file store. When the context starts
-    all event_services are loaded into memory, and stored when it stops.
+    the metadata for all event_services is loaded into memory, and stored when it
+    stops. Metadata is kept in the conversation_store given (meta.json files by
+    default). While running, changes to metadata are checkpointed in the background
+    (See MetaCheckpointer).
+
+    Metadata is loaded in the background so that the server may accept requests
+    while it loads (Individual conversations requested before they are loaded are
+    fetched from the store on demand).
+
+    Conversations are activated on first access, and hibernated when idle for
+    longer than the idle_timeout or when there are more than max_active_conversations
+    active (Least recently used first).
+
+    When running as one of several worker processes, the service only loads and
+    creates conversations whose id maps to its shard_index. In cluster mode, new
+    conversations are given ids which the hash_ring maps to this node.
+
+    Filesystem access is done through the file_io given, so it never blocks the
+    event loop. Deleted conversations are moved to the trash and removed in the
+    background (See Trash), so deletes take the same time however large the
+    workspace is.
     """
 
     event_services_path: Path = field(default=Path("workspace/event_services"))
     workspace_path: Path = field(default=Path("workspace/project"))
+    conversation_store: ConversationStore | None = None
+    idle_timeout: float | None = 600
+    max_active_conversations: int | None = 64
+    hibernation_interval: float = 15
+    max_concurrent_starts: int = 8
+    max_batch_size: int = 100
+    event_store: Literal["file", "segmented"] = "file"
+    event_hot_size: int = 256
+    event_cache_size: int = 1024
+    event_fsync: bool = False
+    checkpoint_debounce: float = 1
+    checkpoint_max_staleness: float = 10
+    trash_reap_concurrency: int = 2
+    # Unset in worker processes, for which the front process prepares storage
+    prepare_storage: bool = True
+    file_io: AsyncFileIO = field(default_factory=get_default_file_io)
+    run_scheduler: RunScheduler = field(default_factory=RunScheduler)
+    mcp_pool: MCPPool = field(default_factory=MCPPool)
+    agent_pool: AgentPool | None = None
+    shard_index: int = 0
+    shard_count: int = 1
+    hash_ring: HashRing | None = None
+    node_url: str | None = None
     _event_services: dict[UUID, EventService] | None = field(default=None, init=False)
+    _conversation_index: ConversationIndex = field(
+        default_factory=ConversationIndex, init=False
+    )
+    _hibernation_task: asyncio.Task | None = field(default=None, init=False)
+    _loading_task: asyncio.Task | None = field(default=None, init=False)
+    _startup_progress: StartupProgress = field(
+        default_factory=StartupProgress, init=False
+    )
+    _deleted_while_loading: set[UUID] = field(default_factory=set, init=False)
+    _checkpointer: MetaCheckpointer | None = field(default=None, init=False)
+    _trash: Trash | None = field(default=None, init=False)
+    _start_semaphore: asyncio.Semaphore | None = field(default=None, init=False)
 
     async def get_conversation(self, conversation_id: UUID) -> ConversationInfo | None:
         if self._event_services is None:
             raise ValueError("inactive_service")
-        event_service = self._event_services.get(conversation_id)
+        event_service = await self._get_event_service(conversation_id)
         if event_service is None:
             return None
-        status = await event_service.get_status()
-        return ConversationInfo(**event_service.stored.model_dump(), status=status)
+        return await self._get_conversation_info(event_service)
 
     async def search_conversations(
-        self, page_id: str | None = None, limit: int = 100
+        self,
+        page_id: str | None = None,
+        limit: int = 100,
+        sort_order: ConversationSortOrder = ConversationSortOrder.CREATED_AT,
+        status: AgentExecutionStatus | None = None,
     ) -> ConversationPage:
         if self._event_services is None:
             raise ValueError("inactive_service")
-        items = []
-        for id, event_service in self._event_services.items():
-            # If we have reached the start of the page
-            if id == page_id:
-                page_id = None
-
-            # Skip pass entries before the first item...
-            if page_id:
-                continue
+        conversation_ids, next_page_id = self._conversation_index.search(
+            page_id, limit, sort_order, status
+        )
+        items = [
+            await self._get_conversation_info(self._event_services[conversation_id])
+            for conversation_id in conversation_ids
+        ]
+        return ConversationPage(items=items, next_page_id=next_page_id)
 
-            # If we have reached the end of the page, return it
-            if limit <= 0:
-                return ConversationPage(items=items, next_page_id=id.hex)
-            limit -= 1
+    async def get_run_queue_info(self, conversation_id: UUID) -> RunQueueInfo | None:
+        if self._event_services is None:
+            raise ValueError("inactive_service")
+        event_service = await self._get_event_service(conversation_id)
+        if event_service is None:
+            return None
+        return await event_service.get_run_queue_info()
 
-            items.append(
-                ConversationInfo(
-                    **event_service.stored.model_dump(),
-                    status=await event_service.get_status(),
-                )
-            )
-        return ConversationPage(items=items)
+    async def count_conversations(
+        self, status: AgentExecutionStatus | None = None
+    ) -> int:
+        if self._event_services is None:
+            raise ValueError("inactive_service")
+        return self._conversation_index.count(status)
 
     async def batch_get_conversations(
         self, event_service_ids: list[UUID]
@@ -75,7 +161,7 @@ class ConversationService:
         None for any where were not found."""
         results = []
         for id in event_service_ids:
-            result = await self.get_event_service(id)
+            result = await self.get_conversation(id)
             results.append(result)
         return results
 
@@ -88,19 +174,17 @@ class ConversationService:
         if self._event_services is None:
             raise ValueError("inactive_service")
         event_service_id = uuid4()
+        while not self._is_owner(event_service_id):
+            event_service_id = uuid4()
         stored = StoredConversation(id=event_service_id, **request.model_dump())
-        file_store_path = (
-            self.event_services_path / event_service_id.hex / "event_service"
-        )
-        file_store_path.mkdir(parents=True)
-        event_service = EventService(
-            stored=stored,
-            file_store_path=file_store_path,
-            working_dir=self.workspace_path,
-        )
-        await event_service.subscribe_to_events(_EventListener(service=event_service))
-        self._event_services[event_service_id] = event_service
-        await event_service.start()
+        event_service = self._create_event_service(stored)
+        await self.file_io.mkdir(event_service.file_store_path)
+        await self._add_event_service(event_service)
+        warm_agent = None
+        if self.agent_pool:
+            warm_agent = await self.agent_pool.take(request)
+        await event_service.activate(warm_agent)
+        await event_service.save_meta()
         initial_message = request.initial_message
         if initial_message:
             message = Message(
@@ -108,13 +192,67 @@ class ConversationService:
             )
             await event_service.send_message(message, run=initial_message.run)
 
-        status = await event_service.get_status()
-        return ConversationInfo(**event_service.stored.model_dump(), status=status)
+        return await self._get_conversation_info(event_service)
+
+    async def batch_start_conversations(
+        self, requests: list[StartConversationRequest]
+    ) -> AsyncIterator[BatchStartResult]:
+        """Start a batch of conversations, yielding a result for each as it
+        becomes ready (So not necessarily in the order given). At most
+        max_concurrent_starts are started at once across all batches. A failure
+        to start one conversation does not affect the others. Conversations
+        continue to start if the caller stops iterating."""
+        if self._event_services is None:
+            raise ValueError("inactive_service")
+        if len(requests) > self.max_batch_size:
+            raise ValueError("batch_too_large")
+        # MCP servers shared by requests in the batch are started once and held
+        # until the batch is done, so they are not stopped between starts
+        mcp_configs = {
+            get_mcp_config_key(request.mcp_config): request.mcp_config
+            for request in requests
+            if request.mcp_config
+        }
+        held_mcp_tools = await asyncio.gather(
+            *[self.mcp_pool.acquire(config) for config in mcp_configs.values()],
+            return_exceptions=True,
+        )
+        if self._start_semaphore is None:
+            self._start_semaphore = asyncio.Semaphore(
+                max(self.max_concurrent_starts, 1)
+            )
+        semaphore = self._start_semaphore
+
+        async def start(index: int, request: StartConversationRequest):
+            async with semaphore:
+                try:
+                    info = await self.start_conversation(request)
+                except Exception as e:
+                    logger.exception("error_starting_conversation", stack_info=True)
+                    return BatchStartResult(index=index, error=str(e) or repr(e))
+            return BatchStartResult(index=index, conversation=info)
+
+        tasks = [
+            asyncio.create_task(start(index, request))
+            for index, request in enumerate(requests)
+        ]
+
+        async def release_when_done():
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for tools in held_mcp_tools:
+                if not isinstance(tools, BaseException):
+                    await self.mcp_pool.release(tools)
+
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            await asyncio.shield(release_when_done())
 
     async def pause_conversation(self, conversation_id: UUID) -> bool:
         if self._event_services is None:
             raise ValueError("inactive_service")
-        event_service = self._event_services.get(conversation_id)
+        event_service = await self._get_event_service(conversation_id)
         if event_service:
             await event_service.pause()
         return bool(event_service)
@@ -122,53 +260,266 @@ class ConversationService:
     async def resume_conversation(self, conversation_id: UUID) -> bool:
         if self._event_services is None:
             raise ValueError("inactive_service")
-        event_service = self._event_services.get(conversation_id)
+        event_service = await self._get_event_service(conversation_id)
         if event_service:
-            await event_service.start()
+            await event_service.activate()
         return bool(event_service)
 
     async def delete_conversation(self, conversation_id: UUID) -> bool:
         if self._event_services is None:
             raise ValueError("inactive_service")
+        await self._get_event_service(conversation_id)
         event_service = self._event_services.pop(conversation_id, None)
         if event_service:
+            if not self._startup_progress.complete:
+                self._deleted_while_loading.add(conversation_id)
+            self._conversation_index.remove(conversation_id)
             await event_service.close()
-            shutil.rmtree(self.event_services_path / conversation_id.hex)
-            shutil.rmtree(self.workspace_path / conversation_id.hex)
+            if self._checkpointer:
+                await self._checkpointer.discard(conversation_id)
+            await self._get_conversation_store().delete(conversation_id)
+            assert self._trash is not None
+            await self._trash.move(self.event_services_path / conversation_id.hex)
+            await self._trash.move(self.workspace_path / conversation_id.hex)
             return True
         return False
 
     async def get_event_service(self, conversation_id: UUID) -> EventService | None:
         if self._event_services is None:
             raise ValueError("inactive_service")
-        return self._event_services.get(conversation_id)
+        return await self._get_event_service(conversation_id)
 
-    async def __aenter__(self):
-        self.event_services_path.mkdir(parents=True, exist_ok=True)
-        event_services = {}
-        for event_service_dir in self.event_services_path.iterdir():
+    def get_startup_progress(self) -> StartupProgress:
+        return self._startup_progress.model_copy()
+
+    def is_ready(self) -> bool:
+        """Whether the service is accepting requests - which it does while still
+        loading conversations (Fetching any not yet loaded on demand), unless
+        loading failed"""
+        return self._event_services is not None and not self._startup_progress.failed
+
+    async def wait_until_ready(self):
+        """Wait until the metadata for all conversations has been loaded"""
+        if self._loading_task:
+            await asyncio.shield(self._loading_task)
+
+    async def _get_event_service(self, conversation_id: UUID) -> EventService | None:
+        assert self._event_services is not None
+        event_service = self._event_services.get(conversation_id)
+        if event_service or self._startup_progress.complete:
+            return event_service
+        if get_shard(conversation_id, self.shard_count) != self.shard_index:
+            return None
+        # Still loading - fetch this conversation from the store on demand
+        result = await self._get_conversation_store().get(conversation_id)
+        if result is None or self._event_services is None:
+            return None
+        event_service = self._event_services.get(conversation_id)
+        if event_service is None:
+            event_service = self._create_event_service(*result)
+            await self._add_event_service(event_service)
+        return event_service
+
+    async def _load_conversations(self):
+        assert self._event_services is not None
+        progress = self._startup_progress
+        conversation_store = self._get_conversation_store()
+        try:
+            progress.total = await conversation_store.count_all()
+            async for stored, status in conversation_store.iter_all():
+                if self._event_services is None:
+                    return
+                if (
+                    stored.id not in self._event_services
+                    and stored.id not in self._deleted_while_loading
+                    and get_shard(stored.id, self.shard_count) == self.shard_index
+                ):
+                    # Indexed under the status last saved
+                    event_service = self._create_event_service(stored, status)
+                    await self._add_event_service(event_service)
+                progress.loaded += 1
+        except Exception:
+            # Leave the server unready so that it is restarted
+            progress.failed = True
+            logger.exception("error_loading_conversations", stack_info=True)
+            raise
+        progress.complete = True
+        progress.completed_at = utc_now()
+        self._deleted_while_loading.clear()
+        duration = progress.completed_at - progress.started_at
+        STARTUP_LOAD_DURATION.set(duration.total_seconds())
+        logger.info(
+            f"loaded_conversations:{progress.loaded}:{duration.total_seconds()}"
+        )
+
+    async def hibernate_idle_conversations(self) -> int:
+        """Hibernate conversations which are not running and have been idle for
+        longer than the idle timeout, along with the least recently used
+        conversations beyond the max_active_conversations. Returns the number of
+        conversations hibernated."""
+        if self._event_services is None:
+            raise ValueError("inactive_service")
+        now = time.monotonic()
+        for event_service in self._event_services.values():
+            if event_service.has_viewers:
+                # Conversations being viewed are in use, even if nothing is sent
+                event_service.last_accessed = now
+        active = sorted(
+            (s for s in self._event_services.values() if s.is_active),
+            key=lambda s: s.last_accessed,
+        )
+        excess = 0
+        if self.max_active_conversations is not None:
+            excess = len(active) - self.max_active_conversations
+        idle_before = None
+        if self.idle_timeout is not None:
+            idle_before = now - self.idle_timeout
+        hibernated = 0
+        for event_service in active:
+            is_idle = (
+                idle_before is not None and event_service.last_accessed < idle_before
+            )
+            if excess <= 0 and not is_idle:
+                # Services are in LRU order, so no later one is idle either
+                break
+            if await event_service.get_status() == AgentExecutionStatus.RUNNING:
+                continue
+            if await event_service.hibernate():
+                hibernated += 1
+                excess -= 1
+        if hibernated:
+            logger.info(f"hibernated_conversations:{hibernated}")
+        if idle_before is not None:
+            # Hibernated conversations keep their file store open after reads
+            for event_service in list(self._event_services.values()):
+                if (
+                    not event_service.is_active
+                    and event_service.last_accessed < idle_before
+                ):
+                    await event_service.release_events()
+        return hibernated
+
+    async def _hibernation_loop(self):
+        while True:
+            await asyncio.sleep(self.hibernation_interval)
             try:
-                meta_file = event_service_dir / "meta.json"
-                json_str = meta_file.read_text()
-                id = UUID(event_service_dir.name)
-                event_services[id] = EventService(
-                    stored=StoredConversation.model_validate_json(json_str),
-                    file_store_path=self.event_services_path / id.hex,
-                    working_dir=self.workspace_path / id.hex,
-                )
+                await self.hibernate_idle_conversations()
+                await self.mcp_pool.evict_idle()
             except Exception:
-                logger.exception(
-                    f"error_loading_event_service:{event_service_dir}", stack_info=True
-                )
-                shutil.rmtree(event_service_dir)
-        self._event_services = event_services
+                logger.exception("error_hibernating_conversations", stack_info=True)
+
+    def _is_owner(self, conversation_id: UUID) -> bool:
+        """Check whether new conversations with the id given belong here"""
+        if get_shard(conversation_id, self.shard_count) != self.shard_index:
+            return False
+        if self.hash_ring is None:
+            return True
+        return self.hash_ring.get_node(conversation_id) == self.node_url
+
+    def _create_event_service(
+        self,
+        stored: StoredConversation,
+        status: AgentExecutionStatus | None = None,
+    ) -> EventService:
+        return EventService(
+            stored=stored,
+            file_store_path=self.event_services_path / stored.id.hex,
+            working_dir=self.workspace_path / stored.id.hex,
+            conversation_store=self._get_conversation_store(),
+            run_scheduler=self.run_scheduler,
+            mcp_pool=self.mcp_pool,
+            event_store=self.event_store,
+            event_hot_size=self.event_hot_size,
+            event_cache_size=self.event_cache_size,
+            event_fsync=self.event_fsync,
+            file_io=self.file_io,
+            status=status,
+        )
+
+    def _get_conversation_store(self) -> ConversationStore:
+        if self.conversation_store is None:
+            self.conversation_store = FileConversationStore(self.event_services_path)
+        return self.conversation_store
+
+    async def _add_event_service(self, event_service: EventService):
+        assert self._event_services is not None
+        self._event_services[event_service.stored.id] = event_service
+        listener = _EventListener(
+            service=event_service,
+            index=self._conversation_index,
+            checkpointer=self._checkpointer,
+        )
+        await event_service.subscribe_to_events(listener, max_queue_size=None)
+        # Some changes in status publish no event (e.g.: A run finishing)
+        await event_service.subscribe_to_status(listener.on_status_changed)
+        await listener.update_index()
+
+    async def _get_conversation_info(
+        self, event_service: EventService
+    ) -> ConversationInfo:
+        # Construct from the fields of the stored conversation directly rather than
+        # dumping and revalidating all of them (including llm and agent_context)
+        return ConversationInfo.model_construct(
+            **dict(event_service.stored), status=await event_service.get_status()
+        )
+
+    async def __aenter__(self):
+        await self.file_io.mkdir(self.event_services_path, exist_ok=True)
+        self._trash = Trash(
+            [self.event_services_path, self.workspace_path],
+            file_io=self.file_io,
+            max_concurrent=self.trash_reap_concurrency,
+            reap_leftovers=self.prepare_storage,
+        )
+        await self._trash.__aenter__()
+        self._event_services = {}
+        self._conversation_index = ConversationIndex()
+        self._startup_progress = StartupProgress()
+        await self._get_conversation_store().__aenter__()
+        self._checkpointer = MetaCheckpointer(
+            self._get_conversation_store(),
+            debounce=self.checkpoint_debounce,
+            max_staleness=self.checkpoint_max_staleness,
+        )
+        await self._checkpointer.__aenter__()
+        self._bind_metrics()
+        self._loading_task = asyncio.create_task(self._load_conversations())
+        if self.idle_timeout is not None or self.max_active_conversations is not None:
+            self._hibernation_task = asyncio.create_task(self._hibernation_loop())
         return self
 
+    def _bind_metrics(self):
+        """Bind gauges for state tracked by the service, which are evaluated when
+        metrics are scraped"""
+        for status in AgentExecutionStatus:
+            CONVERSATIONS.labels(status.value).set_function(
+                lambda status=status: self._conversation_index.count(status)
+            )
+        EVENT_SUBSCRIBERS.set_function(
+            lambda: sum(
+                event_service.get_subscriber_count()
+                for event_service in (self._event_services or {}).values()
+            )
+        )
+        RUNS_ACTIVE.set_function(self.run_scheduler.get_running_count)
+        RUNS_PENDING.set_function(self.run_scheduler.get_pending_count)
+        EXECUTOR_QUEUE_DEPTH.labels("control").set_function(
+            self.run_scheduler.get_control_queue_depth
+        )
+        EXECUTOR_QUEUE_DEPTH.labels("file_io").set_function(
+            self.file_io.get_queue_depth
+        )
+
     async def __aexit__(self, exc_type, exc_value, traceback):
         event_services = self._event_services
         if event_services is None:
             return
         self._event_services = None
+        for task in (self._loading_task, self._hibernation_task):
+            if task:
+                task.cancel()
+        self._loading_task = None
+        self._hibernation_task = None
         # This stops convesations and saves meta
         await asyncio.gather(
             *[
@@ -176,21 +527,118 @@ class ConversationService:
                 for event_service in event_services.values()
             ]
         )
+        if self._checkpointer:
+            await self._checkpointer.__aexit__(exc_type, exc_value, traceback)
+            self._checkpointer = None
+        await self._get_conversation_store().__aexit__(exc_type, exc_value, traceback)
+        if self._trash:
+            await self._trash.__aexit__(exc_type, exc_value, traceback)
+            self._trash = None
+        if self.agent_pool:
+            await self.agent_pool.close()
+        await self.mcp_pool.close()
+        self.run_scheduler.shutdown()
+        self.file_io.close()
 
     @classmethod
     def get_instance(cls, config: Config) -> "ConversationService":
+        file_io = AsyncFileIO(max_workers=config.file_io_workers)
+        conversation_store: ConversationStore = FileConversationStore(
+            config.conversations_path,
+            load_concurrency=config.startup_load_concurrency,
+            fsync=config.metadata_fsync,
+            file_io=file_io,
+        )
+        if config.metadata_store == "sqlite":
+            conversation_store = create_sqlite_store(config, file_io)
+        mcp_pool = MCPPool(
+            idle_ttl=config.mcp_pool_idle_ttl, max_size=config.mcp_pool_max_size
+        )
+        agent_pool = None
+        if config.agent_pool_size:
+            agent_pool = AgentPool(
+                mcp_pool=mcp_pool,
+                size=config.agent_pool_size,
+                max_profiles=config.agent_pool_max_profiles,
+            )
+        hash_ring = None
+        if config.cluster_nodes:
+            hash_ring = HashRing(config.cluster_nodes, config.cluster_virtual_nodes)
         return ConversationService(
             event_services_path=config.conversations_path,
             workspace_path=config.workspace_path,
+            conversation_store=conversation_store,
+            idle_timeout=config.conversation_idle_timeout,
+            max_active_conversations=config.max_active_conversations,
+            max_concurrent_starts=config.max_concurrent_starts,
+            max_batch_size=config.max_batch_size,
+            event_store=config.event_store,
+            event_hot_size=config.event_hot_size,
+            event_cache_size=config.event_cache_size,
+            event_fsync=config.metadata_fsync,
+            checkpoint_debounce=config.metadata_checkpoint_debounce,
+            checkpoint_max_staleness=config.metadata_checkpoint_max_staleness,
+            trash_reap_concurrency=config.trash_reap_concurrency,
+            prepare_storage=config.prepare_storage,
+            file_io=file_io,
+            run_scheduler=RunScheduler(
+                max_running=config.max_running_conversations,
+                control_workers=config.control_workers,
+            ),
+            mcp_pool=mcp_pool,
+            agent_pool=agent_pool,
+            shard_index=config.shard_index,
+            shard_count=config.shard_count,
+            hash_ring=hash_ring,
+            node_url=config.cluster_node_url,
         )
 
 
 @dataclass
 class _EventListener:
     service: EventService
+    index: ConversationIndex
+    checkpointer: MetaCheckpointer | None = None
 
     async def __call__(self, event: Event):
         self.service.stored.updated_at = utc_now()
+        if self.checkpointer:
+            self.checkpointer.mark_dirty(self.service)
+        await self.update_index()
+
+    async def on_status_changed(self, status: AgentExecutionStatus):
+        await self.update_index()
+
+    async def update_index(self):
+        stored = self.service.stored
+        self.index.update(
+            stored.id,
+            stored.created_at,
+            stored.updated_at,
+            await self.service.get_status(),
+        )
+
+
+def create_sqlite_store(
+    config: Config, file_io: AsyncFileIO
+) -> SqliteConversationStore:
+    return SqliteConversationStore(
+        db_path=config.conversations_path / "conversations.db",
+        import_path=config.conversations_path if config.prepare_storage else None,
+        fsync=config.metadata_fsync,
+        migrate=config.prepare_storage,
+        file_io=file_io,
+    )
+
+
+async def prepare_storage(config: Config, file_io: AsyncFileIO):
+    """Prepare storage shared by several processes once, before they start (See
+    Config.prepare_storage) - migrating the metadata database and importing
+    meta.json files into it. The trash left by a previous run is not reaped here,
+    but by a Trash opened with reap_leftovers in one of the processes."""
+    if config.metadata_store == "sqlite":
+        async with create_sqlite_store(config, file_io):
+            pass
 
 
 _conversation_service: ConversationService | None = None
@@ -0,0 +1,428 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import AsyncIterator
+from uuid import UUID, uuid4
+
+import aiosqlite
+from alembic import command
+from alembic.config import Config as AlembicConfig
+
+from openhands.sdk.conversation.state import AgentExecutionStatus
+from openhands_server.sdk_server.file_io import AsyncFileIO, get_default_file_io
+from openhands_server.sdk_server.models import StoredConversation
+
+
+logger = logging.getLogger(__name__)
+MIGRATIONS_PATH = Path(__file__).parent / "migrations"
+QUARANTINE_DIR = ".quarantine"
+# The metadata for a conversation, along with its last saved status (If any)
+StoredWithStatus = tuple[StoredConversation, AgentExecutionStatus | None]
+
+
+class ConversationStore(ABC):
+    """Persistent store for the metadata of conversations. Stores are async
+    context managers - they are opened before use and closed afterwards."""
+
+    @abstractmethod
+    def iter_all(self) -> AsyncIterator[StoredWithStatus]:
+        """Load the metadata for all conversations, yielding each along with its
+        last saved status as it is loaded (In no particular order)"""
+
+    @abstractmethod
+    async def count_all(self) -> int:
+        """Get the number of conversations in the store"""
+
+    @abstractmethod
+    async def get(self, conversation_id: UUID) -> StoredWithStatus | None:
+        """Get the metadata for a conversation along with its last saved status,
+        or None if it was not found"""
+
+    @abstractmethod
+    async def batch_get(
+        self, conversation_ids: list[UUID]
+    ) -> list[StoredWithStatus | None]:
+        """Get the metadata for a batch of conversations along with their last
+        saved statuses, returning None for any which were not found"""
+
+    @abstractmethod
+    async def save(
+        self, stored: StoredConversation, status: AgentExecutionStatus | None = None
+    ) -> None:
+        """Save the metadata for a conversation along with its latest status"""
+
+    async def save_all(self, items: list[StoredWithStatus]) -> None:
+        """Save the metadata for a batch of conversations along with their latest
+        statuses. Conversations which have been deleted are not recreated."""
+        for stored, status in items:
+            await self.save(stored, status)
+
+    @abstractmethod
+    async def delete(self, conversation_id: UUID) -> bool:
+        """Delete the metadata for a conversation"""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+@dataclass
+class FileConversationStore(ConversationStore):
+    """Store which keeps the metadata for each conversation (And its status, if
+    known) in a meta.json file within the directory for the conversation. Files
+    are replaced atomically (And
+    synced to disk before being renamed into place if fsync is set). All other
+    file access is done through the file_io given, off the event loop.
+
+    Directories with a meta.json which cannot be loaded (e.g.: Written by a newer
+    version of the server) are moved to a .quarantine directory rather than
+    deleted, so they may be recovered."""
+
+    event_services_path: Path
+    load_concurrency: int = 16
+    fsync: bool = True
+    file_io: AsyncFileIO = field(default_factory=get_default_file_io)
+
+    async def iter_all(self) -> AsyncIterator[StoredWithStatus]:
+        """Reads and validates meta.json files in the file_io pool, keeping at most
+        load_concurrency reads in flight so the event loop remains free to serve
+        requests (and the pool to serve other file access) while loading."""
+        event_service_dirs = iter(await self.file_io.run(self._list_event_service_dirs))
+        pending: set[asyncio.Future[StoredWithStatus | None]] = set()
+        try:
+            while True:
+                for event_service_dir in event_service_dirs:
+                    pending.add(
+                        asyncio.ensure_future(
+                            self.file_io.run(self._load_meta_file, event_service_dir)
+                        )
+                    )
+                    if len(pending) >= self.load_concurrency:
+                        break
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for future in done:
+                    result = future.result()
+                    if result:
+                        yield result
+        finally:
+            # Closing the iterator early does not wait for reads in flight
+            for future in pending:
+                future.cancel()
+
+    async def count_all(self) -> int:
+        event_service_dirs = await self.file_io.run(self._list_event_service_dirs)
+        return len(event_service_dirs)
+
+    def _list_event_service_dirs(self) -> list[Path]:
+        if not self.event_services_path.exists():
+            return []
+        # Hidden directories (e.g.: the trash) are not conversations
+        return [
+            path
+            for path in self.event_services_path.iterdir()
+            if path.is_dir() and not path.name.startswith(".")
+        ]
+
+    def _load_meta_file(self, event_service_dir: Path) -> StoredWithStatus | None:
+        meta_file = event_service_dir / "meta.json"
+        if not meta_file.exists():
+            # Either being created right now, or deleted (Or kept in another
+            # store) - skip it either way
+            return None
+        try:
+            return _parse_meta(meta_file.read_text())
+        except Exception:
+            logger.exception(
+                f"error_loading_event_service:{event_service_dir}", stack_info=True
+            )
+            self._quarantine(event_service_dir)
+            return None
+
+    def _quarantine(self, event_service_dir: Path):
+        quarantine_dir = self.event_services_path / QUARANTINE_DIR
+        target = quarantine_dir / f"{event_service_dir.name}.{uuid4().hex}"
+        try:
+            quarantine_dir.mkdir(exist_ok=True)
+            event_service_dir.rename(target)
+        except OSError:
+            logger.exception(f"error_quarantining_event_service:{event_service_dir}")
+            return
+        logger.warning(f"quarantined_event_service:{event_service_dir}:{target}")
+
+    async def get(self, conversation_id: UUID) -> StoredWithStatus | None:
+        data = await self.file_io.read_text(self._get_meta_file(conversation_id))
+        if data is None:
+            return None
+        return _parse_meta(data)
+
+    async def batch_get(
+        self, conversation_ids: list[UUID]
+    ) -> list[StoredWithStatus | None]:
+        return [await self.get(conversation_id) for conversation_id in conversation_ids]
+
+    async def save(
+        self, stored: StoredConversation, status: AgentExecutionStatus | None = None
+    ) -> None:
+        await self.file_io.run(
+            self._write, self._get_meta_file(stored.id), _dump_meta(stored, status)
+        )
+
+    def _write(self, meta_file: Path, data: str):
+        meta_file.parent.mkdir(parents=True, exist_ok=True)
+        _write_atomic(meta_file, data, self.fsync)
+
+    async def save_all(self, items: list[StoredWithStatus]) -> None:
+        # Serialize here rather than in the thread, as the event loop may be
+        # modifying the objects
+        files = [
+            (self._get_meta_file(stored.id), _dump_meta(stored, status))
+            for stored, status in items
+        ]
+        await self.file_io.run(self._write_all, files)
+
+    def _write_all(self, files: list[tuple[Path, str]]):
+        for meta_file, data in files:
+            if meta_file.parent.exists():
+                _write_atomic(meta_file, data, self.fsync)
+
+    async def delete(self, conversation_id: UUID) -> bool:
+        return await self.file_io.unlink(self._get_meta_file(conversation_id))
+
+    def _get_meta_file(self, conversation_id: UUID) -> Path:
+        return self.event_services_path / conversation_id.hex / "meta.json"
+
+
+@dataclass
+class SqliteConversationStore(ConversationStore):
+    """Store which keeps the metadata for conversations in a SQLite database (In
+    WAL mode), with indexed columns for status and timestamps. The schema is
+    managed with alembic, and migrated when the store is opened. If an import_path
+    is given, meta.json files from a FileConversationStore there are imported the
+    first time the database is opened. If fsync is set, every commit is synced to
+    disk (Otherwise only checkpoints of the WAL are). Processes sharing the
+    database (e.g.: Workers) should open it with migrate unset, once it has been
+    migrated by one of them. Filesystem access outside the database (Creating its
+    directory, migrating and importing) is done through the file_io given, off the
+    event loop."""
+
+    db_path: Path
+    import_path: Path | None = None
+    fsync: bool = True
+    migrate: bool = True
+    file_io: AsyncFileIO = field(default_factory=get_default_file_io)
+    _connection: aiosqlite.Connection | None = field(default=None, init=False)
+
+    async def iter_all(self) -> AsyncIterator[StoredWithStatus]:
+        connection = self._get_connection()
+        async with connection.execute(
+            "SELECT data, status FROM conversations ORDER BY created_at"
+        ) as cursor:
+            async for row in cursor:
+                yield _from_row(row[0], row[1])
+
+    async def count_all(self) -> int:
+        connection = self._get_connection()
+        async with connection.execute("SELECT COUNT(*) FROM conversations") as cursor:
+            row = await cursor.fetchone()
+        return row[0] if row else 0
+
+    async def get(self, conversation_id: UUID) -> StoredWithStatus | None:
+        results = await self.batch_get([conversation_id])
+        return results[0]
+
+    async def batch_get(
+        self, conversation_ids: list[UUID]
+    ) -> list[StoredWithStatus | None]:
+        if not conversation_ids:
+            return []
+        connection = self._get_connection()
+        placeholders = ",".join("?" * len(conversation_ids))
+        async with connection.execute(
+            f"SELECT id, data, status FROM conversations WHERE id IN ({placeholders})",
+            [conversation_id.hex for conversation_id in conversation_ids],
+        ) as cursor:
+            rows = {row[0]: row[1:] async for row in cursor}
+        return [
+            _from_row(*rows[conversation_id.hex])
+            if conversation_id.hex in rows
+            else None
+            for conversation_id in conversation_ids
+        ]
+
+    async def save(
+        self, stored: StoredConversation, status: AgentExecutionStatus | None = None
+    ) -> None:
+        connection = self._get_connection()
+        await connection.execute(_UPSERT_SQL, _to_row(stored, status))
+        await connection.commit()
+
+    async def save_all(self, items: list[StoredWithStatus]) -> None:
+        # Upsert only rows which still exist (or none would be recreated after a
+        # delete), all in a single transaction
+        connection = self._get_connection()
+        await connection.executemany(
+            _UPDATE_SQL,
+            [
+                _to_row(stored, status)[1:] + (stored.id.hex,)
+                for stored, status in items
+            ],
+        )
+        await connection.commit()
+
+    async def delete(self, conversation_id: UUID) -> bool:
+        connection = self._get_connection()
+        cursor = await connection.execute(
+            "DELETE FROM conversations WHERE id = ?", [conversation_id.hex]
+        )
+        await connection.commit()
+        return cursor.rowcount > 0
+
+    async def __aenter__(self):
+        await self.file_io.mkdir(self.db_path.parent, exist_ok=True)
+        if self.migrate:
+            await self.file_io.run(run_migrations, self.db_path)
+        connection = await aiosqlite.connect(self.db_path)
+        await connection.execute("PRAGMA journal_mode=WAL")
+        synchronous = "FULL" if self.fsync else "NORMAL"
+        await connection.execute(f"PRAGMA synchronous={synchronous}")
+        self._connection = connection
+        if self.import_path:
+            await self._import_meta_files(self.import_path)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        connection = self._connection
+        if connection:
+            self._connection = None
+            await connection.close()
+
+    async def _import_meta_files(self, import_path: Path):
+        """One time import of metadata from the meta.json layout. The
+        user_version pragma records that the import was done, and is updated in
+        the same transaction as the imported rows."""
+        connection = self._get_connection()
+        async with connection.execute("PRAGMA user_version") as cursor:
+            row = await cursor.fetchone()
+        if row and row[0] > 0:
+            return
+        stored_conversations = [
+            item
+            async for item in FileConversationStore(
+                import_path, file_io=self.file_io
+            ).iter_all()
+        ]
+        await connection.executemany(
+            _UPSERT_SQL,
+            [_to_row(stored, status) for stored, status in stored_conversations],
+        )
+        await connection.execute("PRAGMA user_version = 1")
+        await connection.commit()
+        logger.info(f"imported_conversations:{len(stored_conversations)}")
+
+    def _get_connection(self) -> aiosqlite.Connection:
+        if self._connection is None:
+            raise ValueError("inactive_service")
+        return self._connection
+
+
+_UPSERT_SQL = """
+INSERT INTO conversations (id, status, created_at, updated_at, data)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    status = COALESCE(excluded.status, conversations.status),
+    created_at = excluded.created_at,
+    updated_at = excluded.updated_at,
+    data = excluded.data
+"""
+
+_UPDATE_SQL = """
+UPDATE conversations
+SET status = COALESCE(?, status), created_at = ?, updated_at = ?, data = ?
+WHERE id = ?
+"""
+
+
+def _to_row(stored: StoredConversation, status: AgentExecutionStatus | None):
+    return (
+        stored.id.hex,
+        status.value if status else None,
+        _to_column(stored.created_at),
+        _to_column(stored.updated_at),
+        stored.model_dump_json(),
+    )
+
+
+def _from_row(data: str, status: str | None) -> StoredWithStatus:
+    stored = StoredConversation.model_validate_json(data)
+    return stored, AgentExecutionStatus(status) if status else None
+
+
+def _dump_meta(stored: StoredConversation, status: AgentExecutionStatus | None) -> str:
+    """Serialize the contents of a meta.json file - the stored conversation, with
+    the status alongside its fields"""
+    data = stored.model_dump(mode="json")
+    if status:
+        data["status"] = status.value
+    return json.dumps(data)
+
+
+def _parse_meta(data: str) -> StoredWithStatus:
+    fields = json.loads(data)
+    status = fields.pop("status", None)
+    stored = StoredConversation.model_validate(fields)
+    return stored, AgentExecutionStatus(status) if status else None
+
+
+def _to_column(value: datetime) -> str:
+    # ISO strings in UTC sort chronologically, so the indexes on these columns may
+    # be used for ordering
+    return value.astimezone(UTC).isoformat()
+
+
+def _write_atomic(path: Path, data: str, fsync: bool):
+    """Replace the file at the path given, so that readers (and the file after a
+    crash) see either the old or the new content, never a partial write. If fsync
+    is set, the directory is also synced so the rename itself survives a crash."""
+    fd, temp_path = tempfile.mkstemp(
+        dir=path.parent, prefix=f"{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+    if fsync:
+        _fsync_dir(path.parent)
+
+
+def _fsync_dir(path: Path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def run_migrations(db_path: Path):
+    """Migrate the database at the path given to the latest schema"""
+    config = AlembicConfig()
+    config.set_main_option("script_location", str(MIGRATIONS_PATH))
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{db_path}")
+    command.upgrade(config, "head")
@@ -0,0 +1,141 @@
+"""
+Diagnostics which are cheap enough to leave enabled in production: a monitor of
+the lag of the event loop (Which logs the stack of the loop whenever it is
+blocked for too long), and a sampling profiler for the whole process.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from dataclasses import dataclass, field
+from types import CodeType, FrameType
+
+from openhands_server.sdk_server.metrics import (
+    LOOP_BLOCKED,
+    LOOP_LAG,
+    LOOP_LAG_MAX,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a task which sleeps for interval
+    seconds, recording the lag in a histogram along with the max lag over the
+    last window seconds.
+
+    A watchdog thread checks that the loop is still making progress. If it has
+    been blocked for longer than block_threshold seconds, the stack of the loop
+    thread is logged (Once per blocking stretch) - showing what is blocking it
+    while it is still blocked, rather than after the fact.
+    """
+
+    interval: float = 0.1
+    block_threshold: float | None = 0.5
+    window: float = 60
+    _task: asyncio.Task | None = field(default=None, init=False)
+    _watchdog: threading.Thread | None = field(default=None, init=False)
+    _stopped: threading.Event = field(default_factory=threading.Event, init=False)
+    _loop_thread_id: int | None = field(default=None, init=False)
+    _last_tick: float = field(default=0, init=False)
+    _max_lag: float = field(default=0, init=False)
+    _previous_max_lag: float = field(default=0, init=False)
+    _window_start: float = field(default=0, init=False)
+
+    def get_max_lag(self) -> float:
+        """Get the max lag over at least the last window seconds"""
+        return max(self._max_lag, self._previous_max_lag)
+
+    async def _run(self):
+        lag_histogram = LOOP_LAG.labels()
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_tick = now
+            lag = max(now - start - self.interval, 0)
+            lag_histogram.observe(lag)
+            if now - self._window_start >= self.window:
+                self._previous_max_lag = self._max_lag
+                self._max_lag = 0
+                self._window_start = now
+            self._max_lag = max(self._max_lag, lag)
+
+    def _watch(self):
+        assert self.block_threshold is not None
+        reported_tick = None
+        while not self._stopped.wait(self.interval):
+            last_tick = self._last_tick
+            blocked = time.monotonic() - last_tick
+            if blocked < self.block_threshold or last_tick == reported_tick:
+                continue
+            reported_tick = last_tick
+            # Only ever updated from this thread
+            LOOP_BLOCKED.inc()
+            frame = sys._current_frames().get(self._loop_thread_id or 0)
+            stack = "".join(traceback.format_stack(frame)) if frame else ""
+            logger.warning(f"event_loop_blocked:{blocked:.3f}\n{stack}")
+
+    async def __aenter__(self):
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = self._window_start = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+        LOOP_LAG_MAX.set_function(self.get_max_lag)
+        if self.block_threshold is not None:
+            self._stopped.clear()
+            self._watchdog = threading.Thread(
+                target=self._watch, name="loop_watchdog", daemon=True
+            )
+            self._watchdog.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._watchdog = None
+
+
+def sample_stacks(duration: float, interval: float = 0.005) -> str:
+    """Sample the stacks of every thread in the process (The event loop, agent
+    runs and executor threads) every interval seconds for the duration given,
+    blocking until done. Returns the samples in the collapsed stack format used
+    by flamegraph.pl / speedscope: one line per distinct stack, with the name of
+    the thread followed by frames from the root separated by semicolons, then the
+    number of samples."""
+    own_thread_id = threading.get_ident()
+    counts: Counter[tuple[str, ...]] = Counter()
+    labels: dict[CodeType, str] = {}
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread_id:
+                continue
+            stack = [names.get(thread_id, str(thread_id))]
+            stack.extend(reversed(list(_walk(frame, labels))))
+            counts[tuple(stack)] += 1
+        time.sleep(interval)
+    lines = [f"{';'.join(stack)} {count}" for stack, count in counts.most_common()]
+    lines.append("")
+    return "\n".join(lines)
+
+
+def _walk(frame: FrameType | None, labels: dict[CodeType, str]):
+    while frame is not None:
+        code = frame.f_code
+        label = labels.get(code)
+        if label is None:
+            # Labels are cached by code object, as formatting them is the bulk of
+            # the cost of a sample
+            label = f"{code.co_qualname} ({code.co_filename}:{code.co_firstlineno})"
+            label = labels[code] = label.replace(";", ":")
+        yield label
+        frame = frame.f_back
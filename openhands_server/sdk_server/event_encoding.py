@@ -0,0 +1,133 @@
+import json
+from collections import OrderedDict
+from enum import Enum
+from typing import Any
+
+from openhands.sdk import EventBase
+
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack is an optional dependency
+    msgpack = None
+
+
+class EventEncoding(Enum):
+    """Wire encodings for events sent over a WebSocket."""
+
+    JSON = "openhands.json"
+    MSGPACK = "openhands.msgpack"
+
+
+def get_supported_encodings() -> list[EventEncoding]:
+    """Get the encodings available in this environment"""
+    if msgpack is None:
+        return [EventEncoding.JSON]
+    return [EventEncoding.JSON, EventEncoding.MSGPACK]
+
+
+def negotiate_encoding(subprotocols: list[str]) -> EventEncoding | None:
+    """Select the encoding for a WebSocket from the subprotocols requested by the
+    client (In order of client preference). Returns None if the client did not
+    request a supported subprotocol, in which case JSON is used without one."""
+    supported = {encoding.value: encoding for encoding in get_supported_encodings()}
+    for subprotocol in subprotocols:
+        encoding = supported.get(subprotocol)
+        if encoding:
+            return encoding
+    return None
+
+
+def decode_message(data: str | bytes, encoding: EventEncoding) -> Any:
+    """Decode a message received from a client"""
+    if isinstance(data, bytes) and encoding == EventEncoding.MSGPACK:
+        assert msgpack is not None
+        return msgpack.unpackb(data)
+    return json.loads(data)
+
+
+class EncodedEventCache:
+    """LRU cache of encoded events, keyed on event id and encoding. Events are
+    immutable once published, so when an event is broadcast to many subscribers
+    it is serialized once and the same buffer is sent to every one of them.
+
+    The cache is bounded by the total size of the encoded events rather than their
+    number, as a single observation may be megabytes. Events larger than the
+    bound are encoded on every call and never cached."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[str, EventEncoding | None], str | bytes] = (
+            OrderedDict()
+        )
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def size(self) -> int:
+        """The total size of the encoded events in the cache"""
+        return self._size
+
+    def encode(self, event: EventBase, encoding: EventEncoding) -> bytes:
+        """Get the event encoded as bytes, to be sent as a binary frame"""
+        return self._get(event, encoding)  # type: ignore[return-value]
+
+    def encode_text(self, event: EventBase) -> str:
+        """Get the event encoded as JSON text, for clients which did not negotiate
+        a subprotocol and so expect text frames"""
+        return self._get(event, None)  # type: ignore[return-value]
+
+    def _get(self, event: EventBase, encoding: EventEncoding | None) -> str | bytes:
+        key = (event.id, encoding)
+        encoded = self._entries.get(key)
+        if encoded is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return encoded
+        self.misses += 1
+        if encoding is None:
+            encoded = event.model_dump_json()
+        else:
+            encoded = encode_event(event, encoding)
+        if len(encoded) <= self.max_bytes:
+            self._entries[key] = encoded
+            self._size += len(encoded)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+        return encoded
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+
+def encode_event(event: EventBase, encoding: EventEncoding) -> bytes:
+    """Encode an event as bytes (UTF-8 for JSON)"""
+    if encoding == EventEncoding.MSGPACK:
+        assert msgpack is not None
+        return msgpack.packb(event.model_dump(mode="json"))
+    return event.model_dump_json().encode()
+
+
+def encode_batch(
+    encoded_events: list[str | bytes], encoding: EventEncoding
+) -> str | bytes:
+    """Combine already encoded events into a single array, without decoding and
+    re-encoding them. JSON text events are combined into text."""
+    if encoding == EventEncoding.MSGPACK:
+        assert msgpack is not None
+        header = msgpack.Packer().pack_array_header(len(encoded_events))
+        return header + b"".join(encoded_events)  # type: ignore[arg-type]
+    if encoded_events and isinstance(encoded_events[0], str):
+        return "[" + ",".join(encoded_events) + "]"  # type: ignore[arg-type]
+    return b"[" + b",".join(encoded_events) + b"]"  # type: ignore[arg-type]
+
+
+_encoded_event_cache = EncodedEventCache()
+
+
+def get_default_encoded_event_cache() -> EncodedEventCache:
+    """Get the cache of encoded events shared across the server"""
+    return _encoded_event_cache
@@ -0,0 +1,291 @@
+import base64
+import binascii
+import heapq
+import threading
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Sequence
+
+from openhands.sdk import EventBase
+from openhands_server.sdk_server.models import EventPage, EventSortOrder
+
+
+@dataclass
+class EventIndex:
+    """Index mapping event ids to their position within the append only list of
+    events for a conversation, so that events may be looked up without a scan.
+
+    The index is maintained incrementally as events are published (It is a valid
+    PubSub callback), and is lazily caught up with / rebuilt from the list of events
+    when it is behind or inconsistent (e.g.: after a conversation is loaded).
+
+    The positions of events of each kind are also indexed, so that filtering by
+    kind does not scan every event. The kinds of events published are indexed as
+    they are appended. The kinds of events loaded by id alone (e.g.: listed from
+    the file store) are indexed on the first filtered read, which decodes each of
+    them once (outside of the lock, so appends are never blocked by it).
+    """
+
+    _positions: dict[str, int] = field(default_factory=dict)
+    _ids: list[str] = field(default_factory=list)
+    _loaded: bool = False
+    _kind_positions: dict[str, array] = field(default_factory=dict)
+    # The kinds of all positions below this are in _kind_positions
+    _num_kinds_indexed: int = 0
+    _kinds_lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def sync(self, events: Sequence[EventBase]) -> None:
+        """Bring the index up to date with the list of events given. This is O(1)
+        when the index is current and O(new events) when it is behind."""
+        num_indexed = len(self._ids)
+        if num_indexed > len(events) or (
+            num_indexed and events[num_indexed - 1].id != self._ids[-1]
+        ):
+            # The list of events was replaced - rebuild from scratch.
+            self.clear()
+            num_indexed = 0
+        for position in range(num_indexed, len(events)):
+            event = events[position]
+            self.append(event.id, type(event).__name__)
+        self._loaded = True
+
+    def reset(self, event_ids: list[str]) -> None:
+        """Replace the contents of the index with the ids of all events given in
+        order (e.g.: As listed from the file store)"""
+        self.clear()
+        for event_id in event_ids:
+            self.append(event_id)
+        self._loaded = True
+
+    def get_id(self, position: int) -> str:
+        return self._ids[position]
+
+    def get_position(self, event_id: str) -> int | None:
+        """Get the position of the event with the id given, or None if the event
+        was not indexed."""
+        return self._positions.get(event_id)
+
+    def find(self, events: Sequence[EventBase], event_id: str) -> int | None:
+        """Sync with the events given, and get the position of the event with the
+        id given within them (or None if there is no such event)"""
+        self.sync(events)
+        position = self._positions.get(event_id)
+        if position is not None and events[position].id != event_id:
+            # Positions assigned from published events did not match the list
+            self.clear()
+            self.sync(events)
+            position = self._positions.get(event_id)
+        return position
+
+    def clear(self) -> None:
+        """Clear the index so that it is rebuilt on the next sync."""
+        self._positions.clear()
+        self._ids.clear()
+        self._loaded = False
+        with self._kinds_lock:
+            self._kind_positions = {}
+            self._num_kinds_indexed = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    async def __call__(self, event: EventBase) -> None:
+        # Events published before the index was loaded will be picked up by the
+        # next sync - appending them now would assign the wrong position.
+        if self._loaded:
+            self.append(event.id, type(event).__name__)
+
+    def append(self, event_id: str, kind: str | None = None) -> bool:
+        """Add the id of an event (and its kind, if known) to the end of the
+        index, returning False if it was already indexed"""
+        if event_id in self._positions:
+            return False
+        position = len(self._ids)
+        self._positions[event_id] = position
+        if kind is not None and self._num_kinds_indexed == position:
+            with self._kinds_lock:
+                if self._num_kinds_indexed == position:
+                    self._kind_positions.setdefault(kind, array("q")).append(position)
+                    self._num_kinds_indexed = position + 1
+        # Appended last, as readers in other threads use the length of the index
+        # as a watermark below which ids are safe to read
+        self._ids.append(event_id)
+        return True
+
+    def sync_kinds(self, events: Sequence[EventBase], batch_size: int = 256):
+        """Index the kinds of any indexed events whose kinds are not yet known.
+        Sequences which can get the kind of an event more cheaply than the event
+        itself (e.g.: without caching it) may provide a get_kind(position)."""
+        get_kind = getattr(events, "get_kind", None) or (
+            lambda position: type(events[position]).__name__
+        )
+        while True:
+            start = self._num_kinds_indexed
+            end = min(len(self._ids), start + batch_size)
+            if start >= end:
+                return
+            kinds = [get_kind(position) for position in range(start, end)]
+            with self._kinds_lock:
+                if self._num_kinds_indexed != start:
+                    # Another reader indexed these first
+                    continue
+                for position, kind in enumerate(kinds, start):
+                    self._kind_positions.setdefault(kind, array("q")).append(position)
+                self._num_kinds_indexed = end
+
+    def iter_kind_positions(
+        self,
+        events: Sequence[EventBase],
+        kinds: set[str],
+        start: int,
+        end: int,
+        reverse: bool = False,
+    ) -> Iterator[int]:
+        """Iterate over the positions in [start, end) of events of the kinds given,
+        in order (Or in reverse order)"""
+        self.sync_kinds(events)
+        with self._kinds_lock:
+            num_indexed = self._num_kinds_indexed
+            kind_positions = [self._kind_positions.get(kind) for kind in kinds]
+        indexed_end = min(end, num_indexed)
+        ranges = []
+        for positions in kind_positions:
+            if positions:
+                lo = bisect_left(positions, start)
+                hi = bisect_left(positions, indexed_end, lo)
+                if lo < hi:
+                    ranges.append((positions, lo, hi))
+        # Events appended since the kinds were synced are checked directly
+        tail = range(max(start, num_indexed), end)
+        runs = [_iter_slice(positions, lo, hi, reverse) for positions, lo, hi in ranges]
+        if reverse:
+            for position in reversed(tail):
+                if type(events[position]).__name__ in kinds:
+                    yield position
+            yield from heapq.merge(*runs, reverse=True)
+        else:
+            yield from heapq.merge(*runs)
+            for position in tail:
+                if type(events[position]).__name__ in kinds:
+                    yield position
+
+    def resolve_page_id(self, events: Sequence[EventBase], page_id: str) -> int:
+        """Get the position in the events given which a page_id refers to. Cursors
+        encode a position along with the id of the event at that position, so
+        resolving them is O(1) unless the list of events was since rebuilt. Plain
+        event ids are also accepted. Raises a ValueError if the page_id is not
+        valid for the events given."""
+        cursor = decode_page_id(page_id)
+        if cursor:
+            position, event_id = cursor
+            if position < len(events) and events[position].id == event_id:
+                return position
+        else:
+            event_id = page_id
+        position = self.find(events, event_id)
+        if position is None:
+            raise ValueError("invalid_page_id")
+        return position
+
+
+def _iter_slice(positions: array, lo: int, hi: int, reverse: bool) -> Iterator[int]:
+    if reverse:
+        for i in range(hi - 1, lo - 1, -1):
+            yield positions[i]
+    else:
+        for i in range(lo, hi):
+            yield positions[i]
+
+
+def encode_page_id(position: int, event_id: str) -> str:
+    """Encode an opaque cursor for the event at the position given"""
+    cursor = f"{position}:{event_id}".encode()
+    return base64.urlsafe_b64encode(cursor).decode().rstrip("=")
+
+
+def decode_page_id(page_id: str) -> tuple[int, str] | None:
+    """Decode a cursor produced by encode_page_id, returning None if the page_id
+    is not such a cursor"""
+    try:
+        padding = "=" * (-len(page_id) % 4)
+        cursor = base64.urlsafe_b64decode(page_id + padding).decode()
+        position, event_id = cursor.split(":", 1)
+        return int(position), event_id
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def get_event_timestamp(event: EventBase) -> datetime:
+    """Get the timestamp of an event as a timezone aware datetime"""
+    return as_utc(datetime.fromisoformat(event.timestamp))
+
+
+def as_utc(value: datetime) -> datetime:
+    """Convert a datetime to UTC, treating naive datetimes as local time (Which is
+    what the SDK uses when timestamping events)"""
+    return value.astimezone(UTC)
+
+
+def page_events(
+    events: Sequence[EventBase],
+    index: EventIndex,
+    page_id: str | None = None,
+    limit: int = 100,
+    sort_order: EventSortOrder = EventSortOrder.TIMESTAMP,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    kinds: set[str] | None = None,
+) -> EventPage:
+    """Get a page of events. Events are appended in chronological order, so the
+    timestamp bounds are found with a binary search and the start of the page is
+    resolved directly from the page_id. Positions of the kinds requested come from
+    the index of kinds, so only events in the page are read. The cost of a page
+    does not depend on how deep into the conversation it is, or on how sparse the
+    kinds requested are (After the first filtered read, which indexes the kinds of
+    any events loaded from disk).
+
+    Args:
+        events: The events of the conversation, in the order they were appended
+        index: The index for the events
+        page_id: Optional next_page_id from a previous page
+        limit: The max number of events in the page
+        sort_order: The order in which to return events
+        since: Optional inclusive lower bound for event timestamps
+        until: Optional exclusive upper bound for event timestamps
+        kinds: Optional set of event class names to include
+    Returns:
+        EventPage: The page of events
+    """
+    index.sync(events)
+    start = 0
+    if since:
+        start = bisect_left(events, as_utc(since), key=get_event_timestamp)
+    end = len(events)
+    if until:
+        end = bisect_left(events, as_utc(until), key=get_event_timestamp)
+
+    descending = sort_order == EventSortOrder.TIMESTAMP_DESC
+    if descending:
+        if page_id:
+            end = min(end, index.resolve_page_id(events, page_id) + 1)
+    elif page_id:
+        start = max(start, index.resolve_page_id(events, page_id))
+    if kinds:
+        positions = index.iter_kind_positions(events, kinds, start, end, descending)
+    elif descending:
+        positions = range(end - 1, start - 1, -1)
+    else:
+        positions = range(start, end)
+
+    items = []
+    for position in positions:
+        if len(items) >= limit:
+            return EventPage(
+                items=items,
+                next_page_id=encode_page_id(position, index.get_id(position)),
+            )
+        items.append(events[position])
+    return EventPage(items=items)
@@ -2,9 +2,12 @@
 Local Event router for OpenHands SDK.
 """
 
+import asyncio
 import logging
-from dataclasses import dataclass
-from typing import Annotated
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Annotated, Awaitable, Callable
 from uuid import UUID
 
 from fastapi import (
@@ -18,13 +21,31 @@ from fastapi import (
 from fastapi.websockets import WebSocketState
 
 from openhands.sdk import EventBase, Message
+from openhands.sdk.conversation.state import AgentExecutionStatus
 from openhands_server.sdk_server.conversation_service import (
     get_default_conversation_service,
 )
+from openhands_server.sdk_server.event_encoding import (
+    EncodedEventCache,
+    EventEncoding,
+    decode_message,
+    encode_batch,
+    get_default_encoded_event_cache,
+    negotiate_encoding,
+)
+from openhands_server.sdk_server.event_service import EventService
+from openhands_server.sdk_server.metrics import (
+    WEBSOCKET_CONNECTIONS,
+    WEBSOCKET_SEND_DURATION,
+    WEBSOCKET_SEND_FAILURES,
+)
 from openhands_server.sdk_server.models import (
     ConfirmationResponseRequest,
     EventPage,
+    EventSortOrder,
+    OverflowPolicy,
     SendMessageRequest,
+    SubscriberStats,
     Success,
 )
 
@@ -32,6 +53,10 @@ from openhands_server.sdk_server.models import (
 router = APIRouter(prefix="/conversations/{conversation_id}/events")
 conversation_service = get_default_conversation_service()
 logger = logging.getLogger(__name__)
+StatusGetter = Callable[[], Awaitable[AgentExecutionStatus]]
+_websocket_connections = WEBSOCKET_CONNECTIONS.labels()
+_websocket_send_duration = WEBSOCKET_SEND_DURATION.labels()
+_websocket_send_failures = WEBSOCKET_SEND_FAILURES.labels()
 
 # Read methods
 
@@ -47,6 +72,22 @@ async def search_conversation_events(
         int,
         Query(title="The max number of results in the page", gt=0, lte=100),
     ] = 100,
+    sort_order: Annotated[
+        EventSortOrder,
+        Query(title="The order in which to return events"),
+    ] = EventSortOrder.TIMESTAMP,
+    since: Annotated[
+        datetime | None,
+        Query(title="Optional filter - only events at or after this time"),
+    ] = None,
+    until: Annotated[
+        datetime | None,
+        Query(title="Optional filter - only events before this time"),
+    ] = None,
+    kind: Annotated[
+        list[str] | None,
+        Query(title="Optional filter - only events of these kinds (class names)"),
+    ] = None,
 ) -> EventPage:
     """Search / List local events"""
     assert limit > 0
@@ -54,7 +95,28 @@ async def search_conversation_events(
     event_service = await conversation_service.get_event_service(conversation_id)
     if event_service is None:
         raise HTTPException(status.HTTP_404_NOT_FOUND)
-    return await event_service.search_events(page_id, limit)
+    try:
+        return await event_service.search_events(
+            page_id,
+            limit,
+            sort_order=sort_order,
+            since=since,
+            until=until,
+            kinds=set(kind) if kind else None,
+        )
+    except ValueError as e:
+        if str(e) == "invalid_page_id":
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(e))
+        raise
+
+
+@router.get("/subscribers", responses={404: {"description": "Conversation not found"}})
+async def get_subscriber_stats(conversation_id: UUID) -> list[SubscriberStats]:
+    """Get queue depth and delivery counters for the subscribers to events"""
+    event_service = await conversation_service.get_event_service(conversation_id)
+    if event_service is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND)
+    return await event_service.get_subscriber_stats()
 
 
 @router.get("/{event_id}", responses={404: {"description": "Item not found"}})
@@ -116,35 +178,286 @@ async def respond_to_confirmation(
 async def socket(
     conversation_id: UUID,
     websocket: WebSocket,
+    overflow_policy: Annotated[
+        OverflowPolicy,
+        Query(title="What to do if this client falls too far behind"),
+    ] = OverflowPolicy.DROP_OLDEST,
+    max_queue_size: Annotated[
+        int,
+        Query(title="The max number of events pending for this client", gt=0),
+    ] = 1024,
+    last_event_id: Annotated[
+        str | None,
+        Query(title="Optional id of the last event seen, to replay events after it"),
+    ] = None,
+    batch_window_ms: Annotated[
+        int,
+        Query(
+            title="Optional window in which to combine events into a single frame",
+            ge=0,
+            le=1000,
+        ),
+    ] = 0,
+    max_batch_size: Annotated[
+        int,
+        Query(title="The max number of events in a single frame", gt=0, le=1000),
+    ] = 100,
 ):
-    await websocket.accept()
+    """Subscribe to the events of a conversation, and send it messages.
+
+    Clients reconnecting may resume where they left off by passing last_event_id
+    (Or by sending {"last_event_id": ...} as a frame), in which case the events
+    after it are replayed from the event store before live events, with no gap or
+    duplication at the handoff.
+
+    If batch_window_ms is given, events are sent as JSON arrays (msgpack arrays
+    for binary clients) of up to max_batch_size events, in order. A batch is sent
+    once the window elapses, it is full, or the agent status changes.
+
+    Clients negotiating the openhands.json or openhands.msgpack subprotocol
+    receive events in binary frames (UTF-8 JSON or msgpack respectively), so the
+    cached encoding is sent as is. Other clients receive JSON text frames.
+    """
+    # Clients may request a binary encoding through a subprotocol
+    encoding = negotiate_encoding(websocket.scope.get("subprotocols", []))
+    await websocket.accept(subprotocol=encoding.value if encoding else None)
     event_service = await conversation_service.get_event_service(conversation_id)
     if event_service is None:
         raise HTTPException(status.HTTP_404_NOT_FOUND)
+    await event_service.activate()
+    subscriber = _WebSocketSubscriber(
+        websocket,
+        encoding or EventEncoding.JSON,
+        text_frames=encoding is None,
+        max_buffer_size=max_queue_size,
+    )
+    if batch_window_ms:
+        subscriber.start_batching(
+            batch_window_ms / 1000, max_batch_size, event_service.get_status
+        )
+    if last_event_id:
+        # Buffer live events from the moment of subscription until replay is done
+        subscriber.start_buffering()
     subscriber_id = await event_service.subscribe_to_events(
-        _WebSocketSubscriber(websocket)
+        subscriber, overflow_policy, max_queue_size, subscriber.close, viewer=True
     )
+    status_subscriber_id = None
+    if batch_window_ms:
+        # Flush as soon as the status changes, even if no event follows
+        status_subscriber_id = await event_service.subscribe_to_status(
+            subscriber.on_status_changed
+        )
+    _websocket_connections.inc()
     try:
+        if last_event_id:
+            await subscriber.replay(event_service, last_event_id)
         while websocket.application_state == WebSocketState.CONNECTED:
             try:
-                data = await websocket.receive_json()
+                data = await _receive_data(websocket)
+                data = decode_message(data, subscriber.encoding)
+                if isinstance(data, dict) and "last_event_id" in data:
+                    await subscriber.replay(event_service, data["last_event_id"])
+                    continue
                 message = Message.model_validate(data)
                 await event_service.send_message(message, run=True)
             except WebSocketDisconnect:
-                await event_service.unsubscribe_from_events(subscriber_id)
+                break
             except Exception:
                 logger.exception("error_in_subscription", stack_info=True)
     finally:
+        _websocket_connections.dec()
         await event_service.unsubscribe_from_events(subscriber_id)
+        if status_subscriber_id:
+            await event_service.unsubscribe_from_status(status_subscriber_id)
+        subscriber.stop_batching()
+
+
+async def _receive_data(websocket: WebSocket) -> str | bytes:
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    data = message.get("bytes")
+    if data is None:
+        data = message["text"]
+    return data
 
 
 @dataclass
 class _WebSocketSubscriber:
     websocket: WebSocket
+    encoding: EventEncoding = EventEncoding.JSON
+    encoded_event_cache: EncodedEventCache = field(
+        default_factory=get_default_encoded_event_cache
+    )
+    # Clients which did not negotiate a subprotocol expect JSON in text frames.
+    # Otherwise the cached bytes are sent as binary frames, as ASGI text frames
+    # must be a str and would be encoded again for every socket.
+    text_frames: bool = False
+    # Replay closes the socket if more live events than this arrive meanwhile
+    max_buffer_size: int = 1024
+    _buffer: list[EventBase] | None = field(default=None, init=False)
+    _first_live_event_id: str | None = field(default=None, init=False)
+    # Ids of replayed events which may still be in flight, skipped when received
+    # live until a live event arrives which was not replayed
+    _replayed_ids: set[str] = field(default_factory=set, init=False)
+    _closed: bool = field(default=False, init=False)
+    _batch_window: float = field(default=0, init=False)
+    _max_batch_size: int = field(default=1, init=False)
+    _get_status: StatusGetter | None = field(default=None, init=False)
+    _last_status: AgentExecutionStatus | None = field(default=None, init=False)
+    _batch: list[str | bytes] = field(default_factory=list, init=False)
+    _flush_task: asyncio.Task | None = field(default=None, init=False)
+    _send_lock: asyncio.Lock = field(default_factory=asyncio.Lock, init=False)
 
     async def __call__(self, event: EventBase):
+        if self._closed:
+            return
+        if self._first_live_event_id is None:
+            self._first_live_event_id = event.id
+        if self._buffer is not None:
+            if len(self._buffer) >= self.max_buffer_size:
+                await self.close()
+                return
+            self._buffer.append(event)
+            return
+        if self._replayed_ids:
+            if event.id in self._replayed_ids:
+                self._replayed_ids.discard(event.id)
+                return
+            # Events are received in order, so all later ones are new
+            self._replayed_ids = set()
+        await self.send(event)
+
+    def start_batching(
+        self, batch_window: float, max_batch_size: int, get_status: StatusGetter
+    ):
+        """Combine events into array frames, sent when the window elapses, the
+        batch is full, or the status from get_status changes."""
+        self._batch_window = batch_window
+        self._max_batch_size = max_batch_size
+        self._get_status = get_status
+
+    def stop_batching(self):
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        self._batch_window = 0
+
+    def start_buffering(self):
+        """Hold live events rather than sending them until a replay is done"""
+        if self._buffer is None:
+            self._buffer = []
+
+    async def replay(self, event_service: EventService, last_event_id: str):
+        """Send the events after the one given from the event store, followed by
+        any live events buffered in the meantime. Replay stops at the first event
+        received live (Everything from there on was either already sent or is in
+        the buffer). Replayed events are skipped when received live, whether they
+        were buffered or still in flight once the buffer is flushed."""
+        self.start_buffering()
+        replayed_ids = set()
         try:
-            dumped = event.model_dump()
-            await self.websocket.send_json(dumped)
+            if await event_service.get_event(last_event_id) is None:
+                logger.warning(f"invalid_last_event_id:{last_event_id}")
+                self._closed = True
+                await self.websocket.close(code=1008, reason="invalid_last_event_id")
+                return
+            page_id: str | None = last_event_id
+            while page_id and not self._closed:
+                page = await event_service.search_events(page_id=page_id)
+                page_id = page.next_page_id
+                for event in page.items:
+                    if event.id == last_event_id:
+                        continue
+                    if event.id == self._first_live_event_id or self._closed:
+                        page_id = None
+                        break
+                    replayed_ids.add(event.id)
+                    await self.send(event)
         except Exception:
-            logger.exception("error_sending_event:{event}", stack_info=True)
+            # Live events can not follow an incomplete replay without a gap - the
+            # client should reconnect and replay again
+            if not self._closed:
+                self._closed = True
+                await self.websocket.close(code=1011, reason="error_replaying_events")
+            raise
+        finally:
+            while self._buffer and not self._closed:
+                buffered, self._buffer = self._buffer, []
+                for event in buffered:
+                    if event.id in replayed_ids:
+                        replayed_ids.discard(event.id)
+                    else:
+                        # Received in order, so no later event was replayed
+                        replayed_ids = set()
+                        await self.send(event)
+            self._buffer = None
+            self._replayed_ids = replayed_ids
+            if not self._closed:
+                await self.flush()
+
+    async def send(self, event: EventBase):
+        # Each event is encoded once, and shared by all subscribers
+        encoded: str | bytes
+        if self.text_frames:
+            encoded = self.encoded_event_cache.encode_text(event)
+        else:
+            encoded = self.encoded_event_cache.encode(event, self.encoding)
+        if not self._batch_window:
+            async with self._send_lock:
+                await self._send_frame(encoded)
+            return
+        self._batch.append(encoded)
+        if len(self._batch) >= self._max_batch_size or await self._status_changed():
+            await self.flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_after_window())
+
+    async def flush(self):
+        """Send any batched events as a single frame"""
+        async with self._send_lock:
+            # The batch is taken inside the lock so that frames go out in order
+            batch, self._batch = self._batch, []
+            if batch:
+                await self._send_frame(encode_batch(batch, self.encoding))
+
+    async def on_status_changed(self, status: AgentExecutionStatus):
+        """Send any batched events once the status changes. The events which led
+        to the change may not have been received yet, so the status is still
+        compared as each event arrives."""
+        if self._batch_window:
+            await self.flush()
+
+    async def _flush_after_window(self):
+        await asyncio.sleep(self._batch_window)
+        self._flush_task = None
+        await self.flush()
+
+    async def _status_changed(self) -> bool:
+        if self._get_status is None:
+            return False
+        status = await self._get_status()
+        changed = self._last_status is not None and status != self._last_status
+        self._last_status = status
+        return changed
+
+    async def _send_frame(self, encoded: str | bytes):
+        start = time.perf_counter()
+        try:
+            if isinstance(encoded, bytes):
+                await self.websocket.send_bytes(encoded)
+            else:
+                await self.websocket.send_text(encoded)
+        except Exception:
+            _websocket_send_failures.inc()
+            logger.exception("error_sending_event", stack_info=True)
+        finally:
+            _websocket_send_duration.observe(time.perf_counter() - start)
+
+    async def close(self):
+        """Close the socket because the client fell too far behind. The client
+        should reconnect and page through any events it missed."""
+        if self._closed:
+            return
+        self._closed = True
+        await self.websocket.close(code=1013, reason="subscriber_queue_full")
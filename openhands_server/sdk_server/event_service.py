@@ -1,137 +1,395 @@
 import asyncio
-from dataclasses import dataclass, field
+import threading
+import time
+from collections import deque
+from dataclasses import InitVar, dataclass, field
+from datetime import datetime
 from pathlib import Path
-from uuid import UUID
+from typing import Any, Awaitable, Callable, Literal, TypeVar
+from uuid import UUID, uuid4
 
-import openhands.tools
 from openhands.sdk import (
-    Agent,
     Conversation,
     EventBase,
     LocalFileStore,
     Message,
-    create_mcp_tools,
 )
 from openhands.sdk.conversation.state import AgentExecutionStatus
+from openhands.sdk.io import FileStore
+from openhands.sdk.logger import get_logger
 from openhands.sdk.utils.async_utils import (
     AsyncCallbackWrapper,
     AsyncConversationCallback,
 )
+from openhands_server.sdk_server.agent_pool import WarmAgent, create_agent
+from openhands_server.sdk_server.conversation_store import ConversationStore
+from openhands_server.sdk_server.event_index import EventIndex, page_events
+from openhands_server.sdk_server.file_io import AsyncFileIO, get_default_file_io
+from openhands_server.sdk_server.mcp_pool import MCPPool
 from openhands_server.sdk_server.models import (
     ConfirmationResponseRequest,
     EventPage,
+    EventSortOrder,
+    OverflowPolicy,
+    RunQueueInfo,
     StoredConversation,
+    SubscriberStats,
 )
-from openhands_server.sdk_server.pub_sub import PubSub
+from openhands_server.sdk_server.pub_sub import OverflowCallback, PubSub
+from openhands_server.sdk_server.run_scheduler import RunScheduler
+from openhands_server.sdk_server.segmented_file_store import SegmentedFileStore
+from openhands_server.sdk_server.tiered_events import TieredEvents
 from openhands_server.sdk_server.utils import utc_now
 
 
+logger = get_logger(__name__)
+T = TypeVar("T")
+StatusCallback = Callable[[AgentExecutionStatus], Awaitable[None]]
+
+
+@dataclass
+class _Mail:
+    """An item in the mailbox of an EventService"""
+
+    message: Message | None
+    run: bool
+    future: asyncio.Future
+
+
 @dataclass
 class EventService:
     """
     Event service for a conversation running locally, analagous to a conversation
     in the SDK. Async mostly for forward compatibility
+
+    Messages and run requests are posted to a mailbox processed by a single actor
+    task, so there is at most one active run per conversation. Messages arriving
+    while the agent is running are sent into that run, and any number of run
+    requests made during a run are coalesced into at most one follow up run.
+
+    Events are read through a TieredEvents view rather than from the list held by
+    the conversation, so only the last event_hot_size events (plus an LRU of
+    event_cache_size older ones) are kept in memory for reads, and events of a
+    hibernated conversation are read without waking it.
+
+    Blocking file access (Opening / closing the file store and reading events) is
+    done through the file_io given, off the event loop.
+
+    The status given is reported until the conversation is first activated (e.g.:
+    The status last saved, for conversations loaded from the store).
     """
 
     stored: StoredConversation
     file_store_path: Path
     working_dir: Path
+    conversation_store: ConversationStore
+    run_scheduler: RunScheduler
+    mcp_pool: MCPPool
+    event_store: Literal["file", "segmented"] = "file"
+    event_hot_size: int = 256
+    event_cache_size: int = 1024
+    event_fsync: bool = False
+    file_io: AsyncFileIO = field(default_factory=get_default_file_io)
+    status: InitVar[AgentExecutionStatus | None] = None
     _conversation: Conversation | None = field(default=None, init=False)
+    _file_store: FileStore | None = field(default=None, init=False)
+    _file_store_lock: threading.Lock = field(default_factory=threading.Lock, init=False)
+    _events: TieredEvents = field(init=False)
+    _reading: int = field(default=0, init=False)
+    _reads_done: asyncio.Event = field(default_factory=asyncio.Event, init=False)
     _pub_sub: PubSub = field(default_factory=PubSub, init=False)
+    _event_index: EventIndex = field(default_factory=EventIndex, init=False)
+    _activation_lock: asyncio.Lock = field(default_factory=asyncio.Lock, init=False)
+    _status: AgentExecutionStatus = field(default=AgentExecutionStatus.IDLE, init=False)
+    last_accessed: float = field(default_factory=time.monotonic, init=False)
+    _mailbox: deque[_Mail] = field(default_factory=deque, init=False)
+    _mailbox_ready: asyncio.Event = field(default_factory=asyncio.Event, init=False)
+    _actor_task: asyncio.Task | None = field(default=None, init=False)
+    _run_future: asyncio.Future | None = field(default=None, init=False)
+    _run_requested: bool = field(default=False, init=False)
+    _processing_mail: bool = field(default=False, init=False)
+    _viewer_ids: set[UUID] = field(default_factory=set, init=False)
+    _status_callbacks: dict[UUID, StatusCallback] = field(
+        default_factory=dict, init=False
+    )
+    _notified_status: AgentExecutionStatus | None = field(default=None, init=False)
+    _mcp_tools: list | None = field(default=None, init=False)
+
+    def __post_init__(self, status: AgentExecutionStatus | None):
+        if status:
+            self._status = status
+        self._events = TieredEvents(
+            self._get_file_store,
+            self._event_index,
+            hot_size=self.event_hot_size,
+            cache_size=self.event_cache_size,
+        )
+        self._pub_sub.subscribe(self._events, max_queue_size=None)
+        self._reads_done.set()
+
+    @property
+    def is_active(self) -> bool:
+        return self._conversation is not None
+
+    @property
+    def is_busy(self) -> bool:
+        """Whether the conversation has mail pending or being processed, or a run
+        queued / running"""
+        return bool(
+            self._mailbox
+            or self._processing_mail
+            or self._run_requested
+            or (self._run_future and not self._run_future.done())
+        )
+
+    @property
+    def has_viewers(self) -> bool:
+        """Whether any subscribers which keep the conversation active (e.g.:
+        Clients viewing it) are subscribed"""
+        return bool(self._viewer_ids)
+
+    async def activate(self, warm_agent: WarmAgent | None = None) -> Conversation:
+        """Get the conversation for this service, starting (or waking it from
+        hibernation) if required - with the pre-built agent given, if any."""
+        self.last_accessed = time.monotonic()
+        conversation = self._conversation
+        # While the lock is held, the conversation may be being hibernated - in
+        # which case it is woken again once that is done
+        if conversation and not self._activation_lock.locked():
+            return conversation
+        async with self._activation_lock:
+            if not self._conversation:
+                await self.start(warm_agent)
+            assert self._conversation is not None
+            return self._conversation
+
+    async def hibernate(self) -> bool:
+        """Checkpoint and release the conversation for this service, so that it
+        holds no agent, tools or events in memory until it is next activated.
+        Subscribers remain attached and will receive events after the conversation
+        is woken."""
+        if self._activation_lock.locked() or not self._conversation or self.is_busy:
+            return False
+        async with self._activation_lock:
+            conversation = self._conversation
+            if not conversation or self.is_busy:
+                return False
+            await self.save_meta()
+            self._status = conversation.state.agent_status
+            self._conversation = None
+            await self.run_scheduler.run_control(conversation.close)
+            await self._release_mcp_tools()
+            if not self._reading:
+                await self._close_file_store()
+        await self._notify_status()
+        return True
+
+    async def release_events(self) -> bool:
+        """Release the file store and events held for reads of an inactive
+        conversation (Which are kept until then, as reopening the store is not
+        free)"""
+        if self._conversation or self._file_store is None or self._reading:
+            return False
+        async with self._activation_lock:
+            if self._conversation or self._reading:
+                return False
+            await self._close_file_store()
+            return True
 
     async def load_meta(self):
-        meta_file = self.file_store_path / "meta.json"
-        self.stored = StoredConversation.model_validate_json(meta_file.read_text())
+        result = await self.conversation_store.get(self.stored.id)
+        if result:
+            self.stored, status = result
+            if status and not self._conversation:
+                self._status = status
 
     async def save_meta(self):
         self.stored.updated_at = utc_now()
-        meta_file = self.file_store_path / "meta.json"
-        meta_file.write_text(self.stored.model_dump_json())
+        await self.conversation_store.save(self.stored, await self.get_status())
 
     async def get_event(self, event_id: str) -> EventBase | None:
-        if not self._conversation:
-            raise ValueError("inactive_service")
-        with self._conversation.state as state:
-            # TODO: It would be nice if the agent sdk had a method for
-            #       getting events by id
-            event = next(
-                (event for event in state.events if event.id == event_id), None
-            )
-            return event
+        return await self._read_events(self._events.find, event_id)
 
     async def search_events(
-        self, page_id: str | None = None, limit: int = 100
+        self,
+        page_id: str | None = None,
+        limit: int = 100,
+        sort_order: EventSortOrder = EventSortOrder.TIMESTAMP,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        kinds: set[str] | None = None,
     ) -> EventPage:
-        if not self._conversation:
-            raise ValueError("inactive_service")
-
-        items = []
-        with self._conversation.state as state:
-            for event in state.events:
-                # If we have reached the start of the page
-                if event.id == page_id:
-                    page_id = None
-
-                # Skip pass entries before the first item...
-                if page_id:
-                    continue
-
-                # If we have reached the end of the page, return it
-                if limit <= 0:
-                    return EventPage(items=items, next_page_id=event.id)
-                limit -= 1
-
-                items.append(event)
-
-        return EventPage(items=items)
+        return await self._read_events(
+            page_events,
+            self._events,
+            self._event_index,
+            page_id,
+            limit,
+            sort_order,
+            since,
+            until,
+            kinds,
+        )
 
     async def batch_get_events(self, event_ids: list[str]) -> list[EventBase | None]:
         """Given a list of ids, get events (Or none for any which were not found)"""
-        results = []
-        for event_id in event_ids:
-            result = await self.get_event(event_id)
-            results.append(result)
-        return results
+        return await self._read_events(
+            lambda: [self._events.find(event_id) for event_id in event_ids]
+        )
+
+    async def _read_events(self, fn: Callable[..., T], *args: Any) -> T:
+        """Call a function reading events in the file_io pool (As they may be read
+        from disk), keeping the file store open until it returns"""
+        self.last_accessed = time.monotonic()
+        self._reading += 1
+        self._reads_done.clear()
+        try:
+            return await self.file_io.run(fn, *args)
+        finally:
+            self._reading -= 1
+            if not self._reading:
+                self._reads_done.set()
 
     async def send_message(self, message: Message, run: bool = True):
-        if not self._conversation:
-            raise ValueError("inactive_service")
-        loop = asyncio.get_running_loop()
-        future = loop.run_in_executor(None, self._conversation.send_message, message)
-        if run:
-            await future
-            loop.run_in_executor(None, self._conversation.run)
+        """Post a message to the mailbox, returning once it has been sent to the
+        conversation (Not when any resulting run completes)"""
+        await self._post(message, run)
 
-    async def subscribe_to_events(self, callback: AsyncConversationCallback) -> UUID:
-        return self._pub_sub.subscribe(callback)
+    async def subscribe_to_events(
+        self,
+        callback: AsyncConversationCallback,
+        policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        max_queue_size: int | None = 1024,
+        on_overflow: OverflowCallback | None = None,
+        viewer: bool = False,
+    ) -> UUID:
+        """Subscribe to the events of the conversation. While any viewers are
+        subscribed, the conversation counts as accessed for hibernation."""
+        callback_id = self._pub_sub.subscribe(
+            callback, policy, max_queue_size, on_overflow
+        )
+        if viewer:
+            self._viewer_ids.add(callback_id)
+        return callback_id
 
     async def unsubscribe_from_events(self, callback_id: UUID) -> bool:
+        if callback_id in self._viewer_ids:
+            self._viewer_ids.discard(callback_id)
+            self.last_accessed = time.monotonic()
         return self._pub_sub.unsubscribe(callback_id)
 
-    async def start(self):
-        llm = self.stored.llm
-        tools = []
-
-        # Create tools from tool specs
-        for tool_spec in self.stored.tools:
-            if tool_spec.name not in openhands.tools.__dict__:
-                continue
-            tool_class = openhands.tools.__dict__[tool_spec.name]
-            tools.append(tool_class.create(**tool_spec.params))
-
-        # Add MCP tools if configured
-        if self.stored.mcp_config:
-            mcp_tools = create_mcp_tools(self.stored.mcp_config, timeout=30)
-            tools.extend(mcp_tools)
-
-        agent = Agent(llm=llm, tools=tools, agent_context=self.stored.agent_context)
-        conversation = Conversation(
-            agent=agent,
-            callbacks=[
-                AsyncCallbackWrapper(self._pub_sub, loop=asyncio.get_running_loop())
-            ],
-            persist_filestore=LocalFileStore(str(self.file_store_path / "events")),
-        )
+    async def subscribe_to_status(self, callback: StatusCallback) -> UUID:
+        """Subscribe to changes in the agent status. Changes are checked for
+        after mail is processed, when a run ends or is paused and when the
+        conversation is hibernated, so include those made without any event
+        being published (e.g. A run finishing)."""
+        callback_id = uuid4()
+        self._status_callbacks[callback_id] = callback
+        return callback_id
+
+    async def unsubscribe_from_status(self, callback_id: UUID) -> bool:
+        return self._status_callbacks.pop(callback_id, None) is not None
+
+    async def _notify_status(self):
+        status = await self.get_status()
+        if status == self._notified_status:
+            return
+        self._notified_status = status
+        for callback in list(self._status_callbacks.values()):
+            try:
+                await callback(status)
+            except Exception:
+                logger.exception("error_in_status_callback", stack_info=True)
+
+    def get_subscriber_count(self) -> int:
+        return self._pub_sub.callback_count
+
+    async def get_subscriber_stats(self) -> list[SubscriberStats]:
+        return self._pub_sub.get_stats()
+
+    async def get_run_queue_info(self) -> RunQueueInfo:
+        info = self.run_scheduler.get_queue_info(self.stored.id)
+        info.mailbox_depth = len(self._mailbox)
+        return info
+
+    def _post(self, message: Message | None, run: bool) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._mailbox.append(_Mail(message, run, future))
+        self._wake_actor()
+        return future
+
+    def _wake_actor(self):
+        """Wake the actor (Starting it if required), so it processes the mailbox
+        and notifies any change in status"""
+        self._mailbox_ready.set()
+        if self._actor_task is None or self._actor_task.done():
+            self._actor_task = asyncio.create_task(self._process_mailbox())
+
+    async def _process_mailbox(self):
+        while True:
+            self._mailbox_ready.clear()
+            while self._mailbox:
+                mail = self._mailbox.popleft()
+                # Keeps the conversation from being hibernated while in use
+                self._processing_mail = True
+                try:
+                    if mail.message is not None:
+                        conversation = await self.activate()
+                        await self.run_scheduler.run_control(
+                            conversation.send_message, mail.message
+                        )
+                    self._run_requested = self._run_requested or mail.run
+                    mail.future.set_result(None)
+                except asyncio.CancelledError:
+                    # The service is closing - the poster is not left waiting
+                    mail.future.cancel()
+                    raise
+                except Exception as e:
+                    if not mail.future.done():
+                        mail.future.set_exception(e)
+                finally:
+                    self._processing_mail = False
+            if self._run_requested and (
+                self._run_future is None or self._run_future.done()
+            ):
+                self._run_requested = False
+                try:
+                    conversation = await self.activate()
+                    self._run_future = self.run_scheduler.submit_run(
+                        self.stored.id, conversation.run, self.stored.run_priority
+                    )
+                    # Wake the actor when the run ends, to start a follow up run
+                    # if one was requested while it was running
+                    self._run_future.add_done_callback(
+                        lambda _: self._mailbox_ready.set()
+                    )
+                except Exception:
+                    logger.exception(
+                        f"error_starting_run:{self.stored.id}", stack_info=True
+                    )
+            await self._notify_status()
+            if not self._mailbox:
+                await self._mailbox_ready.wait()
+
+    async def start(self, warm_agent: WarmAgent | None = None):
+        """Start the conversation, using the pre-built agent given if any"""
+        if warm_agent is None:
+            warm_agent = await create_agent(self.stored, self.mcp_pool)
+        self._mcp_tools = warm_agent.mcp_tools
+
+        try:
+            file_store = await self.file_io.run(self._get_file_store)
+            conversation = Conversation(
+                agent=warm_agent.agent,
+                callbacks=[
+                    AsyncCallbackWrapper(self._pub_sub, loop=asyncio.get_running_loop())
+                ],
+                persist_filestore=file_store,
+            )
+        except Exception:
+            await self._release_mcp_tools()
+            await self._close_file_store()
+            raise
 
         # Set confirmation mode if enabled
         conversation.set_confirmation_mode(self.stored.confirmation_mode)
@@ -139,10 +397,7 @@ class EventService:
 
     async def run(self):
         """Run the conversation asynchronously."""
-        if not self._conversation:
-            raise ValueError("inactive_service")
-        loop = asyncio.get_running_loop()
-        loop.run_in_executor(None, self._conversation.run)
+        await self._post(None, True)
 
     async def respond_to_confirmation(self, request: ConfirmationResponseRequest):
         if request.accept:
@@ -151,24 +406,83 @@ class EventService:
             await self.pause()
 
     async def pause(self):
+        # A pause cancels any follow up run requested before it
+        self._run_requested = False
         if self._conversation:
-            loop = asyncio.get_running_loop()
-            loop.run_in_executor(None, self._conversation.pause)
+            future = self.run_scheduler.run_control(self._conversation.pause)
+            # Not awaited, as the pause may wait for the step in progress. The
+            # status is notified once it is done (Even if no run was in progress)
+            future.add_done_callback(lambda _: self._on_paused())
 
-    async def close(self):
+    def _on_paused(self):
         if self._conversation:
-            loop = asyncio.get_running_loop()
-            loop.run_in_executor(None, self._conversation.close)
+            self._wake_actor()
+
+    async def close(self):
+        actor_task = self._actor_task
+        if actor_task:
+            self._actor_task = None
+            actor_task.cancel()
+            # Wait for the actor to cancel any mail it was processing
+            await asyncio.gather(actor_task, return_exceptions=True)
+        while self._mailbox:
+            self._mailbox.popleft().future.cancel()
+        async with self._activation_lock:
+            conversation = self._conversation
+            self._conversation = None
+            if conversation:
+                await self.run_scheduler.run_control(conversation.close)
+            await self._release_mcp_tools()
+            # Reads run in the file_io pool and can not be cancelled - the events
+            # they are reading must not be cleared under them
+            while self._reading:
+                await self._reads_done.wait()
+            await self._close_file_store()
+
+    def _get_file_store(self) -> FileStore:
+        """Get the file store for the conversation, which is shared by the
+        conversation and reads of its events"""
+        with self._file_store_lock:
+            file_store = self._file_store
+            if file_store is None:
+                path = str(self.file_store_path / "events")
+                if self.event_store == "segmented":
+                    file_store = SegmentedFileStore(path, fsync=self.event_fsync)
+                elif SegmentedFileStore.is_segmented_store(path):
+                    # Events written since would be missing
+                    raise ValueError("segmented_event_store")
+                else:
+                    file_store = LocalFileStore(path)
+                self._file_store = file_store
+            return file_store
+
+    async def _close_file_store(self):
+        self._events.clear()
+        with self._file_store_lock:
+            file_store = self._file_store
+            self._file_store = None
+        if isinstance(file_store, SegmentedFileStore):
+            await self.file_io.run(file_store.close)
+
+    async def _release_mcp_tools(self):
+        mcp_tools = self._mcp_tools
+        if mcp_tools is not None:
+            self._mcp_tools = None
+            await self.mcp_pool.release(mcp_tools)
 
     async def get_status(self) -> AgentExecutionStatus:
         if not self._conversation:
-            return AgentExecutionStatus.ERROR
+            # Status as of the last hibernation (Or as last saved, for
+            # conversations not activated since the server started)
+            return self._status
         return self._conversation.state.agent_status
 
     async def __aenter__(self):
-        await self.start()
+        await self.activate()
         return self
 
     async def __aexit__(self, exc_type, exc_value, traceback):
-        await self.save_meta()
-        await self.close()
+        # Metadata for inactive conversations was saved when they were hibernated
+        if self._conversation:
+            await self.save_meta()
+            await self.close()
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+from uuid import uuid4
+
+
+logger = logging.getLogger(__name__)
+T = TypeVar("T")
+TRASH_DIR = ".trash"
+
+
+@dataclass
+class AsyncFileIO:
+    """Runs blocking filesystem operations in a bounded pool of threads, so that
+    they never block the event loop and a burst of slow operations (e.g.: on a
+    busy disk) can not exhaust the default executor shared with everything else.
+    """
+
+    max_workers: int = 16
+    _executor: ThreadPoolExecutor | None = field(default=None, init=False)
+    _in_flight: int = field(default=0, init=False)
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run the blocking function given in the pool"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self.max_workers, thread_name_prefix="file_io"
+            )
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+        try:
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self._in_flight -= 1
+
+    def get_queue_depth(self) -> int:
+        """Get the number of operations waiting for a free thread"""
+        return max(self._in_flight - self.max_workers, 0)
+
+    async def read_text(self, path: Path) -> str | None:
+        """Read the file given, returning None if it does not exist"""
+        return await self.run(_read_text, path)
+
+    async def mkdir(self, path: Path, exist_ok: bool = False):
+        await self.run(lambda: path.mkdir(parents=True, exist_ok=exist_ok))
+
+    async def unlink(self, path: Path) -> bool:
+        """Remove the file given, returning False if it did not exist"""
+        return await self.run(_unlink, path)
+
+    def close(self):
+        executor = self._executor
+        if executor:
+            self._executor = None
+            executor.shutdown(wait=False)
+
+
+@dataclass
+class Trash:
+    """Deletes directories in the background, so that the time taken to delete
+    does not depend on how much is in them. A directory is first renamed into a
+    .trash directory beside it (Which is atomic and O(1), as it stays on the same
+    filesystem), and then removed by reaper tasks - at most max_concurrent at
+    once. Anything left in the .trash directories within the roots given (e.g.:
+    after a crash) is reaped when the trash is opened, if reap_leftovers is set
+    (It is not in processes sharing the roots, where only one should).
+    """
+
+    roots: list[Path]
+    file_io: AsyncFileIO = field(default_factory=lambda: get_default_file_io())
+    max_concurrent: int = 2
+    reap_leftovers: bool = True
+    _queue: asyncio.Queue[Path] = field(default_factory=asyncio.Queue, init=False)
+    _tasks: list[asyncio.Task] = field(default_factory=list, init=False)
+
+    async def move(self, path: Path) -> bool:
+        """Move the directory given to the trash, returning False if it did not
+        exist. It is gone from its original location once this returns."""
+        trashed = await self.file_io.run(_move_to_trash, path)
+        if trashed is None:
+            return False
+        self._queue.put_nowait(trashed)
+        return True
+
+    def get_pending_count(self) -> int:
+        """Get the number of trashed directories waiting to be reaped"""
+        return self._queue.qsize()
+
+    async def join(self):
+        """Wait until everything trashed so far has been reaped"""
+        await self._queue.join()
+
+    async def _reap_loop(self):
+        while True:
+            path = await self._queue.get()
+            try:
+                await self.file_io.run(shutil.rmtree, path)
+            except FileNotFoundError:
+                pass
+            except Exception:
+                # Left in the trash, so it is retried on the next start
+                logger.exception(f"error_reaping:{path}", stack_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def __aenter__(self):
+        for root in self.roots if self.reap_leftovers else ():
+            for path in await self.file_io.run(_list_dir, root / TRASH_DIR):
+                self._queue.put_nowait(path)
+        if self._queue.qsize():
+            logger.info(f"reaping_trash:{self._queue.qsize()}")
+        self._tasks = [
+            asyncio.create_task(self._reap_loop())
+            for _ in range(max(self.max_concurrent, 1))
+        ]
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        # Anything not yet reaped stays in the trash until the next start
+        tasks = self._tasks
+        self._tasks = []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _read_text(path: Path) -> str | None:
+    try:
+        return path.read_text()
+    except FileNotFoundError:
+        return None
+
+
+def _unlink(path: Path) -> bool:
+    try:
+        path.unlink()
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _list_dir(path: Path) -> list[Path]:
+    try:
+        return list(path.iterdir())
+    except FileNotFoundError:
+        return []
+
+
+def _move_to_trash(path: Path) -> Path | None:
+    trash_dir = path.parent / TRASH_DIR
+    trashed = trash_dir / f"{path.name}.{uuid4().hex}"
+    try:
+        trash_dir.mkdir(exist_ok=True)
+        os.rename(path, trashed)
+    except FileNotFoundError:
+        return None
+    return trashed
+
+
+_file_io: AsyncFileIO | None = None
+
+
+def get_default_file_io() -> AsyncFileIO:
+    global _file_io
+    if _file_io:
+        return _file_io
+    _file_io = AsyncFileIO()
+    return _file_io
@@ -0,0 +1,53 @@
+import hashlib
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from uuid import UUID
+
+
+@dataclass
+class HashRing:
+    """Consistent hash ring mapping conversation ids to nodes. Each node is placed
+    on the ring at virtual_nodes points, and a conversation belongs to the first
+    node clockwise from the hash of its id - so adding or removing a node only
+    moves the conversations between it and its neighbours (About 1/N of them).
+    """
+
+    nodes: list[str]
+    virtual_nodes: int = 64
+    _points: list[int] = field(default_factory=list, init=False)
+    _owners: list[str] = field(default_factory=list, init=False)
+
+    def __post_init__(self):
+        ring = sorted(
+            (_hash(f"{node}#{replica}"), node)
+            for node in self.nodes
+            for replica in range(self.virtual_nodes)
+        )
+        self._points = [point for point, _ in ring]
+        self._owners = [node for _, node in ring]
+
+    def get_node(self, conversation_id: UUID) -> str:
+        """Get the node which owns the conversation with the id given"""
+        return self.get_preference_list(conversation_id, 1)[0]
+
+    def get_preference_list(self, conversation_id: UUID, count: int) -> list[str]:
+        """Get up to count distinct nodes for the conversation with the id given, in
+        the order they are found clockwise from its hash. The first is the owner,
+        and the rest are where it most likely lived before nodes were added."""
+        if not self._points:
+            raise ValueError("empty_hash_ring")
+        count = min(count, len(set(self.nodes)))
+        start = bisect_right(self._points, _hash(conversation_id.hex))
+        result: list[str] = []
+        for offset in range(len(self._owners)):
+            node = self._owners[(start + offset) % len(self._owners)]
+            if node not in result:
+                result.append(node)
+                if len(result) == count:
+                    break
+        return result
+
+
+def _hash(key: str) -> int:
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
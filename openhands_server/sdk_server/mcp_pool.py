@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from openhands.sdk import create_mcp_tools
+from openhands.sdk.logger import get_logger
+from openhands.sdk.mcp import MCPClient, MCPTool
+from openhands.sdk.mcp.tool import MCPToolExecutor
+
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class _PoolEntry:
+    key: str
+    tools: list
+    refcount: int = 0
+    last_released: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class MCPPool:
+    """Process wide pool of MCP tools, so that conversations with an identical
+    mcp_config share MCP server processes rather than each spawning their own.
+
+    Entries are keyed by a hash of the normalized config and reference counted.
+    Entries with no references are closed once idle for longer than idle_ttl, or
+    when room is needed for a new entry. If the pool is full of entries in use,
+    tools are created outside the pool and closed when released. Entries are
+    health checked when acquired, and replaced if their servers have gone away.
+
+    Tools returned are shared, so agents should be given copies from
+    get_shared_tools, which leave the servers running when a conversation closes
+    its tools.
+    """
+
+    idle_ttl: float = 300
+    max_size: int = 16
+    timeout: float = 30
+    _entries: dict[str, _PoolEntry] = field(default_factory=dict, init=False)
+    _creating: dict[str, asyncio.Future] = field(default_factory=dict, init=False)
+    _unpooled: dict[int, list] = field(default_factory=dict, init=False)
+    _retired: dict[int, _PoolEntry] = field(default_factory=dict, init=False)
+
+    async def acquire(self, mcp_config: dict[str, Any]) -> list:
+        """Get tools for the mcp_config given. Each call must be matched with a
+        call to release (With the same tools) when they are no longer used."""
+        key = get_mcp_config_key(mcp_config)
+        while True:
+            entry = self._entries.get(key)
+            if entry:
+                if _is_healthy(entry.tools):
+                    entry.refcount += 1
+                    return entry.tools
+                logger.warning(f"mcp_pool_unhealthy:{key}")
+                self._entries.pop(key)
+                if entry.refcount:
+                    # Closed once the last conversation using it releases it
+                    self._retired[id(entry.tools)] = entry
+                else:
+                    await _close_tools(entry.tools)
+            creating = self._creating.get(key)
+            if creating is None:
+                break
+            # Another conversation is already starting these servers
+            await asyncio.shield(creating)
+
+        future = asyncio.get_running_loop().create_future()
+        self._creating[key] = future
+        try:
+            tools = await asyncio.to_thread(create_mcp_tools, mcp_config, self.timeout)
+        finally:
+            self._creating.pop(key, None)
+            future.set_result(None)
+        if await self._make_room():
+            self._entries[key] = _PoolEntry(key=key, tools=tools, refcount=1)
+        else:
+            logger.warning(f"mcp_pool_full:{self.max_size}")
+            self._unpooled[id(tools)] = tools
+        return tools
+
+    async def release(self, tools: list):
+        """Release tools returned by acquire"""
+        unpooled = self._unpooled.pop(id(tools), None)
+        if unpooled is not None:
+            await _close_tools(unpooled)
+            return
+        retired = self._retired.get(id(tools))
+        if retired is not None:
+            retired.refcount -= 1
+            if not retired.refcount:
+                self._retired.pop(id(tools))
+                await _close_tools(tools)
+            return
+        for entry in self._entries.values():
+            if entry.tools is tools:
+                entry.refcount -= 1
+                if not entry.refcount:
+                    entry.last_released = time.monotonic()
+                return
+
+    async def evict_idle(self) -> int:
+        """Close entries which have not been used for longer than the idle_ttl,
+        returning the number closed."""
+        idle_before = time.monotonic() - self.idle_ttl
+        idle = [
+            entry
+            for entry in self._entries.values()
+            if not entry.refcount and entry.last_released < idle_before
+        ]
+        for entry in idle:
+            self._entries.pop(entry.key)
+            await _close_tools(entry.tools)
+        return len(idle)
+
+    def get_size(self) -> int:
+        return len(self._entries)
+
+    async def close(self):
+        """Close all tools in the pool"""
+        entries = list(self._entries.values()) + list(self._retired.values())
+        unpooled = list(self._unpooled.values())
+        self._entries.clear()
+        self._retired.clear()
+        self._unpooled.clear()
+        for tools in [entry.tools for entry in entries] + unpooled:
+            await _close_tools(tools)
+
+    async def _make_room(self) -> bool:
+        if len(self._entries) < self.max_size:
+            return True
+        idle = [entry for entry in self._entries.values() if not entry.refcount]
+        if not idle:
+            return False
+        entry = min(idle, key=lambda entry: entry.last_released)
+        self._entries.pop(entry.key)
+        await _close_tools(entry.tools)
+        return True
+
+
+def get_mcp_config_key(mcp_config: dict[str, Any]) -> str:
+    """Get a key for an mcp_config which is the same for equivalent configs
+    regardless of the order of keys"""
+    normalized = json.dumps(mcp_config, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+class _SharedMCPToolExecutor(MCPToolExecutor):
+    """Executor for a copy of a pooled tool, which leaves the client shared with
+    other conversations open when closed (It is closed by the pool)"""
+
+    def close(self):
+        pass
+
+
+def get_shared_tools(tools: list) -> list:
+    """Get copies of tools from the pool for a single agent, which may be closed
+    with the conversation without closing the servers"""
+    shared = []
+    for tool in tools:
+        executor = _get_executor(tool)
+        shared.append(
+            tool.model_copy(
+                update={
+                    "executor": _SharedMCPToolExecutor(
+                        tool_name=executor.tool_name, client=executor.client
+                    )
+                }
+            )
+        )
+    return shared
+
+
+def _get_executor(tool: Any) -> MCPToolExecutor:
+    if not isinstance(tool, MCPTool) or not isinstance(tool.executor, MCPToolExecutor):
+        raise TypeError(f"not_an_mcp_tool:{type(tool).__name__}")
+    return tool.executor
+
+
+def _get_clients(tools: list) -> list[MCPClient]:
+    # Tools for the same server share a client, so dedupe by identity
+    clients = {}
+    for tool in tools:
+        client = _get_executor(tool).client
+        clients[id(client)] = client
+    return list(clients.values())
+
+
+def _is_healthy(tools: list) -> bool:
+    return all(client.is_connected() for client in _get_clients(tools))
+
+
+async def _close_tools(tools: list):
+    for client in _get_clients(tools):
+        try:
+            await asyncio.to_thread(client.sync_close)
+        except Exception:
+            logger.exception("error_closing_mcp_client", stack_info=True)
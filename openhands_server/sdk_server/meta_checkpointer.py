@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from uuid import UUID
+
+from openhands_server.sdk_server.conversation_store import ConversationStore
+from openhands_server.sdk_server.event_service import EventService
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _DirtyEntry:
+    event_service: EventService
+    first_dirtied: float
+    last_dirtied: float
+
+
+@dataclass
+class MetaCheckpointer:
+    """Write behind checkpointer for conversation metadata, so that changes are
+    persisted while the server runs rather than only when it stops.
+
+    Conversations are marked dirty as events arrive, and saved once no further
+    change has been made for debounce seconds - or once they have been dirty for
+    max_staleness seconds, if changes keep arriving. When any conversation is due,
+    all dirty conversations are saved together in one call to save_all, so the
+    I/O per event stays constant however busy the server is.
+    """
+
+    conversation_store: ConversationStore
+    debounce: float = 1
+    max_staleness: float = 10
+    _dirty: dict[UUID, _DirtyEntry] = field(default_factory=dict, init=False)
+    _dirty_ready: asyncio.Event = field(default_factory=asyncio.Event, init=False)
+    _flush_lock: asyncio.Lock = field(default_factory=asyncio.Lock, init=False)
+    _task: asyncio.Task | None = field(default=None, init=False)
+
+    def mark_dirty(self, event_service: EventService):
+        now = time.monotonic()
+        entry = self._dirty.get(event_service.stored.id)
+        if entry:
+            entry.event_service = event_service
+            entry.last_dirtied = now
+            return
+        self._dirty[event_service.stored.id] = _DirtyEntry(event_service, now, now)
+        self._dirty_ready.set()
+
+    async def discard(self, conversation_id: UUID):
+        """Stop tracking changes to a conversation (e.g.: Because it is being
+        deleted), waiting for any flush in progress so it is not saved again."""
+        async with self._flush_lock:
+            self._dirty.pop(conversation_id, None)
+
+    def get_dirty_count(self) -> int:
+        return len(self._dirty)
+
+    async def flush(self):
+        """Save all dirty conversations now"""
+        async with self._flush_lock:
+            dirty = self._dirty
+            self._dirty = {}
+            self._dirty_ready.clear()
+            if not dirty:
+                return
+            try:
+                items = [
+                    (
+                        entry.event_service.stored,
+                        await entry.event_service.get_status(),
+                    )
+                    for entry in dirty.values()
+                ]
+                await self.conversation_store.save_all(items)
+            except BaseException:
+                # Keep them dirty (Along with anything marked since) for a retry,
+                # including if cancelled part way through
+                for conversation_id, entry in dirty.items():
+                    self._dirty.setdefault(conversation_id, entry)
+                self._dirty_ready.set()
+                raise
+
+    async def _run(self):
+        while True:
+            await self._dirty_ready.wait()
+            delay = self._get_next_due() - time.monotonic()
+            if delay > 0:
+                # Recheck afterwards - more changes may have pushed things back
+                await asyncio.sleep(delay)
+                continue
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("error_checkpointing_meta", stack_info=True)
+                await asyncio.sleep(max(self.debounce, 1))
+
+    def _get_next_due(self) -> float:
+        return min(
+            (
+                min(
+                    entry.last_dirtied + self.debounce,
+                    entry.first_dirtied + self.max_staleness,
+                )
+                for entry in self._dirty.values()
+            ),
+            default=time.monotonic(),
+        )
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        task = self._task
+        if task:
+            self._task = None
+            task.cancel()
+        await self.flush()
@@ -0,0 +1,351 @@
+"""
+Metrics for the server in the Prometheus text exposition format, served from
+/metrics so they may be scraped without any external collector or agent.
+
+Metrics are plain counters, gauges and histograms with no dependencies. Labelled
+series are created on first use and cached, so callers on hot paths bind the
+series they use once (metric.labels(...)) and updating them allocates nothing.
+Updates are not synchronized, so they must be made from the event loop. Gauges
+for state the server already tracks are given functions evaluated when scraped
+rather than being updated as the state changes.
+"""
+
+import math
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from typing import ClassVar, Generic, TypeVar
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+
+class CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value: float = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def render(self, name: str, labels: str, lines: list[str]):
+        lines.append(f"{name}{_format_labels(labels)} {_format_value(self.value)}")
+
+
+class GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value: float = 0
+        self.function: Callable[[], float] | None = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float] | None):
+        """Evaluate the function given for the value whenever metrics are scraped"""
+        self.function = function
+
+    def get(self) -> float:
+        return self.function() if self.function else self.value
+
+    def render(self, name: str, labels: str, lines: list[str]):
+        lines.append(f"{name}{_format_labels(labels)} {_format_value(self.get())}")
+
+
+class HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        # The last count is for the implicit +Inf bucket
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum: float = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def render(self, name: str, labels: str, lines: list[str]):
+        cumulative = 0
+        prefix = f"{labels}," if labels else ""
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            le = _format_value(bound)
+            lines.append(f'{name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+        cumulative += self.counts[-1]
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(self.sum)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+
+
+C = TypeVar("C", CounterChild, GaugeChild, HistogramChild)
+
+
+class _Metric(ABC, Generic[C]):
+    type: ClassVar[str]
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: "Registry | None" = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], tuple[str, C]] = {}
+        if not self.labelnames:
+            # Rendered as zero until first updated
+            self.labels()
+        if registry is None:
+            registry = get_default_registry()
+        registry.register(self)
+
+    def labels(self, *values: str) -> C:
+        """Get the series for the label values given (In the order of the
+        labelnames), creating it if required"""
+        entry = self._children.get(values)
+        if entry is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError("invalid_labels")
+            labels = ",".join(
+                f'{labelname}="{_escape_label(value)}"'
+                for labelname, value in zip(self.labelnames, values)
+            )
+            entry = (labels, self._create_child())
+            self._children[values] = entry
+        return entry[1]
+
+    def render(self, lines: list[str]):
+        lines.append(f"# HELP {self.name} {_escape_help(self.documentation)}")
+        lines.append(f"# TYPE {self.name} {self.type}")
+        for labels, child in self._children.values():
+            child.render(self.name, labels, lines)
+
+    @abstractmethod
+    def _create_child(self) -> C:
+        """Create the series for a set of label values"""
+
+
+class Counter(_Metric[CounterChild]):
+    type = "counter"
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def _create_child(self) -> CounterChild:
+        return CounterChild()
+
+
+class Gauge(_Metric[GaugeChild]):
+    type = "gauge"
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self.labels().dec(amount)
+
+    def set_function(self, function: Callable[[], float] | None):
+        self.labels().set_function(function)
+
+    def _create_child(self) -> GaugeChild:
+        return GaugeChild()
+
+
+class Histogram(_Metric[HistogramChild]):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: "Registry | None" = None,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _create_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+
+@dataclass
+class Registry:
+    """A set of metrics, rendered together"""
+
+    _metrics: dict[str, _Metric] = field(default_factory=dict)
+
+    def register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"duplicate_metric:{metric.name}")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            metric.render(lines)
+        lines.append("")
+        return "\n".join(lines)
+
+
+def merge_expositions(expositions: dict[str, str], labelname: str) -> str:
+    """Merge metrics rendered by several processes into one exposition, adding a
+    label with the key for each to every sample (e.g.: A worker label, for a
+    front process serving the metrics of its workers). Samples are grouped by
+    metric, as the format requires."""
+    families: dict[str, list[str]] = {}
+    for label_value, exposition in expositions.items():
+        extra = f'{labelname}="{_escape_label(label_value)}"'
+        family: list[str] | None = None
+        for line in exposition.splitlines():
+            if line.startswith("# "):
+                parts = line.split(" ", 3)
+                if len(parts) < 3 or parts[1] not in ("HELP", "TYPE"):
+                    continue
+                family = families.get(parts[2])
+                if family is None:
+                    family = families[parts[2]] = []
+                if len(family) < 2:
+                    family.append(line)
+            elif line and family is not None:
+                # Names contain no spaces, so a brace before the first space
+                # opens the labels of the sample
+                brace = line.find("{")
+                space = line.find(" ")
+                if 0 <= brace < space:
+                    sample = f"{line[: brace + 1]}{extra},{line[brace + 1 :]}"
+                else:
+                    sample = f"{line[:space]}{{{extra}}}{line[space:]}"
+                family.append(sample)
+    lines = [line for family in families.values() for line in family]
+    lines.append("")
+    return "\n".join(lines)
+
+
+def _format_labels(labels: str) -> str:
+    return f"{{{labels}}}" if labels else ""
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _escape_help(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+_registry: Registry | None = None
+
+
+def get_default_registry() -> Registry:
+    global _registry
+    if _registry:
+        return _registry
+    _registry = Registry()
+    return _registry
+
+
+# Metrics for the server
+
+HTTP_REQUEST_DURATION = Histogram(
+    "openhands_http_request_duration_seconds",
+    "Time taken to serve HTTP requests, by route template",
+    ("method", "route", "status"),
+)
+EVENTS_PUBLISHED = Counter(
+    "openhands_events_published_total", "Events published by conversations"
+)
+EVENTS_DROPPED = Counter(
+    "openhands_events_dropped_total",
+    "Events dropped for subscribers whose queue was full",
+)
+EVENT_SUBSCRIBERS = Gauge(
+    "openhands_event_subscribers",
+    "Subscribers to the events of conversations (Including those internal to the "
+    "server)",
+)
+WEBSOCKET_CONNECTIONS = Gauge(
+    "openhands_websocket_connections", "Open WebSocket connections for events"
+)
+WEBSOCKET_SEND_DURATION = Histogram(
+    "openhands_websocket_send_duration_seconds",
+    "Time taken to send a frame of events to a WebSocket client",
+)
+WEBSOCKET_SEND_FAILURES = Counter(
+    "openhands_websocket_send_failures_total",
+    "Frames of events which could not be sent to a WebSocket client",
+)
+RUNS_ACTIVE = Gauge("openhands_runs_active", "Conversations with an agent running")
+RUNS_PENDING = Gauge(
+    "openhands_runs_pending", "Conversation runs queued waiting for a free slot"
+)
+EXECUTOR_QUEUE_DEPTH = Gauge(
+    "openhands_executor_queue_depth",
+    "Operations waiting for a free thread, by pool",
+    ("executor",),
+)
+CONVERSATIONS = Gauge(
+    "openhands_conversations", "Conversations by agent status", ("status",)
+)
+STARTUP_LOAD_DURATION = Gauge(
+    "openhands_startup_load_duration_seconds",
+    "Time taken to load the metadata for all conversations on startup",
+)
+LOOP_LAG = Histogram(
+    "openhands_event_loop_lag_seconds",
+    "How late the event loop ran a task scheduled to wake after a fixed interval",
+)
+LOOP_LAG_MAX = Gauge(
+    "openhands_event_loop_lag_max_seconds",
+    "The max lag of the event loop over the last minute or more",
+)
+LOOP_BLOCKED = Counter(
+    "openhands_event_loop_blocked_total",
+    "Times the event loop was blocked for longer than the threshold (The stack of "
+    "each is logged)",
+)
@@ -1,9 +1,17 @@
+import hmac
+import time
 from urllib.parse import urlparse
 
-from fastapi import HTTPException, Request, Response, status
+from fastapi import Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.types import ASGIApp
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from openhands_server.sdk_server.metrics import HTTP_REQUEST_DURATION
+
+
+SESSION_API_KEY_HEADER = "X-Session-API-Key"
 
 
 class LocalhostCORSMiddleware(CORSMiddleware):
@@ -34,6 +42,37 @@ class LocalhostCORSMiddleware(CORSMiddleware):
         return result
 
 
+class MetricsMiddleware:
+    """Middleware recording the time taken to serve each HTTP request (Including
+    streaming the response) in a histogram labelled by the template of the route
+    matched rather than the path, so the number of series stays bounded."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router records the route matched in the scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"], route, str(status_code)
+            ).observe(time.perf_counter() - start)
+
+
 class ValidateSessionAPIKeyMiddleware(BaseHTTPMiddleware):
     """Middleware to validate session API key for all requests.
 
@@ -41,8 +80,13 @@ class ValidateSessionAPIKeyMiddleware(BaseHTTPMiddleware):
     for the sandbox that needs provided.
 
     Note: the Session API key is occasionally sent to the client.
+
+    The health, readiness and metrics endpoints are exempt, so probes and
+    scrapers which do not hold the key keep working.
     """
 
+    exempt_paths: frozenset[str] = frozenset(("/health", "/ready", "/metrics"))
+
     def __init__(self, app: ASGIApp, session_api_key: str) -> None:
         super().__init__(app)
         self.session_api_key = session_api_key
@@ -50,8 +94,20 @@ class ValidateSessionAPIKeyMiddleware(BaseHTTPMiddleware):
     async def dispatch(
         self, request: Request, call_next: RequestResponseEndpoint
     ) -> Response:
-        session_api_key = request.headers["X-Session-API-Key"]
-        if session_api_key != session_api_key:
-            raise HTTPException(status.HTTP_401_UNAUTHORIZED)
+        if request.url.path in self.exempt_paths:
+            return await call_next(request)
+        session_api_key = request.headers.get(SESSION_API_KEY_HEADER)
+        if not is_valid_session_api_key(session_api_key, self.session_api_key):
+            # Exceptions raised here bypass the exception handlers of the app
+            return JSONResponse(
+                {"detail": "Unauthorized"}, status.HTTP_401_UNAUTHORIZED
+            )
         response = await call_next(request)
         return response
+
+
+def is_valid_session_api_key(given: str | None, expected: str) -> bool:
+    """Check a session api key in constant time"""
+    if given is None:
+        return False
+    return hmac.compare_digest(given.encode(), expected.encode())
@@ -0,0 +1,31 @@
+"""Alembic environment for the conversation metadata database."""
+
+from alembic import context
+from sqlalchemy import create_engine
+
+
+def run_migrations_offline():
+    context.configure(
+        url=context.config.get_main_option("sqlalchemy.url"),
+        literal_binds=True,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    url = context.config.get_main_option("sqlalchemy.url")
+    assert url
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        context.configure(connection=connection, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+    engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
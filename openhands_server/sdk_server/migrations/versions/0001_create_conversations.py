@@ -0,0 +1,37 @@
+"""Create conversations table
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "conversations",
+        sa.Column("id", sa.String(32), primary_key=True),
+        sa.Column("status", sa.String(32), nullable=True),
+        sa.Column("created_at", sa.String(40), nullable=False),
+        sa.Column("updated_at", sa.String(40), nullable=False),
+        sa.Column("data", sa.Text(), nullable=False),
+    )
+    op.create_index("ix_conversations_status", "conversations", ["status"])
+    op.create_index("ix_conversations_created_at", "conversations", ["created_at"])
+    op.create_index("ix_conversations_updated_at", "conversations", ["updated_at"])
+
+
+def downgrade():
+    op.drop_index("ix_conversations_updated_at", "conversations")
+    op.drop_index("ix_conversations_created_at", "conversations")
+    op.drop_index("ix_conversations_status", "conversations")
+    op.drop_table("conversations")
@@ -1,4 +1,5 @@
 from datetime import datetime
+from enum import Enum
 from typing import Any, Literal
 from uuid import UUID
 
@@ -109,6 +110,12 @@ class StartConversationRequest(BaseModel):
         description="If true, the agent will enter confirmation mode, "
         "requiring user approval for actions.",
     )
+    run_priority: int = Field(
+        default=0,
+        description="Priority of runs of this conversation when more conversations "
+        "are running than max_running_conversations. Queued runs with a lower "
+        "priority start first.",
+    )
     initial_message: SendMessageRequest | None = Field(
         default=None, description="Initial message to pass to the LLM"
     )
@@ -129,6 +136,24 @@ class ConversationInfo(StoredConversation):
     status: AgentExecutionStatus = AgentExecutionStatus.IDLE
 
 
+class BatchStartResult(BaseModel):
+    """The result of starting one conversation in a batch - either the
+    conversation or an error"""
+
+    index: int = Field(description="The index of the request in the batch")
+    conversation: ConversationInfo | None = None
+    error: str | None = None
+
+
+class ConversationSortOrder(Enum):
+    """Enum for conversation sorting options."""
+
+    CREATED_AT = "CREATED_AT"
+    CREATED_AT_DESC = "CREATED_AT_DESC"
+    UPDATED_AT = "UPDATED_AT"
+    UPDATED_AT_DESC = "UPDATED_AT_DESC"
+
+
 class ConversationPage(BaseModel):
     items: list[ConversationInfo]
     next_page_id: str | None = None
@@ -150,6 +175,78 @@ class Success(BaseModel):
     success: bool = True
 
 
+class StartupProgress(BaseModel):
+    """Progress of loading conversations after the server starts. The server
+    accepts requests while loading, but search results may be incomplete until
+    loading is complete."""
+
+    complete: bool = False
+    failed: bool = False
+    loaded: int = 0
+    total: int | None = None
+    started_at: datetime = Field(default_factory=utc_now)
+    completed_at: datetime | None = None
+
+
+class OverflowPolicy(Enum):
+    """What to do when the queue of events for a subscriber is full."""
+
+    DROP_OLDEST = "DROP_OLDEST"
+    # Drop the queued event superseded by the new one (The most recent of the same
+    # type, for snapshots of state), falling back to the oldest
+    COALESCE = "COALESCE"
+    DISCONNECT = "DISCONNECT"
+
+
+class SubscriberStats(BaseModel):
+    """Delivery statistics for a subscriber to the events of a conversation."""
+
+    subscriber_id: UUID
+    policy: OverflowPolicy
+    queue_depth: int
+    max_queue_size: int | None
+    delivered: int
+    dropped: int
+
+
+class RunQueueState(Enum):
+    """State of a conversation within the run scheduler."""
+
+    IDLE = "IDLE"
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+
+
+class RunQueueInfo(BaseModel):
+    """Position of a conversation in the run queue, along with queue totals."""
+
+    state: RunQueueState
+    position: int | None = Field(
+        default=None, description="Number of runs ahead of this one in the queue"
+    )
+    wait_seconds: float | None = Field(
+        default=None,
+        description=(
+            "How long the run has been queued, or how long it was queued before "
+            "starting if it is running"
+        ),
+    )
+    running_count: int
+    pending_count: int
+    max_running: int
+    mailbox_depth: int = Field(
+        default=0,
+        description="Number of messages waiting to be sent to the conversation",
+    )
+
+
+class EventSortOrder(Enum):
+    """Enum for event sorting options."""
+
+    TIMESTAMP = "TIMESTAMP"
+    TIMESTAMP_DESC = "TIMESTAMP_DESC"
+
+
 class EventPage(BaseModel):
     items: list[EventBase]
     next_page_id: str | None = None
@@ -0,0 +1,558 @@
+"""
+Front process for running the server as several worker processes. The front
+process terminates HTTP / WebSocket connections and routes each request for a
+conversation to the worker owning the shard for its id, so agent loops, encoding
+and validation for different conversations do not share a GIL. Workers listen on
+unix domain sockets, and are restarted if they exit, so a crash only affects the
+conversations in one shard.
+"""
+
+import asyncio
+import itertools
+import os
+import sys
+import tempfile
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator
+from uuid import UUID
+
+import httpx
+from fastapi import FastAPI, Request, Response, WebSocket, status
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.requests import HTTPConnection
+from starlette.websockets import WebSocketDisconnect
+from websockets.asyncio.client import ClientConnection, connect, unix_connect
+from websockets.exceptions import ConnectionClosed
+
+from openhands.sdk.logger import get_logger
+from openhands_server.sdk_server.config import (
+    CONFIG_ENV_VAR,
+    Config,
+    get_default_config,
+)
+from openhands_server.sdk_server.conversation_index import (
+    decode_page_id,
+    encode_page_id,
+)
+from openhands_server.sdk_server.conversation_service import prepare_storage
+from openhands_server.sdk_server.diagnostics import LoopLagMonitor
+from openhands_server.sdk_server.file_io import AsyncFileIO, Trash
+from openhands_server.sdk_server.metrics import CONTENT_TYPE, merge_expositions
+from openhands_server.sdk_server.middleware import (
+    SESSION_API_KEY_HEADER,
+    LocalhostCORSMiddleware,
+    ValidateSessionAPIKeyMiddleware,
+)
+from openhands_server.sdk_server.models import (
+    ConversationSortOrder,
+    StartupProgress,
+    Success,
+)
+from openhands_server.sdk_server.utils import get_shard
+
+
+logger = get_logger(__name__)
+_HOP_BY_HOP_HEADERS = {"connection", "host", "keep-alive", "transfer-encoding"}
+
+
+@dataclass
+class _Worker:
+    index: int
+    socket_path: Path
+    process: asyncio.subprocess.Process | None = None
+    client: httpx.AsyncClient | None = None
+    restarts: int = 0
+
+
+@dataclass
+class WorkerPool:
+    """Pool of worker processes, each hosting the conversations for one shard.
+    Storage shared by the workers (e.g.: The metadata database) is prepared once
+    before they are started, and the trash left by a previous run is reaped by the
+    pool, rather than by every worker at once."""
+
+    config: Config
+    num_workers: int = 2
+    restart_delay: float = 1
+    socket_dir: Path | None = None
+    _workers: list[_Worker] = field(default_factory=list, init=False)
+    _supervisor_tasks: list[asyncio.Task] = field(default_factory=list, init=False)
+    _round_robin: itertools.cycle = field(init=False)
+    _file_io: AsyncFileIO | None = field(default=None, init=False)
+    _trash: Trash | None = field(default=None, init=False)
+
+    def get_worker(self, conversation_id: UUID) -> httpx.AsyncClient:
+        """Get a client for the worker which owns the conversation given"""
+        return self.get_client(get_shard(conversation_id, self.num_workers))
+
+    def get_client(self, index: int) -> httpx.AsyncClient:
+        client = self._workers[index].client
+        assert client is not None
+        return client
+
+    def get_clients(self) -> list[httpx.AsyncClient]:
+        return [self.get_client(index) for index in range(self.num_workers)]
+
+    def next_client(self) -> httpx.AsyncClient:
+        """Get a client for the next worker in a round robin (Used for creating
+        conversations, as the worker picks an id within its own shard)"""
+        for _ in range(self.num_workers):
+            worker = self._workers[next(self._round_robin)]
+            if worker.process and worker.process.returncode is None:
+                break
+        assert worker.client is not None
+        return worker.client
+
+    def get_socket_path(self, conversation_id: UUID) -> Path:
+        return self._workers[get_shard(conversation_id, self.num_workers)].socket_path
+
+    async def __aenter__(self):
+        if self.socket_dir is None:
+            self.socket_dir = Path(tempfile.mkdtemp(prefix="openhands-workers-"))
+        self._round_robin = itertools.cycle(range(self.num_workers))
+        self._file_io = AsyncFileIO(max_workers=self.config.file_io_workers)
+        await prepare_storage(self.config, self._file_io)
+        # Workers only reap what they delete themselves
+        self._trash = Trash(
+            [self.config.conversations_path, self.config.workspace_path],
+            file_io=self._file_io,
+            max_concurrent=self.config.trash_reap_concurrency,
+        )
+        await self._trash.__aenter__()
+        session_headers = {}
+        if self.config.session_api_key:
+            session_headers[SESSION_API_KEY_HEADER] = self.config.session_api_key
+        for index in range(self.num_workers):
+            socket_path = self.socket_dir / f"worker-{index}.sock"
+            worker = _Worker(
+                index=index,
+                socket_path=socket_path,
+                client=httpx.AsyncClient(
+                    transport=httpx.AsyncHTTPTransport(uds=str(socket_path)),
+                    base_url="http://worker",
+                    # Requests made by the front itself (e.g.: fanned out to
+                    # every worker) are authenticated like forwarded ones
+                    headers=session_headers,
+                    timeout=None,
+                ),
+            )
+            self._workers.append(worker)
+            await self._spawn(worker)
+            self._supervisor_tasks.append(asyncio.create_task(self._supervise(worker)))
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        for task in self._supervisor_tasks:
+            task.cancel()
+        self._supervisor_tasks.clear()
+        for worker in self._workers:
+            process = worker.process
+            if process and process.returncode is None:
+                process.terminate()
+        for worker in self._workers:
+            if worker.process:
+                await worker.process.wait()
+            if worker.client:
+                await worker.client.aclose()
+        self._workers.clear()
+        if self._trash:
+            await self._trash.__aexit__(exc_type, exc_value, traceback)
+            self._trash = None
+        if self._file_io:
+            self._file_io.close()
+            self._file_io = None
+
+    async def _spawn(self, worker: _Worker):
+        worker.socket_path.unlink(missing_ok=True)
+        config = self.config.model_copy(
+            update={
+                "shard_index": worker.index,
+                "shard_count": self.num_workers,
+                "prepare_storage": False,
+            }
+        )
+        env = {**os.environ, CONFIG_ENV_VAR: config.model_dump_json()}
+        worker.process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "openhands_server.sdk_server.api:api",
+            "--uds",
+            str(worker.socket_path),
+            env=env,
+        )
+        logger.info(f"started_worker:{worker.index}:{worker.process.pid}")
+
+    async def _supervise(self, worker: _Worker):
+        while True:
+            assert worker.process is not None
+            returncode = await worker.process.wait()
+            logger.error(f"worker_exited:{worker.index}:{returncode}")
+            await asyncio.sleep(self.restart_delay)
+            worker.restarts += 1
+            await self._spawn(worker)
+
+
+def create_proxy_api(num_workers: int, config: Config | None = None) -> FastAPI:
+    """Create the front app for a pool of num_workers worker processes"""
+    if config is None:
+        config = get_default_config()
+    pool = WorkerPool(config=config, num_workers=num_workers)
+
+    @asynccontextmanager
+    async def lifespan(api: FastAPI) -> AsyncIterator[None]:
+        monitor = LoopLagMonitor(
+            interval=config.loop_lag_interval,
+            block_threshold=config.loop_block_threshold,
+        )
+        async with pool, monitor:
+            yield
+
+    # Docs are served by the workers
+    api = FastAPI(
+        description="OpenHands Local Server",
+        lifespan=lifespan,
+        openapi_url=None,
+        docs_url=None,
+        redoc_url=None,
+    )
+
+    @api.get("/health")
+    async def health() -> Success:
+        return Success()
+
+    @api.get("/ready")
+    async def ready() -> Response:
+        responses = await fan_out(pool.get_clients(), "GET", "/ready")
+        if all(response.status_code == 200 for response in responses):
+            return JSONResponse(Success().model_dump(mode="json"))
+        return JSONResponse(
+            {"detail": "not_ready"}, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    @api.get("/startup_progress")
+    async def startup_progress() -> StartupProgress:
+        responses = await fan_out(pool.get_clients(), "GET", "/startup_progress")
+        worker_progress = [
+            StartupProgress.model_validate_json(response.content)
+            for response in responses
+            if response.status_code == 200
+        ]
+        progress = StartupProgress()
+        if worker_progress:
+            # Each worker reads all metadata (keeping only its own shard), so
+            # progress is that of the slowest worker
+            progress.loaded = min(p.loaded for p in worker_progress)
+            totals = [p.total for p in worker_progress if p.total is not None]
+            progress.total = max(totals) if totals else None
+            progress.started_at = min(p.started_at for p in worker_progress)
+            completed_at = [p.completed_at for p in worker_progress if p.completed_at]
+            progress.completed_at = max(completed_at) if completed_at else None
+        progress.failed = any(p.failed for p in worker_progress)
+        progress.complete = len(worker_progress) == len(responses) and all(
+            p.complete for p in worker_progress
+        )
+        if not progress.complete:
+            progress.completed_at = None
+        return progress
+
+    @api.get("/metrics")
+    async def metrics() -> Response:
+        # Metrics of every worker, labelled with the index of the worker
+        responses = await fan_out(pool.get_clients(), "GET", "/metrics")
+        expositions = {
+            str(index): response.text
+            for index, response in enumerate(responses)
+            if response.status_code == 200
+        }
+        return PlainTextResponse(
+            merge_expositions(expositions, "worker"), media_type=CONTENT_TYPE
+        )
+
+    @api.get("/conversations/search")
+    async def search_conversations(request: Request) -> Response:
+        params = request.query_params
+        responses = await fan_out(
+            pool.get_clients(), "GET", "/conversations/search", params=params
+        )
+        for response in responses:
+            if response.status_code != 200:
+                return to_response(response)
+        sort_order = ConversationSortOrder(
+            params.get("sort_order", ConversationSortOrder.CREATED_AT.value)
+        )
+        limit = int(params.get("limit", 100))
+        return JSONResponse(
+            merge_conversation_pages(
+                [response.json() for response in responses], sort_order, limit
+            )
+        )
+
+    @api.get("/conversations/count")
+    async def count_conversations(request: Request) -> Response:
+        responses = await fan_out(
+            pool.get_clients(),
+            "GET",
+            "/conversations/count",
+            params=request.query_params,
+        )
+        for response in responses:
+            if response.status_code != 200:
+                return to_response(response)
+        return JSONResponse(sum(response.json() for response in responses))
+
+    @api.get("/conversations/")
+    async def batch_get_conversations(request: Request) -> Response:
+        ids = [UUID(id) for id in request.query_params.getlist("ids")]
+        by_worker: dict[int, list[UUID]] = {}
+        for conversation_id in ids:
+            shard = get_shard(conversation_id, num_workers)
+            by_worker.setdefault(shard, []).append(conversation_id)
+        shards = list(by_worker)
+        responses = await asyncio.gather(
+            *[
+                pool.get_client(shard).get(
+                    "/conversations/",
+                    params={"ids": [id.hex for id in by_worker[shard]]},
+                    headers=forward_headers(request),
+                )
+                for shard in shards
+            ]
+        )
+        results = {}
+        for shard, response in zip(shards, responses):
+            if response.status_code != 200:
+                return to_response(response)
+            results.update(zip(by_worker[shard], response.json()))
+        return JSONResponse([results[conversation_id] for conversation_id in ids])
+
+    @api.post("/conversations/")
+    async def start_conversation(request: Request) -> Response:
+        return await proxy_request(request, pool.next_client())
+
+    @api.post("/conversations/batch")
+    async def batch_start_conversations(request: Request) -> Response:
+        return await proxy_request(request, pool.next_client())
+
+    @api.websocket("/conversations/{conversation_id}/events/socket")
+    async def socket(websocket: WebSocket, conversation_id: UUID):
+        await proxy_websocket(
+            websocket,
+            f"ws://worker{get_path_with_query(websocket)}",
+            pool.get_socket_path(conversation_id),
+        )
+
+    @api.api_route(
+        "/conversations/{conversation_id}/{path:path}",
+        methods=["GET", "POST", "PUT", "PATCH", "DELETE"],
+    )
+    async def proxy_conversation_path(request: Request, conversation_id: UUID):
+        return await proxy_request(request, pool.get_worker(conversation_id))
+
+    @api.api_route("/conversations/{conversation_id}", methods=["GET", "DELETE"])
+    async def proxy_conversation(request: Request, conversation_id: UUID):
+        return await proxy_request(request, pool.get_worker(conversation_id))
+
+    @api.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+    async def proxy_other(request: Request):
+        # Anything else (e.g.: docs) is the same on every worker
+        return await proxy_request(request, pool.get_client(0))
+
+    api.add_middleware(LocalhostCORSMiddleware, config.allow_cors_origins)
+    if config.session_api_key:
+        api.add_middleware(ValidateSessionAPIKeyMiddleware, config.session_api_key)
+    return api
+
+
+def forward_headers(request: Request) -> dict[str, str]:
+    return {
+        key: value
+        for key, value in request.headers.items()
+        if key.lower() not in _HOP_BY_HOP_HEADERS
+    }
+
+
+def get_path_with_query(connection: HTTPConnection) -> str:
+    path = connection.url.path
+    if connection.url.query:
+        path += "?" + connection.url.query
+    return path
+
+
+def to_response(response: httpx.Response) -> Response:
+    return Response(
+        response.content,
+        status_code=response.status_code,
+        media_type=response.headers.get("content-type"),
+    )
+
+
+async def proxy_request(request: Request, client: httpx.AsyncClient) -> Response:
+    """Forward a request to the server for the client given, streaming back the
+    response (Or a 503 if the server is unreachable)"""
+    response = await send_upstream(
+        request, client, await request.body(), forward_headers(request)
+    )
+    if response is None:
+        return Response(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return stream_response(response)
+
+
+async def send_upstream(
+    request: Request, client: httpx.AsyncClient, body: bytes, headers: dict[str, str]
+) -> httpx.Response | None:
+    """Send a copy of a request to the server for the client given, returning the
+    response once its headers have been received (Or None if the server is
+    unreachable)"""
+    upstream_request = client.build_request(
+        request.method,
+        request.url.path,
+        params=request.query_params,
+        headers=headers,
+        content=body,
+    )
+    try:
+        return await client.send(upstream_request, stream=True)
+    except httpx.TransportError:
+        return None
+
+
+def stream_response(response: httpx.Response) -> Response:
+    """Stream an upstream response back to the client"""
+    headers = {
+        key: value
+        for key, value in response.headers.items()
+        if key.lower() not in _HOP_BY_HOP_HEADERS
+    }
+    return StreamingResponse(
+        response.aiter_raw(),
+        status_code=response.status_code,
+        headers=headers,
+        background=BackgroundTask(response.aclose),
+    )
+
+
+async def fan_out(
+    clients: list[httpx.AsyncClient], method: str, path: str, **kwargs
+) -> list[httpx.Response]:
+    """Send a request to each of the clients given, in parallel. Servers which
+    are unreachable are given a 503 response."""
+    results = await asyncio.gather(
+        *[client.request(method, path, **kwargs) for client in clients],
+        return_exceptions=True,
+    )
+    responses = []
+    for result in results:
+        if isinstance(result, BaseException):
+            if not isinstance(result, httpx.TransportError):
+                raise result
+            result = httpx.Response(status.HTTP_503_SERVICE_UNAVAILABLE)
+        responses.append(result)
+    return responses
+
+
+def merge_conversation_pages(
+    pages: list[dict], sort_order: ConversationSortOrder, limit: int
+) -> dict:
+    """Merge pages of conversations from each shard (Or node). Cursors encode the
+    sort key of the next item, so the same page_id is valid for every shard, and
+    the next page starts at the first item not included from any shard."""
+    attr = "created_at"
+    if sort_order.value.startswith("UPDATED_AT"):
+        attr = "updated_at"
+    descending = sort_order.value.endswith("_DESC")
+
+    def get_key(item: dict) -> tuple[datetime, UUID]:
+        return datetime.fromisoformat(item[attr]), UUID(item["id"])
+
+    items = sorted(
+        (item for page in pages for item in page["items"]),
+        key=get_key,
+        reverse=descending,
+    )
+    next_keys = [get_key(item) for item in items[limit:]]
+    next_keys.extend(
+        decode_page_id(page["next_page_id"]) for page in pages if page["next_page_id"]
+    )
+    next_page_id = None
+    if next_keys:
+        next_page_id = encode_page_id(max(next_keys) if descending else min(next_keys))
+    return {"items": items[:limit], "next_page_id": next_page_id}
+
+
+async def proxy_websocket(
+    websocket: WebSocket,
+    uri: str,
+    socket_path: Path | None = None,
+    extra_headers: dict[str, str] | None = None,
+):
+    """Accept a WebSocket and bridge it to the uri given (Over the unix domain
+    socket given, if any). The subprotocol negotiated upstream is passed back to
+    the client, and the close code upstream is passed through."""
+    headers = [
+        (key, value)
+        for key, value in websocket.headers.items()
+        if key.lower() in ("x-session-api-key", "authorization")
+    ]
+    headers.extend((extra_headers or {}).items())
+    subprotocols = websocket.scope.get("subprotocols") or None
+    try:
+        if socket_path:
+            upstream = await unix_connect(
+                str(socket_path),
+                uri=uri,
+                subprotocols=subprotocols,
+                additional_headers=headers,
+            )
+        else:
+            upstream = await connect(
+                uri, subprotocols=subprotocols, additional_headers=headers
+            )
+    except Exception as e:
+        logger.warning(f"error_connecting_upstream:{uri}:{e}")
+        await websocket.close(status.WS_1013_TRY_AGAIN_LATER)
+        return
+    await websocket.accept(subprotocol=upstream.subprotocol)
+    tasks = [
+        asyncio.create_task(_client_to_upstream(websocket, upstream)),
+        asyncio.create_task(_upstream_to_client(upstream, websocket)),
+    ]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await upstream.close()
+
+
+async def _client_to_upstream(websocket: WebSocket, upstream: ClientConnection):
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes") is not None:
+                await upstream.send(message["bytes"])
+            elif message.get("text") is not None:
+                await upstream.send(message["text"])
+    except (WebSocketDisconnect, ConnectionClosed):
+        return
+
+
+async def _upstream_to_client(upstream: ClientConnection, websocket: WebSocket):
+    try:
+        async for data in upstream:
+            if isinstance(data, bytes):
+                await websocket.send_bytes(data)
+            else:
+                await websocket.send_text(data)
+        code = upstream.close_code or status.WS_1000_NORMAL_CLOSURE
+    except ConnectionClosed as e:
+        code = e.rcvd.code if e.rcvd else status.WS_1011_INTERNAL_ERROR
+    except WebSocketDisconnect:
+        return
+    await websocket.close(code)
@@ -1,33 +1,125 @@
+import asyncio
+from collections import deque
 from dataclasses import dataclass, field
+from typing import Awaitable, Callable
 from uuid import UUID, uuid4
 
 from openhands.sdk.event import Event
 from openhands.sdk.logger import get_logger
 from openhands.sdk.utils.async_utils import AsyncConversationCallback
+from openhands_server.sdk_server.metrics import EVENTS_DROPPED, EVENTS_PUBLISHED
+from openhands_server.sdk_server.models import OverflowPolicy, SubscriberStats
 
 
 logger = get_logger(__name__)
+# Bound once, so updating them allocates nothing per event
+_events_published = EVENTS_PUBLISHED.labels()
+_events_dropped = EVENTS_DROPPED.labels()
+OverflowCallback = Callable[[], Awaitable[None]]
+# Kinds of events which are snapshots of state, so a later event of the same kind
+# supersedes an earlier one. Any other events are distinct, and never coalesced.
+SUPERSEDABLE_EVENT_KINDS = frozenset(("ConversationStateUpdateEvent",))
+
+
+@dataclass
+class _Subscription:
+    """A callback along with its queue of pending events and the task which
+    delivers them."""
+
+    callback: AsyncConversationCallback
+    policy: OverflowPolicy
+    max_queue_size: int | None
+    on_overflow: OverflowCallback | None
+    queue: deque[Event] = field(default_factory=deque)
+    ready: asyncio.Event = field(default_factory=asyncio.Event)
+    task: asyncio.Task | None = None
+    delivered: int = 0
+    dropped: int = 0
+
+    def enqueue(self, event: Event) -> bool:
+        """Add an event to the queue, applying the overflow policy if it is full.
+        Returns False if the subscription should be disconnected."""
+        queue = self.queue
+        if self.max_queue_size is not None and len(queue) >= self.max_queue_size:
+            if self.policy == OverflowPolicy.DISCONNECT:
+                self.dropped += len(queue) + 1
+                _events_dropped.inc(len(queue) + 1)
+                queue.clear()
+                return False
+            if (
+                self.policy == OverflowPolicy.COALESCE
+                and type(event).__name__ in SUPERSEDABLE_EVENT_KINDS
+            ):
+                self._remove_superseded(event)
+            if len(queue) >= self.max_queue_size:
+                queue.popleft()
+            self.dropped += 1
+            _events_dropped.inc()
+        queue.append(event)
+        self.ready.set()
+        return True
+
+    def _remove_superseded(self, event: Event):
+        # Drop the most recent queued event of the same type, which the new event
+        # supersedes. Order of the remaining events is preserved.
+        event_type = type(event)
+        for index in range(len(self.queue) - 1, -1, -1):
+            if type(self.queue[index]) is event_type:
+                del self.queue[index]
+                return
+
+    async def send(self, callback_id: UUID):
+        while True:
+            while not self.queue:
+                self.ready.clear()
+                await self.ready.wait()
+            event = self.queue.popleft()
+            try:
+                await self.callback(event)
+            except Exception as e:
+                logger.error(f"Error in callback {callback_id}: {e}", exc_info=True)
+            self.delivered += 1
 
 
 @dataclass
 class PubSub:
     """A subscription service that extends ConversationCallbackType functionality.
     This class maintains a dictionary of UUIDs to ConversationCallbackType instances
-    and provides methods to subscribe/unsubscribe callbacks. When invoked, it calls
-    all registered callbacks with proper error handling.
+    and provides methods to subscribe/unsubscribe callbacks. When invoked, it queues
+    the event for every registered callback without waiting for delivery.
+
+    Each callback has its own bounded queue and sender task, so a slow callback
+    (e.g. a WebSocket client on a poor connection) does not delay delivery to any
+    other. What happens when a queue is full is determined by the OverflowPolicy of
+    the subscription.
     """
 
-    _callbacks: dict[UUID, AsyncConversationCallback] = field(default_factory=dict)
+    _subscriptions: dict[UUID, _Subscription] = field(default_factory=dict)
+    _overflow_tasks: set[asyncio.Task] = field(default_factory=set)
 
-    def subscribe(self, callback: AsyncConversationCallback) -> UUID:
+    def subscribe(
+        self,
+        callback: AsyncConversationCallback,
+        policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        max_queue_size: int | None = 1024,
+        on_overflow: OverflowCallback | None = None,
+    ) -> UUID:
         """Subscribe a callback and return its UUID for later unsubscription.
         Args:
             callback: The callback function to register
+            policy: What to do when the queue for the callback is full
+            max_queue_size: The max number of pending events (None for unbounded)
+            on_overflow: Invoked after a DISCONNECT subscription is removed
         Returns:
             str: UUID that can be used to unsubscribe this callback
         """
         callback_id = uuid4()
-        self._callbacks[callback_id] = callback
+        self._subscriptions[callback_id] = _Subscription(
+            callback=callback,
+            policy=policy,
+            max_queue_size=max_queue_size,
+            on_overflow=on_overflow,
+        )
         logger.debug(f"Subscribed callback with ID: {callback_id}")
         return callback_id
 
@@ -38,8 +130,10 @@ class PubSub:
         Returns:
             bool: True if callback was found and removed, False otherwise
         """
-        if callback_id in self._callbacks:
-            del self._callbacks[callback_id]
+        subscription = self._subscriptions.pop(callback_id, None)
+        if subscription:
+            if subscription.task:
+                subscription.task.cancel()
             logger.debug(f"Unsubscribed callback with ID: {callback_id}")
             return True
         else:
@@ -49,17 +143,20 @@ class PubSub:
             return False
 
     async def __call__(self, event: Event) -> None:
-        """Invoke all registered callbacks with the given event.
-        Each callback is invoked in its own try/catch block to prevent
-        one failing callback from affecting others.
+        """Queue the given event for all registered callbacks. Delivery happens in
+        the sender task for each callback, so this does not wait for callbacks.
         Args:
             event: The event to pass to all callbacks
         """
-        for callback_id, callback in self._callbacks.items():
-            try:
-                await callback(event)
-            except Exception as e:
-                logger.error(f"Error in callback {callback_id}: {e}", exc_info=True)
+        _events_published.inc()
+        overflowed = []
+        for callback_id, subscription in self._subscriptions.items():
+            if not subscription.enqueue(event):
+                overflowed.append(callback_id)
+            elif subscription.task is None:
+                subscription.task = asyncio.create_task(subscription.send(callback_id))
+        for callback_id in overflowed:
+            self._disconnect(callback_id)
 
     async def on_event(self, event: Event) -> None:
         """Alias for __call__ method.
@@ -71,10 +168,46 @@ class PubSub:
     @property
     def callback_count(self) -> int:
         """Return the number of registered callbacks."""
-        return len(self._callbacks)
+        return len(self._subscriptions)
+
+    def get_stats(self) -> list[SubscriberStats]:
+        """Get queue depth and delivery counters for each registered callback."""
+        return [
+            SubscriberStats(
+                subscriber_id=callback_id,
+                policy=subscription.policy,
+                queue_depth=len(subscription.queue),
+                max_queue_size=subscription.max_queue_size,
+                delivered=subscription.delivered,
+                dropped=subscription.dropped,
+            )
+            for callback_id, subscription in self._subscriptions.items()
+        ]
 
     def clear(self) -> None:
         """Remove all registered callbacks."""
-        count = len(self._callbacks)
-        self._callbacks.clear()
+        count = len(self._subscriptions)
+        for subscription in self._subscriptions.values():
+            if subscription.task:
+                subscription.task.cancel()
+        self._subscriptions.clear()
         logger.debug(f"Cleared {count} callbacks")
+
+    def _disconnect(self, callback_id: UUID):
+        subscription = self._subscriptions.get(callback_id)
+        if subscription is None:
+            return
+        logger.warning(f"Disconnecting callback with full queue: {callback_id}")
+        self.unsubscribe(callback_id)
+        on_overflow = subscription.on_overflow
+        if on_overflow:
+            # Run in the background - the subscriber is presumably slow
+            task = asyncio.create_task(self._run_on_overflow(callback_id, on_overflow))
+            self._overflow_tasks.add(task)
+            task.add_done_callback(self._overflow_tasks.discard)
+
+    async def _run_on_overflow(self, callback_id: UUID, on_overflow: OverflowCallback):
+        try:
+            await on_overflow()
+        except Exception as e:
+            logger.error(f"Error in overflow {callback_id}: {e}", exc_info=True)
@@ -0,0 +1,172 @@
+import asyncio
+import heapq
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+from uuid import UUID
+
+from openhands.sdk.logger import get_logger
+from openhands_server.sdk_server.models import RunQueueInfo, RunQueueState
+
+
+logger = get_logger(__name__)
+
+
+@dataclass(order=True)
+class _PendingRun:
+    priority: int
+    sequence: int
+    conversation_id: UUID = field(compare=False)
+    fn: Callable[[], Any] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    queued_at: float = field(compare=False, default_factory=time.monotonic)
+
+
+@dataclass
+class _ActiveRun:
+    queued_at: float
+    started_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class RunScheduler:
+    """Scheduler for conversation runs. An agent run occupies a thread for as long
+    as the agent is working, so runs are given their own pool of threads limited to
+    max_running conversations at a time. Runs beyond this wait in a queue ordered
+    by priority (lower first) and then FIFO. Short control operations (sending
+    messages, pausing, closing) use a separate pool, so they are never stuck
+    behind running agents."""
+
+    max_running: int = 16
+    control_workers: int = 4
+    _pending: list[_PendingRun] = field(default_factory=list, init=False)
+    _active: dict[UUID, _ActiveRun] = field(default_factory=dict, init=False)
+    _sequence: itertools.count = field(default_factory=itertools.count, init=False)
+    _run_executor: ThreadPoolExecutor | None = field(default=None, init=False)
+    _control_executor: ThreadPoolExecutor | None = field(default=None, init=False)
+    _control_in_flight: int = field(default=0, init=False)
+
+    def submit_run(
+        self, conversation_id: UUID, fn: Callable[[], Any], priority: int = 0
+    ) -> asyncio.Future:
+        """Queue a run for a conversation, returning a future which resolves when it
+        completes. If a run for the conversation is already waiting in the queue,
+        its future is returned rather than queueing another."""
+        for pending in self._pending:
+            if pending.conversation_id == conversation_id:
+                return pending.future
+        future = asyncio.get_running_loop().create_future()
+        # Errors are logged when the run ends, even if nothing awaits the future
+        future.add_done_callback(_consume_exception)
+        heapq.heappush(
+            self._pending,
+            _PendingRun(priority, next(self._sequence), conversation_id, fn, future),
+        )
+        self._dispatch()
+        return future
+
+    def run_control(self, fn: Callable[..., Any], *args: Any) -> asyncio.Future:
+        """Run a short control operation in the control pool"""
+        if self._control_executor is None:
+            self._control_executor = ThreadPoolExecutor(
+                self.control_workers, thread_name_prefix="control"
+            )
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._control_executor, fn, *args)
+        self._control_in_flight += 1
+        future.add_done_callback(self._on_control_done)
+        return future
+
+    def _on_control_done(self, future: asyncio.Future):
+        self._control_in_flight -= 1
+
+    def get_running_count(self) -> int:
+        return len(self._active)
+
+    def get_pending_count(self) -> int:
+        return len(self._pending)
+
+    def get_control_queue_depth(self) -> int:
+        """Get the number of control operations waiting for a free thread"""
+        return max(self._control_in_flight - self.control_workers, 0)
+
+    def get_queue_info(self, conversation_id: UUID) -> RunQueueInfo:
+        """Get the position of a conversation in the run queue, and how long it has
+        been waiting (Or how long it waited before starting, if running)"""
+        info = RunQueueInfo(
+            state=RunQueueState.IDLE,
+            running_count=len(self._active),
+            pending_count=len(self._pending),
+            max_running=self.max_running,
+        )
+        active = self._active.get(conversation_id)
+        if active:
+            info.state = RunQueueState.RUNNING
+            info.wait_seconds = active.started_at - active.queued_at
+            return info
+        pending = next(
+            (p for p in self._pending if p.conversation_id == conversation_id), None
+        )
+        if pending:
+            info.state = RunQueueState.QUEUED
+            info.position = sum(1 for p in self._pending if p < pending)
+            info.wait_seconds = time.monotonic() - pending.queued_at
+        return info
+
+    def shutdown(self):
+        """Cancel queued runs and stop accepting work. Running agents are not
+        interrupted."""
+        for pending in self._pending:
+            pending.future.cancel()
+        self._pending.clear()
+        for executor in (self._run_executor, self._control_executor):
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self._run_executor = None
+        self._control_executor = None
+
+    def _dispatch(self):
+        skipped = []
+        while self._pending and len(self._active) < self.max_running:
+            pending = heapq.heappop(self._pending)
+            if pending.conversation_id in self._active:
+                # A conversation runs at most once at a time
+                skipped.append(pending)
+            else:
+                self._start(pending)
+        for pending in skipped:
+            heapq.heappush(self._pending, pending)
+
+    def _start(self, pending: _PendingRun):
+        if self._run_executor is None:
+            self._run_executor = ThreadPoolExecutor(
+                self.max_running, thread_name_prefix="run"
+            )
+        conversation_id = pending.conversation_id
+        self._active[conversation_id] = _ActiveRun(queued_at=pending.queued_at)
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._run_executor, pending.fn)
+
+        def on_done(done: asyncio.Future):
+            self._active.pop(conversation_id, None)
+            if not pending.future.done():
+                if done.cancelled():
+                    pending.future.cancel()
+                elif done.exception():
+                    logger.error(
+                        f"Error in run {conversation_id}: {done.exception()}",
+                        exc_info=done.exception(),
+                    )
+                    pending.future.set_exception(done.exception())  # type: ignore
+                else:
+                    pending.future.set_result(done.result())
+            self._dispatch()
+
+        future.add_done_callback(on_done)
+
+
+def _consume_exception(future: asyncio.Future):
+    if not future.cancelled():
+        future.exception()
@@ -0,0 +1,547 @@
+"""
+FileStore for conversations which keeps events in append-only segment files rather
+than a file per event, with a fixed width binary index of where each is stored.
+"""
+
+import mmap
+import os
+import struct
+import threading
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from openhands.sdk.io import FileStore, LocalFileStore
+from openhands.sdk.logger import get_logger
+
+
+logger = get_logger(__name__)
+LOG_DIR = ".log"
+INDEX_FILE = "index.bin"
+# Files imported from a LocalFileStore are moved here (Within the LOG_DIR)
+IMPORTED_DIR = "imported"
+_INDEX_MAGIC = b"OHIDX001"
+# Magic and the number of entries
+_INDEX_HEADER = struct.Struct("<8sQ")
+# Segment, offset and length of the record, flags, name length and name
+_INDEX_ENTRY = struct.Struct("<IQIBB110s")
+_MAX_NAME_LENGTH = 110
+# Length of the contents, crc32 of the name and contents, flags and name length
+_RECORD_HEADER = struct.Struct("<IIBH")
+_DELETED = 1
+_SEGMENT_SUFFIX = ".seg"
+
+
+@dataclass
+class _Entry:
+    segment: int
+    offset: int
+    length: int
+    flags: int
+    name: str
+
+
+class SegmentedFileStore(FileStore):
+    """FileStore which keeps files with paths starting with one of the
+    log_prefixes (Events, by default) in append-only segment files, and
+    everything else (e.g.: base_state.json) as regular files.
+
+    Each write appends a record (With a crc32 of its content) to the active
+    segment, which is rolled over once it reaches segment_size. The location of
+    each record is kept in a fixed width binary index which is memory mapped, so
+    that reading a file is a lookup in the index followed by a single read of the
+    record - no other records are parsed, and loading requires no directory scans.
+    Records written after the last entry in the index (e.g.: Because of a crash)
+    are recovered from the segments when the store is opened, and torn writes at
+    the end of a segment are truncated.
+
+    Reads only hold the lock to look up the record and pin the segment it is in,
+    so they do not wait for writes (or syncs, or compaction) to read it. Segments
+    compacted (or closed) while pinned are closed once the last read is done.
+
+    Overwrites and deletes leave dead records behind. Sealed segments in which
+    at least compaction_threshold of the bytes are dead are rewritten in a
+    background thread.
+
+    Files stored by a LocalFileStore at the same root are imported the first
+    time the store is opened, and then moved to .log/imported rather than deleted.
+    The import is one way - new events are only written to the segments, so once
+    a store has a .log directory it should not be opened as a LocalFileStore
+    again (is_segmented_store).
+    """
+
+    def __init__(
+        self,
+        root: str,
+        log_prefixes: tuple[str, ...] = ("events/",),
+        segment_size: int = 8 * 1024 * 1024,
+        compaction_threshold: float = 0.5,
+        fsync: bool = False,
+    ):
+        self.root = Path(root)
+        self.log_prefixes = log_prefixes
+        self.segment_size = segment_size
+        self.compaction_threshold = compaction_threshold
+        self.fsync = fsync
+        self._files = LocalFileStore(root)
+        self._log_path = self.root / LOG_DIR
+        self._lock = threading.RLock()
+        self._names: dict[str, int] = {}
+        self._segments: dict[int, int] = {}
+        # Reads in progress for each segment fd, and fds to close once they are done
+        self._fd_readers: dict[int, int] = {}
+        self._retired_fds: set[int] = set()
+        self._segment_sizes: dict[int, int] = {}
+        self._dead_bytes: dict[int, int] = {}
+        self._active_segment = 0
+        self._index_file: BinaryIO | None = None
+        self._index_map: mmap.mmap | None = None
+        self._count = 0
+        self._capacity = 0
+        self._compaction_thread: threading.Thread | None = None
+        with self._lock:
+            self._open()
+
+    @staticmethod
+    def is_segmented_store(root: str | Path) -> bool:
+        """Whether files at the root given have been kept by a SegmentedFileStore
+        (In which case a LocalFileStore at the root would be missing them)"""
+        return (Path(root) / LOG_DIR).is_dir()
+
+    def write(self, path: str, contents: str | bytes) -> None:
+        name = _normalize(path)
+        if not self._is_logged(name):
+            self._files.write(path, contents)
+            return
+        if isinstance(contents, str):
+            contents = contents.encode("utf-8")
+        with self._lock:
+            self._append(name, contents, 0)
+        self._maybe_compact()
+
+    def read(self, path: str) -> str:
+        name = _normalize(path)
+        if not self._is_logged(name):
+            return self._files.read(path)
+        with self._lock:
+            slot = self._names.get(name)
+            if slot is None:
+                raise FileNotFoundError(path)
+            entry = self._get_entry(slot)
+            fd = self._get_segment(entry.segment)
+            self._fd_readers[fd] = self._fd_readers.get(fd, 0) + 1
+        try:
+            record = os.pread(fd, entry.length, entry.offset)
+        finally:
+            self._release_fd(fd)
+        _, _, contents = _decode_record(record)
+        return contents.decode("utf-8")
+
+    def delete(self, path: str) -> None:
+        name = _normalize(path)
+        directory = name.rstrip("/") + "/"
+        with self._lock:
+            for logged in list(self._names):
+                if logged == name or logged.startswith(directory) or not name:
+                    self._append(logged, b"", _DELETED)
+        if name and name != LOG_DIR and (self.root / name).exists():
+            self._files.delete(path)
+        self._maybe_compact()
+
+    def get_count(self) -> int:
+        """Get the number of files in the log"""
+        return len(self._names)
+
+    def compact(self) -> int:
+        """Rewrite sealed segments in which at least compaction_threshold of the
+        bytes are dead, returning the number of bytes reclaimed"""
+        reclaimed = 0
+        for segment in self._get_compactable_segments():
+            with self._lock:
+                if segment not in self._segment_sizes:
+                    continue
+                live = [
+                    (name, entry)
+                    for name, entry in (
+                        (name, self._get_entry(slot))
+                        for name, slot in self._names.items()
+                    )
+                    if entry.segment == segment
+                ]
+                fd = self._get_segment(segment)
+                for name, entry in live:
+                    record = os.pread(fd, entry.length, entry.offset)
+                    _, _, contents = _decode_record(record)
+                    self._append(name, contents, 0)
+                reclaimed += self._segment_sizes.pop(segment)
+                self._dead_bytes.pop(segment, None)
+                self._close_fd(self._segments.pop(segment))
+                # Entries for the segment left in the index until it is rewritten
+                # are skipped on load
+                self._get_segment_path(segment).unlink()
+        if reclaimed:
+            with self._lock:
+                self._rewrite_index()
+        return reclaimed
+
+    def close(self):
+        thread = self._compaction_thread
+        if thread:
+            thread.join()
+        with self._lock:
+            if self._index_map:
+                self._index_map.close()
+                self._index_map = None
+            if self._index_file:
+                self._index_file.close()
+                self._index_file = None
+            for fd in self._segments.values():
+                self._close_fd(fd)
+            self._segments.clear()
+
+    def _release_fd(self, fd: int):
+        with self._lock:
+            readers = self._fd_readers.pop(fd) - 1
+            if readers:
+                self._fd_readers[fd] = readers
+            elif fd in self._retired_fds:
+                self._retired_fds.discard(fd)
+                os.close(fd)
+
+    def _close_fd(self, fd: int):
+        """Close a segment fd, once any reads from it are done"""
+        if self._fd_readers.get(fd):
+            self._retired_fds.add(fd)
+        else:
+            os.close(fd)
+
+    def _is_logged(self, name: str) -> bool:
+        return (
+            any(name.startswith(prefix) for prefix in self.log_prefixes)
+            and len(name.encode("utf-8")) <= _MAX_NAME_LENGTH
+        )
+
+    def _open(self):
+        self._log_path.mkdir(parents=True, exist_ok=True)
+        index_path = self._log_path / INDEX_FILE
+        segments = sorted(
+            int(path.stem)
+            for path in self._log_path.iterdir()
+            if path.suffix == _SEGMENT_SUFFIX and path.stem.isdigit()
+        )
+        for segment in segments:
+            self._segment_sizes[segment] = (
+                self._get_segment_path(segment).stat().st_size
+            )
+            self._dead_bytes[segment] = 0
+        self._active_segment = segments[-1] if segments else 0
+        self._segment_sizes.setdefault(self._active_segment, 0)
+        self._dead_bytes.setdefault(self._active_segment, 0)
+        # Segments are only missing before anything has been written (If the
+        # index alone is missing, it is rebuilt from the segments)
+        is_new = not segments and not index_path.exists()
+        self._open_index(index_path)
+        indexed_end = self._load_index()
+        self._recover_segments(segments, indexed_end)
+        self._count_dead_bytes()
+        if is_new:
+            self._import_files()
+
+    def _count_dead_bytes(self):
+        """Set the dead bytes in each segment to its size less that of the live
+        records in it, as records replaced before the index was last rewritten
+        are no longer in the index"""
+        live_bytes = dict.fromkeys(self._segment_sizes, 0)
+        for slot in self._names.values():
+            entry = self._get_entry(slot)
+            live_bytes[entry.segment] = live_bytes.get(entry.segment, 0) + entry.length
+        for segment, size in self._segment_sizes.items():
+            self._dead_bytes[segment] = size - live_bytes[segment]
+
+    def _open_index(self, index_path: Path):
+        if not index_path.exists():
+            _create_index(index_path, [])
+        file = open(index_path, "r+b")
+        index_map = mmap.mmap(file.fileno(), 0)
+        magic, count = _INDEX_HEADER.unpack_from(index_map, 0)
+        capacity = (len(index_map) - _INDEX_HEADER.size) // _INDEX_ENTRY.size
+        if magic != _INDEX_MAGIC or count > capacity:
+            # Rebuilt from the segments
+            logger.warning(f"invalid_event_index:{index_path}")
+            index_map.close()
+            file.close()
+            _create_index(index_path, [])
+            file = open(index_path, "r+b")
+            index_map = mmap.mmap(file.fileno(), 0)
+            count = 0
+            capacity = (len(index_map) - _INDEX_HEADER.size) // _INDEX_ENTRY.size
+        self._index_file = file
+        self._index_map = index_map
+        self._count = count
+        self._capacity = capacity
+
+    def _load_index(self) -> dict[int, int]:
+        """Load the names in the index, returning the end of the last indexed
+        record in each segment"""
+        assert self._index_map is not None
+        indexed_end: dict[int, int] = {}
+        names = self._names
+        entries = _INDEX_ENTRY.iter_unpack(
+            self._index_map[
+                _INDEX_HEADER.size : _INDEX_HEADER.size
+                + self._count * _INDEX_ENTRY.size
+            ]
+        )
+        for slot, (segment, offset, length, flags, name_length, name) in enumerate(
+            entries
+        ):
+            segment_size = self._segment_sizes.get(segment)
+            if segment_size is None and segment < self._active_segment:
+                # The segment was compacted before the index was rewritten
+                continue
+            end = offset + length
+            if end > (segment_size or 0):
+                # Points past the end of the segment (e.g.: The segment was not
+                # synced before a crash) - later records are recovered if intact
+                self._set_count(slot)
+                break
+            indexed_end[segment] = end
+            decoded_name = name[:name_length].decode("utf-8")
+            if flags or decoded_name in names:
+                entry = _Entry(segment, offset, length, flags, decoded_name)
+                self._apply(entry, slot)
+            else:
+                names[decoded_name] = slot
+        return indexed_end
+
+    def _recover_segments(self, segments: list[int], indexed_end: dict[int, int]):
+        """Add records which were written after the last entry in the index. The
+        index is authoritative for records before that."""
+        last_indexed = max(indexed_end, default=-1)
+        for segment in segments:
+            if segment < last_indexed:
+                continue
+            offset = indexed_end.get(segment, 0)
+            fd = self._get_segment(segment)
+            size = self._segment_sizes[segment]
+            while offset < size:
+                header = os.pread(fd, _RECORD_HEADER.size, offset)
+                try:
+                    contents_length, _, _, name_length = _RECORD_HEADER.unpack(header)
+                    length = _RECORD_HEADER.size + name_length + contents_length
+                    name, flags, _ = _decode_record(os.pread(fd, length, offset))
+                except (struct.error, ValueError):
+                    # A torn write at the end of the segment
+                    logger.warning(f"truncating_event_segment:{segment}:{offset}")
+                    os.ftruncate(fd, offset)
+                    self._segment_sizes[segment] = offset
+                    break
+                entry = _Entry(segment, offset, length, flags, name)
+                self._apply(entry, self._add_entry(entry))
+                offset += length
+
+    def _import_files(self):
+        imported_path = self._log_path / IMPORTED_DIR
+        for prefix in self.log_prefixes:
+            directory = self.root / prefix
+            if not directory.is_dir():
+                continue
+            paths = sorted(directory.rglob("*"))
+            for path in paths:
+                name = path.relative_to(self.root).as_posix()
+                if path.is_file() and self._is_logged(name):
+                    self._append(name, path.read_bytes(), 0)
+                    # Kept, but out of the way of listings of the store
+                    target = imported_path / name
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    path.replace(target)
+            for path in [directory, *paths][::-1]:
+                if path.is_dir() and not any(path.iterdir()):
+                    path.rmdir()
+
+    def _append(self, name: str, contents: bytes, flags: int):
+        encoded_name = name.encode("utf-8")
+        crc = zlib.crc32(contents, zlib.crc32(encoded_name))
+        record = (
+            _RECORD_HEADER.pack(len(contents), crc, flags, len(encoded_name))
+            + encoded_name
+            + contents
+        )
+        segment = self._active_segment
+        offset = self._segment_sizes[segment]
+        if offset and offset + len(record) > self.segment_size:
+            # Roll over - the previous segment is never written again
+            segment += 1
+            offset = 0
+            self._active_segment = segment
+            self._segment_sizes[segment] = 0
+            self._dead_bytes[segment] = 0
+        fd = self._get_segment(segment)
+        os.pwrite(fd, record, offset)
+        self._segment_sizes[segment] = offset + len(record)
+        if self.fsync:
+            os.fsync(fd)
+        entry = _Entry(segment, offset, len(record), flags, name)
+        self._apply(entry, self._add_entry(entry))
+        if self.fsync and self._index_map:
+            self._index_map.flush()
+
+    def _apply(self, entry: _Entry, slot: int):
+        previous = self._names.get(entry.name)
+        if previous is not None:
+            previous_entry = self._get_entry(previous)
+            self._dead_bytes[previous_entry.segment] += previous_entry.length
+        if entry.flags & _DELETED:
+            self._names.pop(entry.name, None)
+            self._dead_bytes[entry.segment] += entry.length
+        else:
+            self._names[entry.name] = slot
+
+    def _add_entry(self, entry: _Entry) -> int:
+        assert self._index_map is not None and self._index_file is not None
+        if self._count == self._capacity:
+            self._capacity = max(self._capacity * 2, 1024)
+            self._index_map.close()
+            self._index_file.truncate(
+                _INDEX_HEADER.size + self._capacity * _INDEX_ENTRY.size
+            )
+            self._index_map = mmap.mmap(self._index_file.fileno(), 0)
+        slot = self._count
+        _INDEX_ENTRY.pack_into(
+            self._index_map,
+            _INDEX_HEADER.size + slot * _INDEX_ENTRY.size,
+            *_pack_entry(entry),
+        )
+        self._set_count(slot + 1)
+        return slot
+
+    def _get_entry(self, slot: int) -> _Entry:
+        assert self._index_map is not None
+        segment, offset, length, flags, name_length, name = _INDEX_ENTRY.unpack_from(
+            self._index_map, _INDEX_HEADER.size + slot * _INDEX_ENTRY.size
+        )
+        return _Entry(
+            segment, offset, length, flags, name[:name_length].decode("utf-8")
+        )
+
+    def _set_count(self, count: int):
+        assert self._index_map is not None
+        self._count = count
+        _INDEX_HEADER.pack_into(self._index_map, 0, _INDEX_MAGIC, count)
+
+    def _rewrite_index(self):
+        """Replace the index with one holding only live entries"""
+        entries = [self._get_entry(slot) for slot in self._names.values()]
+        index_path = self._log_path / INDEX_FILE
+        temp_path = index_path.with_suffix(".tmp")
+        _create_index(temp_path, entries)
+        if self.fsync:
+            with open(temp_path, "rb") as file:
+                os.fsync(file.fileno())
+        assert self._index_map is not None and self._index_file is not None
+        self._index_map.close()
+        self._index_file.close()
+        os.replace(temp_path, index_path)
+        self._names = {entry.name: slot for slot, entry in enumerate(entries)}
+        self._open_index(index_path)
+
+    def _get_compactable_segments(self) -> list[int]:
+        with self._lock:
+            return [
+                segment
+                for segment, size in self._segment_sizes.items()
+                if segment != self._active_segment
+                and size
+                and self._dead_bytes.get(segment, 0) / size >= self.compaction_threshold
+            ]
+
+    def _maybe_compact(self):
+        if not self._get_compactable_segments():
+            return
+        with self._lock:
+            thread = self._compaction_thread
+            if thread and thread.is_alive():
+                return
+            thread = threading.Thread(
+                target=self._compact_in_background, name="compact_events", daemon=True
+            )
+            self._compaction_thread = thread
+            thread.start()
+
+    def _compact_in_background(self):
+        try:
+            reclaimed = self.compact()
+            logger.info(f"compacted_event_segments:{self.root}:{reclaimed}")
+        except Exception:
+            logger.exception("error_compacting_event_segments", stack_info=True)
+
+    def _get_segment(self, segment: int) -> int:
+        fd = self._segments.get(segment)
+        if fd is None:
+            if self._index_map is None:
+                raise ValueError("closed_file_store")
+            fd = os.open(self._get_segment_path(segment), os.O_RDWR | os.O_CREAT, 0o644)
+            self._segments[segment] = fd
+        return fd
+
+    def _get_segment_path(self, segment: int) -> Path:
+        return self._log_path / f"{segment:08d}{_SEGMENT_SUFFIX}"
+
+    # Defined last, as it shadows the builtin within the class body
+    def list(self, path: str) -> list[str]:
+        directory = _normalize(path).rstrip("/")
+        prefix = directory + "/" if directory else ""
+        results: dict[str, None] = {}
+        try:
+            for result in self._files.list(path):
+                if _normalize(result).rstrip("/") != LOG_DIR:
+                    results[result] = None
+        except FileNotFoundError:
+            pass
+        found = bool(results)
+        with self._lock:
+            names = list(self._names)
+        for name in names:
+            if not name.startswith(prefix):
+                continue
+            found = True
+            child, slash, _ = name[len(prefix) :].partition("/")
+            # Joined with the path as given, as by a LocalFileStore
+            results[os.path.join(path, child) + slash] = None
+        if not found:
+            raise FileNotFoundError(path)
+        return list(results)
+
+
+def _normalize(path: str) -> str:
+    return path.lstrip("/")
+
+
+def _pack_entry(entry: _Entry) -> tuple:
+    name = entry.name.encode("utf-8")
+    return (entry.segment, entry.offset, entry.length, entry.flags, len(name), name)
+
+
+def _create_index(path: Path, entries: list[_Entry]):
+    capacity = max(len(entries) * 2, 1024)
+    buffer = bytearray(_INDEX_HEADER.size + capacity * _INDEX_ENTRY.size)
+    _INDEX_HEADER.pack_into(buffer, 0, _INDEX_MAGIC, len(entries))
+    for slot, entry in enumerate(entries):
+        _INDEX_ENTRY.pack_into(
+            buffer, _INDEX_HEADER.size + slot * _INDEX_ENTRY.size, *_pack_entry(entry)
+        )
+    path.write_bytes(buffer)
+
+
+def _decode_record(record: bytes) -> tuple[str, int, bytes]:
+    """Decode a record, returning its name, flags and contents"""
+    length, crc, flags, name_length = _RECORD_HEADER.unpack_from(record, 0)
+    start = _RECORD_HEADER.size
+    if len(record) != start + name_length + length:
+        raise ValueError("truncated_record")
+    name = record[start : start + name_length]
+    contents = record[start + name_length :]
+    if zlib.crc32(contents, zlib.crc32(name)) != crc:
+        raise ValueError("corrupt_record")
+    return name.decode("utf-8"), flags, contents
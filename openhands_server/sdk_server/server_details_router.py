@@ -0,0 +1,43 @@
+"""Server details router for OpenHands SDK."""
+
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from openhands_server.sdk_server.conversation_service import (
+    get_default_conversation_service,
+)
+from openhands_server.sdk_server.metrics import CONTENT_TYPE, get_default_registry
+from openhands_server.sdk_server.models import StartupProgress, Success
+
+
+router = APIRouter()
+conversation_service = get_default_conversation_service()
+
+
+@router.get("/health")
+async def health() -> Success:
+    """Liveness check - the server is accepting requests"""
+    return Success()
+
+
+@router.get("/ready", responses={503: {"description": "Not accepting requests"}})
+async def ready() -> Success:
+    """Readiness check - the server is accepting requests. This is the case while
+    conversations are still being loaded on startup (See /startup_progress), as
+    any not yet loaded are fetched on demand."""
+    if not conversation_service.is_ready():
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, detail="not_ready")
+    return Success()
+
+
+@router.get("/startup_progress")
+async def startup_progress() -> StartupProgress:
+    """Progress loading conversations on startup. Until loading is complete,
+    search results may not include every conversation."""
+    return conversation_service.get_startup_progress()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Metrics for the server in the Prometheus text format"""
+    return PlainTextResponse(get_default_registry().render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,186 @@
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+from typing import overload
+
+from openhands.sdk import EventBase
+from openhands.sdk.io import FileStore
+from openhands_server.sdk_server.event_index import EventIndex
+
+
+EVENTS_DIR = "events"
+_EVENT_FILE = re.compile(r"^event-(\d+)-(.+)\.json$")
+
+
+class TieredEvents(Sequence[EventBase]):
+    """Read only view of the events of a conversation, in which only the most
+    recent hot_size events are kept in memory. Older events are read from the
+    conversation's file store when requested, and the last cache_size of them
+    are kept decoded in an LRU - so the memory used does not grow with the length
+    of the conversation. Events are located using the ids in the names of the
+    files the SDK persists them to, so nothing is decoded to find an event.
+
+    Events published by the conversation are added to the hot tail (It is a valid
+    PubSub callback). This does not affect the events held by the conversation
+    itself, which the agent uses for its context.
+
+    Reads never take a lock shared with the conversation (or with publishing).
+    Events are append only, and each is stored in a ring buffer for the hot tail
+    before its id is appended to the index - so the length of the index is a
+    watermark below which every position is safe to read from any thread. A
+    reader which finds the slot in the ring already reused for a later event
+    falls back to the LRU / disk. Only the LRU has a lock, which is shared between
+    readers alone.
+
+    Publishing never waits for a load (Which lists the file store, and may run in
+    another thread). Events published while a load is in progress are recorded,
+    and merged into the index once the listing is done.
+    """
+
+    def __init__(
+        self,
+        get_file_store: Callable[[], FileStore],
+        index: EventIndex,
+        hot_size: int = 256,
+        cache_size: int = 1024,
+    ):
+        self.get_file_store = get_file_store
+        self.index = index
+        self.hot_size = hot_size
+        self.cache_size = cache_size
+        self._load_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._hot: list[tuple[int, EventBase] | None] = [None] * max(hot_size, 1)
+        self._cache: OrderedDict[int, EventBase] = OrderedDict()
+        self._loaded = False
+        # Guards _loading / _published_during_load, and is only held briefly
+        self._publish_lock = threading.Lock()
+        self._loading = False
+        self._published_during_load: list[EventBase] = []
+
+    def load(self):
+        """Load the ids of events from the file store, if not already loaded"""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            with self._publish_lock:
+                self._loading = True
+            try:
+                names = self.get_file_store().list(EVENTS_DIR)
+            except FileNotFoundError:
+                names = []
+            except BaseException:
+                with self._publish_lock:
+                    self._loading = False
+                    self._published_during_load.clear()
+                raise
+            files = []
+            for name in names:
+                match = _EVENT_FILE.match(name.rsplit("/", 1)[-1])
+                if match:
+                    files.append((int(match.group(1)), match.group(2)))
+            files.sort()
+            self.index.reset([event_id for _, event_id in files])
+            with self._publish_lock:
+                # Events listed already are skipped
+                for event in self._published_during_load:
+                    self._append(event)
+                self._published_during_load.clear()
+                self._loading = False
+                self._loaded = True
+
+    def clear(self):
+        """Drop all events held in memory, so they are reloaded on next access.
+        Must not be called while there are reads in progress."""
+        with self._load_lock:
+            self._loaded = False
+            self._hot = [None] * len(self._hot)
+            with self._cache_lock:
+                self._cache.clear()
+            self.index.clear()
+
+    def get_resident_count(self) -> int:
+        """Get the number of decoded events held in memory"""
+        return sum(1 for slot in self._hot if slot) + len(self._cache)
+
+    def __len__(self) -> int:
+        self.load()
+        return len(self.index)
+
+    @overload
+    def __getitem__(self, position: int) -> EventBase: ...
+
+    @overload
+    def __getitem__(self, position: slice) -> Sequence[EventBase]: ...
+
+    def __getitem__(self, position: int | slice):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        length = len(self)
+        if position < 0:
+            position += length
+        if not 0 <= position < length:
+            raise IndexError(position)
+        slot = self._hot[position % len(self._hot)]
+        if slot and slot[0] == position:
+            return slot[1]
+        with self._cache_lock:
+            event = self._cache.get(position)
+            if event is not None:
+                self._cache.move_to_end(position)
+                return event
+        event = self._read(position, self.index.get_id(position))
+        with self._cache_lock:
+            self._cache[position] = event
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return event
+
+    def get_kind(self, position: int) -> str:
+        """Get the kind of the event at the position given. Unlike reading the
+        event, this does not add it to the LRU (So indexing kinds does not flush
+        it)."""
+        slot = self._hot[position % len(self._hot)]
+        if slot and slot[0] == position:
+            return type(slot[1]).__name__
+        with self._cache_lock:
+            event = self._cache.get(position)
+        if event is None:
+            event = self._read(position, self.index.get_id(position))
+        return type(event).__name__
+
+    def find(self, event_id: str) -> EventBase | None:
+        self.load()
+        position = self.index.get_position(event_id)
+        if position is None:
+            return None
+        return self[position]
+
+    async def __call__(self, event: EventBase) -> None:
+        if not self._loaded:
+            with self._publish_lock:
+                if self._loading:
+                    # The load may have listed the files before this event was
+                    # persisted - it is merged once the load is done
+                    self._published_during_load.append(event)
+                    return
+                if not self._loaded:
+                    # Picked up from the file store on the next load
+                    return
+        self._append(event)
+
+    def _append(self, event: EventBase) -> None:
+        if self.index.get_position(event.id) is not None:
+            return
+        position = len(self.index)
+        self._hot[position % len(self._hot)] = (position, event)
+        # Publish - readers may now access the position
+        self.index.append(event.id, type(event).__name__)
+
+    def _read(self, position: int, event_id: str) -> EventBase:
+        # Named as the SDK names them - the position is the index in the name
+        name = f"{EVENTS_DIR}/event-{position:05d}-{event_id}.json"
+        return EventBase.model_validate_json(self.get_file_store().read(name))
@@ -1,6 +1,12 @@
 from datetime import UTC, datetime
+from uuid import UUID
 
 
 def utc_now():
     """Return the current time in UTC format (Since datetime.utcnow is deprecated)"""
     return datetime.now(UTC)
+
+
+def get_shard(conversation_id: UUID, shard_count: int) -> int:
+    """Get the index of the shard which owns the conversation with the id given"""
+    return conversation_id.int % shard_count
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from openhands.sdk import LLM, ToolSpec
+from openhands_server.sdk_server.agent_pool import AgentPool
+from openhands_server.sdk_server.mcp_pool import MCPPool
+from openhands_server.sdk_server.models import StartConversationRequest
+
+
+SPEC = StartConversationRequest(
+    llm=LLM(model="test-model"),
+    tools=[ToolSpec(name="FileEditorTool")],
+    mcp_config={"mcpServers": {"fetch": {"command": "uvx"}}},
+)
+
+
+async def wait_for_warm(pool: AgentPool, count: int):
+    while pool.get_warm_count(SPEC) < count:
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_take_refills_pool():
+    pool = AgentPool(mcp_pool=MCPPool(), size=1)
+    assert await pool.take(SPEC) is None
+    await asyncio.wait_for(wait_for_warm(pool, 1), 5)
+    warm_agent = await pool.take(SPEC)
+    assert warm_agent is not None and warm_agent.tools
+    await asyncio.wait_for(wait_for_warm(pool, 1), 5)
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_close_closes_tools_but_not_pooled_mcp_clients():
+    mcp_pool = MCPPool()
+    pool = AgentPool(mcp_pool=mcp_pool, size=1)
+    await pool.take(SPEC)
+    await asyncio.wait_for(wait_for_warm(pool, 1), 5)
+    warm_agent = pool._profiles[next(iter(pool._profiles))].warm[0]
+    held = await mcp_pool.acquire(SPEC.mcp_config)
+    await pool.close()
+    assert all(tool.executor.closed for tool in warm_agent.tools)
+    assert held[0].executor.client.is_connected()
+    await mcp_pool.release(held)
+    await mcp_pool.close()
+
+
+@pytest.mark.asyncio
+async def test_warm_agents_do_not_share_llm():
+    pool = AgentPool(mcp_pool=MCPPool(), size=2)
+    assert await pool.take(SPEC) is None
+    await asyncio.wait_for(wait_for_warm(pool, 2), 5)
+    agents = [await pool.take(SPEC), await pool.take(SPEC)]
+    llms = [warm_agent.agent.llm for warm_agent in agents if warm_agent]
+    assert llms == [SPEC.llm, SPEC.llm]
+    # Each conversation accumulates metrics in its own llm
+    assert llms[0] is not llms[1]
+    assert all(llm is not SPEC.llm for llm in llms)
+    await pool.close()
@@ -0,0 +1,138 @@
+import json
+from uuid import UUID, uuid4
+
+import httpx
+import pytest
+from starlette.responses import JSONResponse
+
+from openhands_server.sdk_server.cluster import (
+    FORWARDED_HEADER,
+    RING_FILE,
+    ClusterMiddleware,
+    check_ring_change,
+)
+from openhands_server.sdk_server.config import Config
+
+
+NODES = ["http://node0", "http://node1", "http://node2"]
+
+
+class FakeConversationService:
+    def __init__(self, local_ids=()):
+        self.local_ids = set(local_ids)
+
+    async def get_event_service(self, conversation_id: UUID):
+        return object() if conversation_id in self.local_ids else None
+
+
+async def local_app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+            await send({"type": "lifespan.startup.complete"})
+    response = JSONResponse({"node": NODES[0]})
+    await response(scope, receive, send)
+
+
+def create_middleware(upstreams: dict[str, dict[UUID, int]], local_ids=()):
+    """Create a middleware for the first node. upstreams maps other nodes to the
+    status each returns for the conversations given (404 for any others)."""
+    config = Config(cluster_nodes=NODES, cluster_node_url=NODES[0])
+    middleware = ClusterMiddleware(
+        local_app,
+        config=config,
+        conversation_service=FakeConversationService(local_ids),  # type: ignore
+    )
+    for node, statuses in upstreams.items():
+
+        def handler(request: httpx.Request, node=node, statuses=statuses):
+            assert request.headers[FORWARDED_HEADER] == "1"
+            conversation_id = UUID(request.url.path.split("/")[2])
+            status_code = statuses.get(conversation_id, 404)
+            # Streamed, as responses from other nodes are
+            content = json.dumps({"node": node}).encode()
+            return httpx.Response(
+                status_code,
+                headers={"content-type": "application/json"},
+                stream=httpx.ByteStream(content),
+            )
+
+        middleware._clients[node] = httpx.AsyncClient(
+            base_url=node, transport=httpx.MockTransport(handler)
+        )
+    return middleware
+
+
+def find_id(middleware: ClusterMiddleware, preference: list[str]) -> UUID:
+    while True:
+        conversation_id = uuid4()
+        nodes = middleware.ring.get_preference_list(conversation_id, len(preference))
+        if nodes == preference:
+            return conversation_id
+
+
+async def get(middleware: ClusterMiddleware, conversation_id: UUID) -> dict:
+    transport = httpx.ASGITransport(app=middleware)
+    async with httpx.AsyncClient(transport=transport, base_url=NODES[0]) as client:
+        response = await client.get(f"/conversations/{conversation_id}")
+    return response.json()
+
+
+@pytest.mark.asyncio
+async def test_request_forwarded_to_owner():
+    middleware = create_middleware({})
+    conversation_id = find_id(middleware, NODES[1:2])
+    middleware = create_middleware({NODES[1]: {conversation_id: 200}})
+    assert await get(middleware, conversation_id) == {"node": NODES[1]}
+
+
+@pytest.mark.asyncio
+async def test_request_falls_back_to_previous_owner():
+    middleware = create_middleware({})
+    conversation_id = find_id(middleware, [NODES[1], NODES[2]])
+    middleware = create_middleware({NODES[1]: {}, NODES[2]: {conversation_id: 200}})
+    assert await get(middleware, conversation_id) == {"node": NODES[2]}
+
+
+@pytest.mark.asyncio
+async def test_request_handled_locally():
+    middleware = create_middleware({})
+    conversation_id = find_id(middleware, [NODES[1], NODES[0]])
+    middleware = create_middleware({NODES[1]: {}}, local_ids=[conversation_id])
+    assert await get(middleware, conversation_id) == {"node": NODES[0]}
+
+
+@pytest.mark.asyncio
+async def test_clients_closed_on_shutdown():
+    middleware = create_middleware({NODES[1]: {}})
+    client = middleware._clients[NODES[1]]
+    messages = iter([{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}])
+    sent = []
+
+    async def receive():
+        return next(messages)
+
+    async def send(message):
+        sent.append(message["type"])
+
+    await middleware({"type": "lifespan"}, receive, send)
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    assert client.is_closed and not middleware._clients
+
+
+def test_ring_change_within_fallback_nodes(tmp_path):
+    check_ring_change(tmp_path, NODES, 2)
+    assert json.loads((tmp_path / RING_FILE).read_text()) == {"nodes": NODES}
+    check_ring_change(tmp_path, NODES + ["http://node3", "http://node4"], 2)
+
+
+def test_ring_change_beyond_fallback_nodes_rejected(tmp_path):
+    check_ring_change(tmp_path, NODES, 1)
+    with pytest.raises(ValueError):
+        check_ring_change(tmp_path, NODES + ["http://node3", "http://node4"], 1)
+    # Once conversations are moved, the record may be deleted to accept the ring
+    (tmp_path / RING_FILE).unlink()
+    check_ring_change(tmp_path, NODES + ["http://node3", "http://node4"], 1)
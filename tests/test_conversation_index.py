@@ -0,0 +1,100 @@
+from datetime import UTC, datetime, timedelta
+from uuid import UUID, uuid4
+
+import pytest
+
+from openhands.sdk.conversation.state import AgentExecutionStatus
+from openhands_server.sdk_server.conversation_index import ConversationIndex
+from openhands_server.sdk_server.models import ConversationSortOrder
+
+
+START = datetime(2025, 1, 1, tzinfo=UTC)
+STATUSES = [
+    AgentExecutionStatus.IDLE,
+    AgentExecutionStatus.RUNNING,
+    AgentExecutionStatus.FINISHED,
+]
+
+
+def create_index(count: int) -> tuple[ConversationIndex, list[UUID]]:
+    """Index conversations created in order, and updated in reverse order"""
+    index = ConversationIndex()
+    ids = [uuid4() for _ in range(count)]
+    for i, conversation_id in enumerate(ids):
+        index.update(
+            conversation_id,
+            START + timedelta(seconds=i),
+            START + timedelta(seconds=count - i),
+            STATUSES[i % len(STATUSES)],
+        )
+    return index, ids
+
+
+def search_all(
+    index: ConversationIndex,
+    sort_order: ConversationSortOrder,
+    status: AgentExecutionStatus | None = None,
+    limit: int = 3,
+) -> list[UUID]:
+    results = []
+    page_id = None
+    while True:
+        page, page_id = index.search(page_id, limit, sort_order, status)
+        results.extend(page)
+        if page_id is None:
+            return results
+
+
+@pytest.mark.parametrize(
+    "sort_order,expected",
+    [
+        (ConversationSortOrder.CREATED_AT, lambda ids: ids),
+        (ConversationSortOrder.CREATED_AT_DESC, lambda ids: ids[::-1]),
+        (ConversationSortOrder.UPDATED_AT, lambda ids: ids[::-1]),
+        (ConversationSortOrder.UPDATED_AT_DESC, lambda ids: ids),
+    ],
+)
+def test_search_pages_in_sort_order(sort_order, expected):
+    index, ids = create_index(10)
+    assert search_all(index, sort_order) == expected(ids)
+    # Filtered by status
+    finished = [id for i, id in enumerate(ids) if i % 3 == 2]
+    assert search_all(index, sort_order, AgentExecutionStatus.FINISHED) == expected(
+        finished
+    )
+    assert search_all(index, sort_order, AgentExecutionStatus.ERROR) == []
+
+
+def test_count_by_status():
+    index, ids = create_index(10)
+    assert index.count() == 10
+    assert index.count(AgentExecutionStatus.IDLE) == 4
+    assert index.count(AgentExecutionStatus.FINISHED) == 3
+    assert index.count(AgentExecutionStatus.ERROR) == 0
+    # Changing status moves the conversation between buckets
+    index.update(ids[0], START, START, AgentExecutionStatus.ERROR)
+    assert index.count(AgentExecutionStatus.IDLE) == 3
+    assert index.count(AgentExecutionStatus.ERROR) == 1
+    assert index.remove(ids[0])
+    assert not index.remove(ids[0])
+    assert index.count() == 9
+    assert index.count(AgentExecutionStatus.ERROR) == 0
+
+
+def test_page_id_remains_valid_as_conversations_change():
+    index, ids = create_index(10)
+    page, page_id = index.search(None, 4, ConversationSortOrder.CREATED_AT)
+    assert page == ids[:4] and page_id
+    # Removing the first item of the next page, and adding one after it
+    index.remove(ids[4])
+    added = uuid4()
+    index.update(added, START + timedelta(seconds=20), START, AgentExecutionStatus.IDLE)
+    page, page_id = index.search(page_id, 100, ConversationSortOrder.CREATED_AT)
+    assert page == ids[5:] + [added]
+    assert page_id is None
+
+
+def test_invalid_page_id_rejected():
+    index, _ = create_index(1)
+    with pytest.raises(ValueError, match="invalid_page_id"):
+        index.search("not a page id")
@@ -0,0 +1,18 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from openhands_server.sdk_server import conversation_router
+
+
+@pytest.mark.asyncio
+async def test_batch_too_large_rejected(monkeypatch):
+    monkeypatch.setattr(conversation_router.conversation_service, "max_batch_size", 1)
+    api = FastAPI()
+    api.include_router(conversation_router.router)
+    transport = httpx.ASGITransport(app=api)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        request = {"llm": {"model": "test-model"}}
+        response = await client.post("/conversations/batch", json=[request] * 2)
+    assert response.status_code == 422
+    assert response.json() == {"detail": "batch_too_large"}
@@ -0,0 +1,152 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from openhands.sdk import LLM
+from openhands.sdk.conversation.state import AgentExecutionStatus
+from openhands_server.sdk_server import event_service as event_service_module
+from openhands_server.sdk_server.agent_pool import WarmAgent
+from openhands_server.sdk_server.conversation_service import ConversationService
+from openhands_server.sdk_server.conversation_store import FileConversationStore
+from openhands_server.sdk_server.file_io import AsyncFileIO
+from openhands_server.sdk_server.models import (
+    StartConversationRequest,
+    StoredConversation,
+)
+from tests.test_event_service import FakeConversation
+
+
+def seed_conversations(path, count: int) -> list[StoredConversation]:
+    results = []
+    for _ in range(count):
+        stored = StoredConversation(id=uuid4(), llm=LLM(model="test-model"))
+        conversation_dir = path / stored.id.hex
+        conversation_dir.mkdir(parents=True)
+        (conversation_dir / "meta.json").write_text(stored.model_dump_json())
+        results.append(stored)
+    return results
+
+
+def create_service(tmp_path) -> ConversationService:
+    file_io = AsyncFileIO()
+    return ConversationService(
+        event_services_path=tmp_path / "conversations",
+        workspace_path=tmp_path / "workspace",
+        conversation_store=FileConversationStore(
+            tmp_path / "conversations", load_concurrency=4, file_io=file_io
+        ),
+        file_io=file_io,
+        idle_timeout=None,
+        max_active_conversations=None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_ready_while_loading(tmp_path):
+    seeded = seed_conversations(tmp_path / "conversations", 40)
+    service = create_service(tmp_path)
+    assert not service.is_ready()
+    async with service:
+        assert service.is_ready()
+        # Conversations not yet loaded are fetched on demand
+        assert await service.get_conversation(seeded[-1].id) is not None
+        await service.wait_until_ready()
+        progress = service.get_startup_progress()
+        assert progress.complete and not progress.failed
+        assert progress.loaded == progress.total == 40
+        assert progress.completed_at is not None
+    assert not service.is_ready()
+
+
+@pytest.mark.asyncio
+async def test_iter_all_may_be_closed_early(tmp_path):
+    seed_conversations(tmp_path, 20)
+    store = FileConversationStore(tmp_path, load_concurrency=2, file_io=AsyncFileIO())
+    iterator = store.iter_all()
+    assert await anext(iterator)
+    await iterator.aclose()
+
+
+@pytest.mark.asyncio
+async def test_batch_starts_limited_across_batches(tmp_path, monkeypatch):
+    service = create_service(tmp_path)
+    service.max_concurrent_starts = 2
+    starting = 0
+    max_starting = 0
+
+    async def start_conversation(request):
+        nonlocal starting, max_starting
+        starting += 1
+        max_starting = max(max_starting, starting)
+        await asyncio.sleep(0.01)
+        starting -= 1
+        return None
+
+    monkeypatch.setattr(service, "start_conversation", start_conversation)
+    requests = [StartConversationRequest(llm=LLM(model="test-model"))] * 3
+
+    async def start_batch():
+        return [result async for result in service.batch_start_conversations(requests)]
+
+    async with service:
+        batches = await asyncio.gather(start_batch(), start_batch())
+    assert [len(results) for results in batches] == [3, 3]
+    assert max_starting == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_too_large_rejected(tmp_path):
+    service = create_service(tmp_path)
+    service.max_batch_size = 2
+    requests = [StartConversationRequest(llm=LLM(model="test-model"))] * 3
+    async with service:
+        with pytest.raises(ValueError, match="batch_too_large"):
+            async for _ in service.batch_start_conversations(requests):
+                pass
+
+
+@pytest.mark.asyncio
+async def test_status_change_without_event_updates_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(event_service_module, "Conversation", FakeConversation)
+
+    async def create_agent(spec, mcp_pool):
+        return WarmAgent(agent=None)
+
+    monkeypatch.setattr(event_service_module, "create_agent", create_agent)
+    service = create_service(tmp_path)
+    async with service:
+        info = await service.start_conversation(
+            StartConversationRequest(llm=LLM(model="test-model"))
+        )
+        assert await service.count_conversations(AgentExecutionStatus.IDLE) == 1
+        event_service = await service.get_event_service(info.id)
+        assert event_service is not None
+        # The fake conversation finishes its run without publishing any event
+        await event_service.run()
+
+        async def wait_for_finished():
+            while not await service.count_conversations(AgentExecutionStatus.FINISHED):
+                await asyncio.sleep(0.01)
+
+        await asyncio.wait_for(wait_for_finished(), 5)
+        page = await service.search_conversations(status=AgentExecutionStatus.FINISHED)
+        assert [item.id for item in page.items] == [info.id]
+        assert await service.count_conversations(AgentExecutionStatus.IDLE) == 0
+
+
+@pytest.mark.asyncio
+async def test_loaded_conversations_report_saved_status(tmp_path):
+    service = create_service(tmp_path)
+    store = service.conversation_store
+    assert store is not None
+    paused, finished = seed_conversations(tmp_path / "conversations", 2)
+    await store.save(paused, AgentExecutionStatus.PAUSED)
+    await store.save(finished, AgentExecutionStatus.FINISHED)
+    async with service:
+        await service.wait_until_ready()
+        assert await service.count_conversations(AgentExecutionStatus.PAUSED) == 1
+        page = await service.search_conversations(status=AgentExecutionStatus.FINISHED)
+        assert [item.id for item in page.items] == [finished.id]
+        info = await service.get_conversation(paused.id)
+        assert info is not None and info.status == AgentExecutionStatus.PAUSED
@@ -0,0 +1,152 @@
+import os
+import stat
+from uuid import uuid4
+
+import pytest
+
+from openhands.sdk import LLM
+from openhands.sdk.conversation.state import AgentExecutionStatus
+from openhands_server.sdk_server.conversation_store import (
+    QUARANTINE_DIR,
+    FileConversationStore,
+    SqliteConversationStore,
+    run_migrations,
+)
+from openhands_server.sdk_server.file_io import AsyncFileIO
+from openhands_server.sdk_server.models import StoredConversation
+
+
+def create_stored() -> StoredConversation:
+    return StoredConversation(id=uuid4(), llm=LLM(model="test-model"))
+
+
+@pytest.mark.asyncio
+async def test_file_store_round_trip(tmp_path):
+    store = FileConversationStore(tmp_path)
+    stored = create_stored()
+    await store.save(stored)
+    loaded = await store.get(stored.id)
+    assert loaded is not None and loaded[0].id == stored.id and loaded[1] is None
+    assert [item.id async for item, _ in store.iter_all()] == [stored.id]
+    assert await store.count_all() == 1
+    assert await store.delete(stored.id)
+    assert await store.get(stored.id) is None
+
+
+@pytest.mark.asyncio
+async def test_file_store_skips_directories_without_meta(tmp_path):
+    store = FileConversationStore(tmp_path)
+    stored = create_stored()
+    await store.save(stored)
+    (tmp_path / uuid4().hex / "events").mkdir(parents=True)
+    assert [item.id async for item, _ in store.iter_all()] == [stored.id]
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+@pytest.mark.asyncio
+async def test_file_store_quarantines_invalid_meta(tmp_path):
+    store = FileConversationStore(tmp_path)
+    invalid_dir = tmp_path / uuid4().hex
+    invalid_dir.mkdir()
+    (invalid_dir / "meta.json").write_text('{"schema": "from the future"}')
+    (invalid_dir / "events").mkdir()
+    assert [item async for item in store.iter_all()] == []
+    assert not invalid_dir.exists()
+    (quarantined,) = (tmp_path / QUARANTINE_DIR).iterdir()
+    assert quarantined.name.startswith(invalid_dir.name)
+    assert (quarantined / "meta.json").exists()
+    # The quarantine is not listed as a conversation
+    assert await store.count_all() == 0
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_imports_meta_files(tmp_path):
+    file_store = FileConversationStore(tmp_path / "conversations")
+    stored = create_stored()
+    await file_store.save(stored)
+    store = SqliteConversationStore(
+        tmp_path / "conversations.db", import_path=tmp_path / "conversations"
+    )
+    async with store:
+        assert [item.id async for item, _ in store.iter_all()] == [stored.id]
+        await store.delete(stored.id)
+    # The import is only done once
+    async with store:
+        assert await store.count_all() == 0
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_opened_through_file_io(tmp_path):
+    calls = []
+
+    class RecordingFileIO(AsyncFileIO):
+        async def run(self, fn, *args):
+            calls.append(getattr(fn, "__name__", None))
+            return await super().run(fn, *args)
+
+    file_io = RecordingFileIO()
+    (tmp_path / "conversations").mkdir()
+    store = SqliteConversationStore(
+        tmp_path / "db" / "conversations.db",
+        import_path=tmp_path / "conversations",
+        file_io=file_io,
+    )
+    async with store:
+        assert await store.count_all() == 0
+    # Creating the directory, migrating and importing are all off the event loop
+    assert calls == ["<lambda>", run_migrations.__name__, "_list_event_service_dirs"]
+    file_io.close()
+
+
+@pytest.mark.asyncio
+async def test_file_store_keeps_status(tmp_path):
+    store = FileConversationStore(tmp_path)
+    stored = create_stored()
+    await store.save(stored, AgentExecutionStatus.PAUSED)
+    assert await store.get(stored.id) == (stored, AgentExecutionStatus.PAUSED)
+    await store.save_all([(stored, AgentExecutionStatus.FINISHED)])
+    assert [item async for item in store.iter_all()] == [
+        (stored, AgentExecutionStatus.FINISHED)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_keeps_status(tmp_path):
+    file_store = FileConversationStore(tmp_path / "conversations")
+    imported = create_stored()
+    await file_store.save(imported, AgentExecutionStatus.ERROR)
+    store = SqliteConversationStore(
+        tmp_path / "conversations.db", import_path=tmp_path / "conversations"
+    )
+    stored = create_stored()
+    async with store:
+        await store.save(stored, AgentExecutionStatus.RUNNING)
+        # Saving without a status keeps the last one saved
+        await store.save(stored)
+        assert await store.batch_get([stored.id, imported.id, uuid4()]) == [
+            (stored, AgentExecutionStatus.RUNNING),
+            (imported, AgentExecutionStatus.ERROR),
+            None,
+        ]
+        await store.save_all([(stored, AgentExecutionStatus.PAUSED)])
+        statuses = {item.id: status async for item, status in store.iter_all()}
+        assert statuses == {
+            imported.id: AgentExecutionStatus.ERROR,
+            stored.id: AgentExecutionStatus.PAUSED,
+        }
+
+
+@pytest.mark.asyncio
+async def test_file_store_syncs_directory_after_rename(tmp_path, monkeypatch):
+    synced = []
+    fsync = os.fsync
+
+    def record_fsync(fd):
+        synced.append(stat.S_ISDIR(os.fstat(fd).st_mode))
+        fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", record_fsync)
+    store = FileConversationStore(tmp_path, fsync=True)
+    await store.save(create_stored())
+    # The file is synced, and then the directory it was renamed into
+    assert synced == [False, True]
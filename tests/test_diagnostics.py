@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import threading
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from openhands_server.sdk_server import admin_router
+from openhands_server.sdk_server.config import Config
+from openhands_server.sdk_server.diagnostics import LoopLagMonitor, sample_stacks
+from openhands_server.sdk_server.metrics import LOOP_BLOCKED
+
+
+def block_loop(seconds: float):
+    time.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_blocked_loop_recorded_and_logged_once_per_stall(caplog):
+    caplog.set_level(logging.WARNING)
+    blocked = LOOP_BLOCKED.labels()
+    num_blocked = blocked.value
+    async with LoopLagMonitor(interval=0.01, block_threshold=0.1) as monitor:
+        await asyncio.sleep(0.05)
+        for _ in range(2):
+            block_loop(0.3)
+            await asyncio.sleep(0.05)
+        assert monitor.get_max_lag() >= 0.2
+    records = [
+        record
+        for record in caplog.records
+        if record.getMessage().startswith("event_loop_blocked:")
+    ]
+    assert len(records) == 2
+    assert blocked.value == num_blocked + 2
+    # The stack of the loop thread is logged while it is still blocked
+    assert all("block_loop" in record.getMessage() for record in records)
+
+
+def test_sample_stacks_collapses_stacks_by_thread():
+    stopped = threading.Event()
+
+    def wait_until_stopped():
+        stopped.wait(5)
+
+    thread = threading.Thread(target=wait_until_stopped, name="sampled")
+    thread.start()
+    try:
+        stacks = sample_stacks(0.05, 0.005)
+    finally:
+        stopped.set()
+        thread.join()
+    assert stacks.endswith("\n")
+    (line,) = [line for line in stacks.splitlines() if line.startswith("sampled;")]
+    stack, count = line.rsplit(" ", 1)
+    frames = stack.split(";")
+    # Frames run from the root to the leaf
+    assert frames[1].startswith("Thread._bootstrap ")
+    assert any("wait_until_stopped" in frame for frame in frames)
+    assert int(count) > 1
+
+
+@pytest.fixture
+def client_for(monkeypatch):
+    def create_client(session_api_key: str | None) -> httpx.AsyncClient:
+        config = Config(session_api_key=session_api_key)
+        monkeypatch.setattr(admin_router, "get_default_config", lambda: config)
+        app = FastAPI()
+        app.include_router(admin_router.router)
+        transport = httpx.ASGITransport(app=app)
+        return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+    return create_client
+
+
+@pytest.mark.asyncio
+async def test_profile_requires_session_api_key(client_for):
+    async with client_for(None) as client:
+        response = await client.get("/admin/profile", params={"duration": 0.01})
+        assert response.status_code == 403
+    async with client_for("key") as client:
+        response = await client.get(
+            "/admin/profile",
+            params={"duration": 0.01},
+            headers={"X-Session-API-Key": "wrong"},
+        )
+        assert response.status_code == 401
+        response = await client.get("/admin/profile", params={"duration": 0.01})
+        assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_profile_runs_one_at_a_time(client_for):
+    headers = {"X-Session-API-Key": "key"}
+    async with client_for("key") as client:
+        first = asyncio.create_task(
+            client.get("/admin/profile", params={"duration": 0.3}, headers=headers)
+        )
+        while not admin_router._profile_lock.locked():
+            await asyncio.sleep(0.001)
+        response = await client.get(
+            "/admin/profile", params={"duration": 0.01}, headers=headers
+        )
+        assert response.status_code == 409
+        response = await first
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "MainThread;" in response.text
+        # Once done, another profile may run
+        response = await client.get(
+            "/admin/profile", params={"duration": 0.01}, headers=headers
+        )
+        assert response.status_code == 200
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from openhands.sdk import Message, MessageEvent, TextContent
+from openhands_server.sdk_server.event_encoding import (
+    EncodedEventCache,
+    EventEncoding,
+    encode_batch,
+    encode_event,
+)
+from openhands_server.sdk_server.event_router import _WebSocketSubscriber
+
+
+def create_event(text: str = "hello") -> MessageEvent:
+    return MessageEvent(
+        source="agent",
+        llm_message=Message(role="assistant", content=[TextContent(text=text)]),
+    )
+
+
+class RecordingWebSocket:
+    def __init__(self):
+        self.frames: list[str | bytes] = []
+
+    async def send_text(self, data: str):
+        self.frames.append(data)
+
+    async def send_bytes(self, data: bytes):
+        self.frames.append(data)
+
+
+def test_cache_encodes_each_event_once():
+    cache = EncodedEventCache()
+    event = create_event()
+    encoded = cache.encode(event, EventEncoding.JSON)
+    assert isinstance(encoded, bytes)
+    assert cache.encode(event, EventEncoding.JSON) is encoded
+    assert json.loads(encoded)["id"] == event.id
+    assert cache.hits == 1 and cache.misses == 1
+    assert cache.size == len(encoded)
+
+
+def test_cache_is_bounded_by_bytes():
+    events = [create_event("x" * 1000) for _ in range(10)]
+    max_bytes = len(encode_event(events[0], EventEncoding.JSON)) * 3
+    cache = EncodedEventCache(max_bytes=max_bytes)
+    for event in events:
+        cache.encode(event, EventEncoding.JSON)
+        assert cache.size <= max_bytes
+    # The oldest events were evicted
+    cache.encode(events[0], EventEncoding.JSON)
+    assert cache.hits == 0
+    cache.encode(events[-1], EventEncoding.JSON)
+    assert cache.hits == 1
+
+
+def test_cache_skips_events_larger_than_bound():
+    cache = EncodedEventCache(max_bytes=10)
+    cache.encode(create_event(), EventEncoding.JSON)
+    assert cache.size == 0
+
+
+def test_encode_batch_json():
+    events = [create_event(str(i)) for i in range(3)]
+    binary = encode_batch(
+        [encode_event(event, EventEncoding.JSON) for event in events],
+        EventEncoding.JSON,
+    )
+    text = encode_batch(
+        [event.model_dump_json() for event in events], EventEncoding.JSON
+    )
+    assert isinstance(binary, bytes) and isinstance(text, str)
+    assert [item["id"] for item in json.loads(binary)] == [e.id for e in events]
+    assert json.loads(text) == json.loads(binary)
+
+
+@pytest.mark.asyncio
+async def test_subscriber_frames():
+    cache = EncodedEventCache()
+    event = create_event()
+    binary = RecordingWebSocket()
+    text = RecordingWebSocket()
+    await _WebSocketSubscriber(binary, EventEncoding.JSON, cache)(event)  # type: ignore
+    await _WebSocketSubscriber(
+        text,  # type: ignore
+        EventEncoding.JSON,
+        cache,
+        text_frames=True,
+    )(event)
+    assert binary.frames == [cache.encode(event, EventEncoding.JSON)]
+    assert text.frames == [cache.encode_text(event)]
@@ -0,0 +1,96 @@
+from openhands.sdk import Message, MessageEvent, TextContent
+from openhands_server.sdk_server.event_index import (
+    EventIndex,
+    decode_page_id,
+    encode_page_id,
+    page_events,
+)
+from openhands_server.sdk_server.models import EventSortOrder
+
+
+class SparseEvent(MessageEvent):
+    pass
+
+
+def create_events(num_events: int, sparse_every: int = 7) -> list[MessageEvent]:
+    return [
+        (SparseEvent if i % sparse_every == 0 else MessageEvent)(
+            source="user",
+            llm_message=Message(role="user", content=[TextContent(text=str(i))]),
+        )
+        for i in range(num_events)
+    ]
+
+
+def page_all(events, index, sort_order, limit, kinds=None) -> list[str]:
+    ids = []
+    page_id = None
+    while True:
+        page = page_events(events, index, page_id, limit, sort_order, kinds=kinds)
+        ids.extend(event.id for event in page.items)
+        page_id = page.next_page_id
+        if not page_id:
+            return ids
+
+
+def test_page_id_round_trip():
+    assert decode_page_id(encode_page_id(12, "abc:def")) == (12, "abc:def")
+    assert decode_page_id("not a cursor") is None
+
+
+def test_index_rebuilds_when_events_replaced():
+    index = EventIndex()
+    events = create_events(5)
+    index.sync(events)
+    replaced = create_events(3)
+    assert index.find(replaced, replaced[2].id) == 2
+    assert index.get_position(events[4].id) is None
+
+
+def test_pages_cover_all_events_in_order():
+    events = create_events(95)
+    index = EventIndex()
+    ids = [event.id for event in events]
+    assert page_all(events, index, EventSortOrder.TIMESTAMP, 10) == ids
+    assert page_all(events, index, EventSortOrder.TIMESTAMP_DESC, 10) == ids[::-1]
+
+
+def test_kinds_filter_matches_scan():
+    events = create_events(200)
+    index = EventIndex()
+    sparse_ids = [event.id for event in events if isinstance(event, SparseEvent)]
+    kinds = {"SparseEvent"}
+    assert page_all(events, index, EventSortOrder.TIMESTAMP, 4, kinds) == sparse_ids
+    assert (
+        page_all(events, index, EventSortOrder.TIMESTAMP_DESC, 4, kinds)
+        == sparse_ids[::-1]
+    )
+    all_kinds = {"SparseEvent", "MessageEvent"}
+    assert page_all(events, index, EventSortOrder.TIMESTAMP, 9, all_kinds) == [
+        event.id for event in events
+    ]
+
+
+def test_kinds_of_events_loaded_by_id_are_indexed_on_read():
+    events = create_events(50)
+    index = EventIndex()
+    index.reset([event.id for event in events])
+    page = page_events(events, index, limit=100, kinds={"SparseEvent"})
+    assert [event.id for event in page.items] == [
+        event.id for event in events if isinstance(event, SparseEvent)
+    ]
+
+
+def test_kinds_of_appended_events_are_indexed():
+    events = create_events(10)
+    index = EventIndex()
+    index.sync(events)
+    page_events(events, index, kinds={"SparseEvent"})
+    more = create_events(10, sparse_every=3)
+    for event in more:
+        events.append(event)
+        index.append(event.id, type(event).__name__)
+    page = page_events(events, index, limit=100, kinds={"SparseEvent"})
+    assert [event.id for event in page.items] == [
+        event.id for event in events if isinstance(event, SparseEvent)
+    ]
@@ -0,0 +1,140 @@
+import asyncio
+import json
+
+import pytest
+
+from openhands.sdk import Message, MessageEvent, TextContent
+from openhands.sdk.conversation.state import AgentExecutionStatus
+from openhands_server.sdk_server.event_router import _WebSocketSubscriber
+from openhands_server.sdk_server.models import EventPage
+
+
+def create_event(text: str) -> MessageEvent:
+    return MessageEvent(
+        source="agent",
+        llm_message=Message(role="assistant", content=[TextContent(text=text)]),
+    )
+
+
+class RecordingWebSocket:
+    def __init__(self):
+        self.ids: list[str] = []
+        self.close_code: int | None = None
+
+    async def send_text(self, data: str):
+        decoded = json.loads(data)
+        if isinstance(decoded, list):
+            self.ids.extend(item["id"] for item in decoded)
+        else:
+            self.ids.append(decoded["id"])
+
+    async def close(self, code: int, reason: str):
+        self.close_code = code
+
+
+class FakeEventService:
+    """Serves the stored events in a single page, delivering the live events
+    given to the subscriber while the page is being read"""
+
+    def __init__(self, stored, subscriber, live=()):
+        self.stored = stored
+        self.subscriber = subscriber
+        self.live = live
+
+    async def get_event(self, event_id: str) -> MessageEvent | None:
+        for event in self.stored:
+            if event.id == event_id:
+                return event
+        return None
+
+    async def search_events(self, page_id: str | None = None) -> EventPage:
+        ids = [event.id for event in self.stored]
+        if page_id not in ids:
+            raise ValueError("invalid_page_id")
+        for event in self.live:
+            await self.subscriber(event)
+        return EventPage(items=self.stored[ids.index(page_id) :])
+
+
+def create_subscriber(**kwargs) -> _WebSocketSubscriber:
+    return _WebSocketSubscriber(RecordingWebSocket(), text_frames=True, **kwargs)  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_replay_skips_events_in_flight():
+    events = [create_event(str(i)) for i in range(5)]
+    subscriber = create_subscriber()
+    # Events 2 and 3 are stored, and are published after the buffer is flushed
+    service = FakeEventService(events[:4], subscriber)
+    await subscriber.replay(service, events[1].id)  # type: ignore
+    for event in events[2:]:
+        await subscriber(event)
+    assert subscriber.websocket.ids == [event.id for event in events[2:]]
+
+
+@pytest.mark.asyncio
+async def test_replay_skips_buffered_events():
+    events = [create_event(str(i)) for i in range(5)]
+    subscriber = create_subscriber()
+    service = FakeEventService(events[:4], subscriber, live=events[3:])
+    await subscriber.replay(service, events[0].id)  # type: ignore
+    assert subscriber.websocket.ids == [event.id for event in events[1:]]
+
+
+@pytest.mark.asyncio
+async def test_replay_closes_socket_when_buffer_full():
+    events = [create_event(str(i)) for i in range(6)]
+    subscriber = create_subscriber(max_buffer_size=2)
+    service = FakeEventService(events[:2], subscriber, live=events[2:])
+    await subscriber.replay(service, events[0].id)  # type: ignore
+    assert subscriber.websocket.close_code == 1013
+    assert subscriber.websocket.ids == []
+
+
+@pytest.mark.asyncio
+async def test_replay_invalid_id_does_not_flush_buffer():
+    subscriber = create_subscriber()
+    subscriber.start_buffering()
+    await subscriber(create_event("live"))
+    service = FakeEventService([], subscriber)
+    await subscriber.replay(service, "unknown")  # type: ignore
+    assert subscriber.websocket.close_code == 1008
+    assert subscriber.websocket.ids == []
+    await subscriber(create_event("later"))
+    assert subscriber.websocket.ids == []
+
+
+@pytest.mark.asyncio
+async def test_batch_flushed_on_status_change():
+    async def get_status():
+        return AgentExecutionStatus.RUNNING
+
+    subscriber = create_subscriber()
+    subscriber.start_batching(60, 100, get_status)
+    event = create_event("last")
+    await subscriber(event)
+    assert subscriber.websocket.ids == []
+    await subscriber.on_status_changed(AgentExecutionStatus.FINISHED)
+    assert subscriber.websocket.ids == [event.id]
+    subscriber.stop_batching()
+    await asyncio.sleep(0)
+
+
+class ClosingEventService(FakeEventService):
+    """Fails reads part way through the replay, as when the conversation is
+    closed concurrently"""
+
+    async def search_events(self, page_id: str | None = None) -> EventPage:
+        raise ValueError("inactive_service")
+
+
+@pytest.mark.asyncio
+async def test_replay_error_is_not_an_invalid_id():
+    events = [create_event(str(i)) for i in range(2)]
+    subscriber = create_subscriber()
+    service = ClosingEventService(events, subscriber)
+    with pytest.raises(ValueError, match="inactive_service"):
+        await subscriber.replay(service, events[0].id)  # type: ignore
+    assert subscriber.websocket.close_code == 1011
+    await subscriber(create_event("later"))
+    assert subscriber.websocket.ids == []
@@ -0,0 +1,206 @@
+import asyncio
+import threading
+from uuid import uuid4
+
+import pytest
+
+from openhands.sdk import LLM, Message, TextContent
+from openhands.sdk.conversation.state import AgentExecutionStatus
+from openhands_server.sdk_server import event_service as event_service_module
+from openhands_server.sdk_server.agent_pool import WarmAgent
+from openhands_server.sdk_server.conversation_store import FileConversationStore
+from openhands_server.sdk_server.event_service import EventService
+from openhands_server.sdk_server.mcp_pool import MCPPool
+from openhands_server.sdk_server.models import StoredConversation
+from openhands_server.sdk_server.run_scheduler import RunScheduler
+
+
+class FakeState:
+    agent_status = AgentExecutionStatus.IDLE
+
+
+class FakeConversation:
+    """Stands in for the SDK conversation. Sends and closes block until the
+    gates given are set, so tests may act while they are in progress."""
+
+    send_gate: threading.Event | None = None
+    close_gate: threading.Event | None = None
+
+    def __init__(self, agent, callbacks, persist_filestore):
+        self.state = FakeState()
+        self.messages = []
+        self.closed = False
+        self.sending = threading.Event()
+        self.closing = threading.Event()
+
+    def set_confirmation_mode(self, confirmation_mode):
+        pass
+
+    def send_message(self, message):
+        assert not self.closed
+        self.sending.set()
+        if self.send_gate:
+            self.send_gate.wait(5)
+        self.messages.append(message)
+
+    def run(self):
+        self.state.agent_status = AgentExecutionStatus.FINISHED
+
+    def pause(self):
+        self.state.agent_status = AgentExecutionStatus.PAUSED
+
+    def close(self):
+        self.closing.set()
+        if self.close_gate:
+            self.close_gate.wait(5)
+        self.closed = True
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(event_service_module, "Conversation", FakeConversation)
+    monkeypatch.setattr(FakeConversation, "send_gate", None)
+    monkeypatch.setattr(FakeConversation, "close_gate", None)
+    stored = StoredConversation(id=uuid4(), llm=LLM(model="test-model"))
+    run_scheduler = RunScheduler()
+    yield EventService(
+        stored=stored,
+        file_store_path=tmp_path / stored.id.hex,
+        working_dir=tmp_path / "workspace",
+        conversation_store=FileConversationStore(tmp_path),
+        run_scheduler=run_scheduler,
+        mcp_pool=MCPPool(),
+    )
+    run_scheduler.shutdown()
+
+
+def create_message(text: str) -> Message:
+    return Message(role="user", content=[TextContent(text=text)])
+
+
+async def wait_for(event: threading.Event):
+    assert await asyncio.to_thread(event.wait, 5)
+
+
+@pytest.mark.asyncio
+async def test_hibernate_waits_for_send_in_progress(service):
+    gate = FakeConversation.send_gate = threading.Event()
+    conversation = await service.activate(WarmAgent(agent=None))
+    send = asyncio.create_task(service.send_message(create_message("hi"), run=False))
+    await wait_for(conversation.sending)
+    assert not await service.hibernate()
+    gate.set()
+    await send
+    assert conversation.messages and not conversation.closed
+    assert await service.hibernate()
+    assert conversation.closed
+
+
+@pytest.mark.asyncio
+async def test_activate_during_hibernation_wakes_new_conversation(service, monkeypatch):
+    gate = FakeConversation.close_gate = threading.Event()
+    conversation = await service.activate(WarmAgent(agent=None))
+    hibernate = asyncio.create_task(service.hibernate())
+    await wait_for(conversation.closing)
+
+    async def create_agent(spec, mcp_pool):
+        return WarmAgent(agent=None)
+
+    monkeypatch.setattr(event_service_module, "create_agent", create_agent)
+    activate = asyncio.create_task(service.activate())
+    await asyncio.sleep(0.01)
+    assert not activate.done()
+    gate.set()
+    assert await hibernate
+    woken = await activate
+    assert woken is not conversation and not woken.closed
+
+
+@pytest.mark.asyncio
+async def test_viewers_are_tracked(service):
+    async def callback(event):
+        pass
+
+    internal_id = await service.subscribe_to_events(callback)
+    assert not service.has_viewers
+    viewer_id = await service.subscribe_to_events(callback, viewer=True)
+    assert service.has_viewers
+    await service.unsubscribe_from_events(viewer_id)
+    await service.unsubscribe_from_events(internal_id)
+    assert not service.has_viewers
+
+
+@pytest.mark.asyncio
+async def test_status_change_without_event_is_notified(service):
+    statuses = []
+
+    async def callback(status):
+        statuses.append(status)
+
+    await service.activate(WarmAgent(agent=None))
+    await service.subscribe_to_status(callback)
+    await service.run()
+
+    async def wait_for_finished():
+        while AgentExecutionStatus.FINISHED not in statuses:
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(wait_for_finished(), 5)
+    assert statuses[-1] == AgentExecutionStatus.FINISHED
+
+
+@pytest.mark.asyncio
+async def test_close_cancels_mail_in_flight(service):
+    gate = FakeConversation.send_gate = threading.Event()
+    conversation = await service.activate(WarmAgent(agent=None))
+    send = asyncio.create_task(service.send_message(create_message("hi"), run=False))
+    await wait_for(conversation.sending)
+    await service.close()
+    gate.set()
+    with pytest.raises(asyncio.CancelledError):
+        await send
+    assert conversation.closed
+    assert not service.is_active
+
+
+@pytest.mark.asyncio
+async def test_close_waits_for_reads_in_progress(service, monkeypatch):
+    gate = threading.Event()
+    reading = threading.Event()
+    find = service._events.find
+
+    def blocking_find(event_id):
+        reading.set()
+        gate.wait(5)
+        return find(event_id)
+
+    monkeypatch.setattr(service._events, "find", blocking_find)
+    await service.activate(WarmAgent(agent=None))
+    get_event = asyncio.create_task(service.get_event("missing"))
+    await wait_for(reading)
+    close = asyncio.create_task(service.close())
+    await asyncio.sleep(0.01)
+    assert not close.done()
+    assert service._file_store is not None
+    gate.set()
+    assert await get_event is None
+    await close
+    assert service._file_store is None
+
+
+@pytest.mark.asyncio
+async def test_pause_without_run_is_notified(service):
+    statuses = []
+
+    async def callback(status):
+        statuses.append(status)
+
+    await service.activate(WarmAgent(agent=None))
+    await service.subscribe_to_status(callback)
+    await service.pause()
+
+    async def wait_for_paused():
+        while AgentExecutionStatus.PAUSED not in statuses:
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(wait_for_paused(), 5)
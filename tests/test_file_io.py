@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+import pytest
+
+from openhands_server.sdk_server.file_io import TRASH_DIR, AsyncFileIO, Trash
+
+
+@pytest.mark.asyncio
+async def test_file_operations(tmp_path):
+    file_io = AsyncFileIO(max_workers=2)
+    path = tmp_path / "a" / "b"
+    await file_io.mkdir(path)
+    await file_io.mkdir(path, exist_ok=True)
+    assert await file_io.read_text(path / "missing.txt") is None
+    (path / "file.txt").write_text("contents")
+    assert await file_io.read_text(path / "file.txt") == "contents"
+    assert await file_io.unlink(path / "file.txt")
+    assert not await file_io.unlink(path / "file.txt")
+    file_io.close()
+
+
+@pytest.mark.asyncio
+async def test_queue_depth_counts_operations_waiting_for_a_thread():
+    file_io = AsyncFileIO(max_workers=1)
+    gate = threading.Event()
+    operations = [asyncio.create_task(file_io.run(gate.wait, 5)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    assert file_io.get_queue_depth() == 2
+    gate.set()
+    await asyncio.gather(*operations)
+    assert file_io.get_queue_depth() == 0
+    file_io.close()
+
+
+@pytest.mark.asyncio
+async def test_trash_removes_directories_in_the_background(tmp_path):
+    file_io = AsyncFileIO()
+    directory = tmp_path / "conversation"
+    (directory / "events").mkdir(parents=True)
+    (directory / "events" / "event.json").write_text("{}")
+    async with Trash([tmp_path], file_io) as trash:
+        assert await trash.move(directory)
+        # Gone from its original location as soon as it is moved
+        assert not directory.exists()
+        assert not await trash.move(directory)
+        await trash.join()
+        assert trash.get_pending_count() == 0
+    assert list((tmp_path / TRASH_DIR).iterdir()) == []
+    file_io.close()
+
+
+@pytest.mark.asyncio
+async def test_trash_left_from_previous_run_is_reaped(tmp_path):
+    file_io = AsyncFileIO()
+    left = tmp_path / TRASH_DIR / "conversation.1234"
+    (left / "events").mkdir(parents=True)
+    async with Trash([tmp_path, tmp_path / "missing"], file_io) as trash:
+        await trash.join()
+    assert not left.exists()
+    file_io.close()
+
+
+@pytest.mark.asyncio
+async def test_trash_leftovers_kept_unless_reaped(tmp_path):
+    file_io = AsyncFileIO()
+    left = tmp_path / TRASH_DIR / "conversation.1234"
+    left.mkdir(parents=True)
+    async with Trash([tmp_path], file_io, reap_leftovers=False) as trash:
+        directory = tmp_path / "conversation"
+        directory.mkdir()
+        assert await trash.move(directory)
+        await trash.join()
+    # Only what was trashed by this process was reaped
+    assert list((tmp_path / TRASH_DIR).iterdir()) == [left]
+    file_io.close()
@@ -0,0 +1,41 @@
+from collections import Counter
+from uuid import uuid4
+
+import pytest
+
+from openhands_server.sdk_server.hash_ring import HashRing
+
+
+NODES = [f"http://node{i}" for i in range(4)]
+
+
+def test_ring_spreads_conversations_over_nodes():
+    ring = HashRing(NODES)
+    counts = Counter(ring.get_node(uuid4()) for _ in range(4000))
+    assert set(counts) == set(NODES)
+    assert min(counts.values()) > 500
+
+
+def test_adding_a_node_moves_few_conversations():
+    ids = [uuid4() for _ in range(4000)]
+    before = HashRing(NODES)
+    after = HashRing(NODES + ["http://node4"])
+    moved = [id for id in ids if before.get_node(id) != after.get_node(id)]
+    assert len(moved) < len(ids) / 3
+    # Moved conversations all go to the new node, and the old owner is next
+    for id in moved:
+        assert after.get_preference_list(id, 2) == [
+            "http://node4",
+            before.get_node(id),
+        ]
+
+
+def test_preference_list_is_distinct_and_bounded():
+    ring = HashRing(NODES)
+    nodes = ring.get_preference_list(uuid4(), 10)
+    assert sorted(nodes) == sorted(NODES)
+
+
+def test_empty_ring():
+    with pytest.raises(ValueError):
+        HashRing([]).get_node(uuid4())
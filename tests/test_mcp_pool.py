@@ -0,0 +1,69 @@
+import pytest
+
+from openhands_server.sdk_server.mcp_pool import MCPPool, get_shared_tools
+
+
+CONFIG = {"mcpServers": {"fetch": {"command": "uvx", "args": ["mcp-server-fetch"]}}}
+
+
+def get_client(tools):
+    return tools[0].executor.client
+
+
+@pytest.mark.asyncio
+async def test_identical_configs_share_tools():
+    pool = MCPPool()
+    tools = await pool.acquire(CONFIG)
+    reordered = {
+        "mcpServers": {"fetch": {"args": ["mcp-server-fetch"], "command": "uvx"}}
+    }
+    assert await pool.acquire(reordered) is tools
+    assert pool.get_size() == 1
+    await pool.release(tools)
+    await pool.release(tools)
+    await pool.close()
+    assert get_client(tools).closes == 1
+
+
+@pytest.mark.asyncio
+async def test_unhealthy_entry_replaced():
+    pool = MCPPool()
+    tools = await pool.acquire(CONFIG)
+    get_client(tools).connected = False
+    replacement = await pool.acquire(CONFIG)
+    assert replacement is not tools
+    # The old tools are closed once released by the conversation using them
+    assert get_client(tools).closes == 0
+    await pool.release(tools)
+    assert get_client(tools).closes == 1
+    await pool.release(replacement)
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_idle_entries_evicted():
+    pool = MCPPool(idle_ttl=0)
+    tools = await pool.acquire(CONFIG)
+    assert await pool.evict_idle() == 0
+    await pool.release(tools)
+    assert await pool.evict_idle() == 1
+    assert get_client(tools).closes == 1
+
+
+@pytest.mark.asyncio
+async def test_shared_tools_do_not_close_pooled_client():
+    pool = MCPPool()
+    tools = await pool.acquire(CONFIG)
+    shared = get_shared_tools(tools)
+    # As done when the conversation using them is closed
+    for tool in shared:
+        tool.executor.close()
+    assert get_client(tools).closes == 0
+    assert get_client(shared) is get_client(tools)
+    await pool.release(tools)
+    await pool.close()
+
+
+def test_shared_tools_reject_other_tools():
+    with pytest.raises(TypeError):
+        get_shared_tools([object()])
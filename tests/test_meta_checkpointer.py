@@ -0,0 +1,82 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from openhands.sdk import LLM
+from openhands.sdk.conversation.state import AgentExecutionStatus
+from openhands_server.sdk_server.meta_checkpointer import MetaCheckpointer
+from openhands_server.sdk_server.models import StoredConversation
+
+
+class FakeEventService:
+    def __init__(self, fail_status: bool = False):
+        self.stored = StoredConversation(id=uuid4(), llm=LLM(model="test-model"))
+        self.fail_status = fail_status
+
+    async def get_status(self):
+        if self.fail_status:
+            raise RuntimeError("status_unavailable")
+        return AgentExecutionStatus.IDLE
+
+
+class FakeConversationStore:
+    def __init__(self):
+        self.saves: list[list] = []
+        self.fail = False
+
+    async def save_all(self, items):
+        if self.fail:
+            raise OSError("disk_full")
+        self.saves.append([stored.id for stored, _ in items])
+
+
+@pytest.mark.asyncio
+async def test_dirty_conversations_saved_together():
+    store = FakeConversationStore()
+    checkpointer = MetaCheckpointer(store, debounce=0.01)  # type: ignore
+    services = [FakeEventService() for _ in range(3)]
+    async with checkpointer:
+        for service in services:
+            checkpointer.mark_dirty(service)  # type: ignore
+            checkpointer.mark_dirty(service)  # type: ignore
+        await asyncio.sleep(0.1)
+    assert store.saves == [[service.stored.id for service in services]]
+    assert checkpointer.get_dirty_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_save_kept_dirty():
+    store = FakeConversationStore()
+    store.fail = True
+    checkpointer = MetaCheckpointer(store)  # type: ignore
+    checkpointer.mark_dirty(FakeEventService())  # type: ignore
+    with pytest.raises(OSError):
+        await checkpointer.flush()
+    assert checkpointer.get_dirty_count() == 1
+    store.fail = False
+    await checkpointer.flush()
+    assert len(store.saves) == 1 and checkpointer.get_dirty_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_status_kept_dirty():
+    store = FakeConversationStore()
+    checkpointer = MetaCheckpointer(store)  # type: ignore
+    service = FakeEventService(fail_status=True)
+    checkpointer.mark_dirty(service)  # type: ignore
+    checkpointer.mark_dirty(FakeEventService())  # type: ignore
+    with pytest.raises(RuntimeError):
+        await checkpointer.flush()
+    assert checkpointer.get_dirty_count() == 2
+
+
+@pytest.mark.asyncio
+async def test_discarded_conversation_not_saved():
+    store = FakeConversationStore()
+    checkpointer = MetaCheckpointer(store)  # type: ignore
+    service = FakeEventService()
+    checkpointer.mark_dirty(service)  # type: ignore
+    await checkpointer.discard(service.stored.id)
+    await checkpointer.flush()
+    assert store.saves == []
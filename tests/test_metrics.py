@@ -0,0 +1,106 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from openhands_server.sdk_server.metrics import (
+    HTTP_REQUEST_DURATION,
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+    _Metric,
+    merge_expositions,
+)
+from openhands_server.sdk_server.middleware import (
+    MetricsMiddleware,
+    ValidateSessionAPIKeyMiddleware,
+)
+
+
+def test_render_exposition():
+    registry = Registry()
+    requests = Counter("requests_total", "Requests\nserved", registry=registry)
+    requests.inc()
+    requests.inc(2)
+    active = Gauge("active", "Active", ("pool",), registry=registry)
+    active.labels('a"b').set(1.5)
+    active.labels("c").set_function(lambda: 4)
+    latency = Histogram("latency", "Latency", buckets=(1, 0.5), registry=registry)
+    latency.observe(0.25)
+    latency.observe(2)
+    assert registry.render() == "\n".join(
+        [
+            "# HELP requests_total Requests\\nserved",
+            "# TYPE requests_total counter",
+            "requests_total 3",
+            "# HELP active Active",
+            "# TYPE active gauge",
+            'active{pool="a\\"b"} 1.5',
+            'active{pool="c"} 4',
+            "# HELP latency Latency",
+            "# TYPE latency histogram",
+            'latency_bucket{le="0.5"} 1',
+            'latency_bucket{le="1"} 1',
+            'latency_bucket{le="+Inf"} 2',
+            "latency_sum 2.25",
+            "latency_count 2",
+            "",
+        ]
+    )
+
+
+def test_invalid_metrics_rejected():
+    registry = Registry()
+    gauge = Gauge("gauge", "Gauge", ("pool",), registry=registry)
+    with pytest.raises(ValueError, match="invalid_labels"):
+        gauge.labels()
+    with pytest.raises(ValueError, match="duplicate_metric:gauge"):
+        Gauge("gauge", "Gauge", registry=registry)
+    with pytest.raises(TypeError):
+        _Metric("metric", "Metric", registry=registry)
+
+
+def test_merge_expositions():
+    expositions = {}
+    for worker in ("0", "1"):
+        registry = Registry()
+        Counter("requests_total", "Requests", registry=registry).inc()
+        Gauge("active", "Active", ("pool",), registry=registry).labels("a").set(1)
+        expositions[worker] = registry.render()
+    assert merge_expositions(expositions, "worker") == "\n".join(
+        [
+            "# HELP requests_total Requests",
+            "# TYPE requests_total counter",
+            'requests_total{worker="0"} 1',
+            'requests_total{worker="1"} 1',
+            "# HELP active Active",
+            "# TYPE active gauge",
+            'active{worker="0",pool="a"} 1',
+            'active{worker="1",pool="a"} 1',
+            "",
+        ]
+    )
+
+
+@pytest.mark.asyncio
+async def test_rejected_requests_recorded():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str):
+        return item_id
+
+    # As in the api, metrics are added last so they are the outermost
+    app.add_middleware(ValidateSessionAPIKeyMiddleware, "key")
+    app.add_middleware(MetricsMiddleware)
+    rejected = HTTP_REQUEST_DURATION.labels("GET", "unmatched", "401")
+    served = HTTP_REQUEST_DURATION.labels("GET", "/items/{item_id}", "200")
+    num_rejected = sum(rejected.counts)
+    num_served = sum(served.counts)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.get("/items/1")).status_code == 401
+        response = await client.get("/items/1", headers={"X-Session-API-Key": "key"})
+        assert response.status_code == 200
+    assert sum(rejected.counts) == num_rejected + 1
+    assert sum(served.counts) == num_served + 1
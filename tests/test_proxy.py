@@ -0,0 +1,151 @@
+import sys
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+
+from openhands.sdk import LLM
+from openhands_server.sdk_server.__main__ import main
+from openhands_server.sdk_server.config import Config
+from openhands_server.sdk_server.conversation_index import decode_page_id
+from openhands_server.sdk_server.conversation_service import (
+    create_sqlite_store,
+    prepare_storage,
+)
+from openhands_server.sdk_server.conversation_store import FileConversationStore
+from openhands_server.sdk_server.file_io import AsyncFileIO
+from openhands_server.sdk_server.models import (
+    ConversationSortOrder,
+    StoredConversation,
+)
+from openhands_server.sdk_server.proxy import (
+    fan_out,
+    merge_conversation_pages,
+    proxy_request,
+)
+
+
+def create_items(count: int, start: datetime) -> list[dict]:
+    return [
+        {"id": uuid4().hex, "created_at": (start + timedelta(seconds=i)).isoformat()}
+        for i in range(count)
+    ]
+
+
+def test_merge_conversation_pages():
+    start = datetime(2025, 1, 1, tzinfo=UTC)
+    items = create_items(6, start)
+    pages = [
+        {"items": items[0::2], "next_page_id": None},
+        {"items": items[1::2], "next_page_id": None},
+    ]
+    merged = merge_conversation_pages(pages, ConversationSortOrder.CREATED_AT, 4)
+    assert merged["items"] == items[:4]
+    # The next page starts at the first item not included from any shard
+    created_at, conversation_id = decode_page_id(merged["next_page_id"])
+    assert created_at.isoformat() == items[4]["created_at"]
+    assert conversation_id.hex == items[4]["id"]
+
+    merged = merge_conversation_pages(pages, ConversationSortOrder.CREATED_AT_DESC, 6)
+    assert merged == {"items": items[::-1], "next_page_id": None}
+
+
+@pytest.mark.asyncio
+async def test_fan_out_gives_unreachable_servers_503():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=True)
+
+    def unreachable(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("unreachable", request=request)
+
+    clients = [
+        httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://a"),
+        httpx.AsyncClient(
+            transport=httpx.MockTransport(unreachable), base_url="http://b"
+        ),
+    ]
+    responses = await fan_out(clients, "GET", "/ready")
+    assert [response.status_code for response in responses] == [200, 503]
+
+
+@pytest.mark.asyncio
+async def test_proxy_request_forwards_request_and_streams_response():
+    received = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        received.append(request)
+        return httpx.Response(
+            201, headers={"x-upstream": "yes"}, stream=httpx.ByteStream(b"created")
+        )
+
+    upstream = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), base_url="http://worker"
+    )
+    app = FastAPI()
+
+    @app.post("/conversations/")
+    async def start_conversation(request: Request):
+        return await proxy_request(request, upstream)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post(
+            "/conversations/?a=1", content=b"body", headers={"x-custom": "value"}
+        )
+    assert response.status_code == 201
+    assert response.content == b"created"
+    assert response.headers["x-upstream"] == "yes"
+    (request,) = received
+    assert request.url.path == "/conversations/"
+    assert request.url.params["a"] == "1"
+    assert request.content == b"body"
+    assert request.headers["x-custom"] == "value"
+    # Hop by hop headers are not forwarded
+    assert request.headers["host"] == "worker"
+
+
+@pytest.mark.asyncio
+async def test_proxy_request_gives_503_when_unreachable():
+    def unreachable(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("unreachable", request=request)
+
+    upstream = httpx.AsyncClient(
+        transport=httpx.MockTransport(unreachable), base_url="http://worker"
+    )
+    app = FastAPI()
+
+    @app.get("/conversations/{conversation_id}")
+    async def get_conversation(request: Request, conversation_id: str):
+        return await proxy_request(request, upstream)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get(f"/conversations/{uuid4().hex}")
+    assert response.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_storage_prepared_once_for_workers(tmp_path):
+    config = Config(
+        conversations_path=tmp_path / "conversations",
+        workspace_path=tmp_path / "workspace",
+        metadata_store="sqlite",
+    )
+    stored = StoredConversation(id=uuid4(), llm=LLM(model="test-model"))
+    await FileConversationStore(config.conversations_path).save(stored)
+    file_io = AsyncFileIO()
+    await prepare_storage(config, file_io)
+    worker_config = config.model_copy(update={"prepare_storage": False})
+    store = create_sqlite_store(worker_config, file_io)
+    assert not store.migrate and store.import_path is None
+    async with store:
+        assert [item.id async for item, _ in store.iter_all()] == [stored.id]
+    file_io.close()
+
+
+def test_reload_rejected_with_workers(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["server", "--workers", "2", "--reload"])
+    with pytest.raises(SystemExit):
+        main()
@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from openhands.sdk import Message, MessageEvent, TextContent
+from openhands.sdk.event import Event
+from openhands_server.sdk_server.models import OverflowPolicy
+from openhands_server.sdk_server.pub_sub import PubSub
+
+
+class ConversationStateUpdateEvent(MessageEvent):
+    """Stands in for a snapshot of state, which supersedes earlier ones"""
+
+
+def create_event(text: str, event_type: type[MessageEvent] = MessageEvent) -> Event:
+    return event_type(
+        source="user",
+        llm_message=Message(role="user", content=[TextContent(text=text)]),
+    )
+
+
+class Recorder:
+    """Callback recording the events delivered to it, which blocks until the
+    gate is set"""
+
+    def __init__(self):
+        self.events: list[Event] = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def __call__(self, event: Event):
+        await self.gate.wait()
+        self.events.append(event)
+
+
+async def wait_for_delivery(recorder: Recorder, count: int):
+    async def delivered():
+        while len(recorder.events) < count:
+            await asyncio.sleep(0.001)
+
+    await asyncio.wait_for(delivered(), 5)
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_keeps_newest_events():
+    pub_sub = PubSub()
+    recorder = Recorder()
+    pub_sub.subscribe(recorder, OverflowPolicy.DROP_OLDEST, max_queue_size=2)
+    events = [create_event(str(i)) for i in range(5)]
+    # Publishing does not yield, so nothing is delivered until it is done
+    for event in events:
+        await pub_sub(event)
+    await wait_for_delivery(recorder, 2)
+    assert recorder.events == events[3:]
+    (stats,) = pub_sub.get_stats()
+    assert stats.dropped == 3 and stats.delivered == 2 and stats.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_coalesce_drops_superseded_events_of_the_same_type():
+    pub_sub = PubSub()
+    recorder = Recorder()
+    pub_sub.subscribe(recorder, OverflowPolicy.COALESCE, max_queue_size=3)
+    message = create_event("message")
+    statuses = [create_event(str(i), ConversationStateUpdateEvent) for i in range(4)]
+    for event in [message, *statuses]:
+        await pub_sub(event)
+    await wait_for_delivery(recorder, 3)
+    # The message is kept, and order is preserved
+    assert recorder.events == [message, statuses[0], statuses[3]]
+
+
+@pytest.mark.asyncio
+async def test_disconnect_removes_slow_subscriber():
+    pub_sub = PubSub()
+    slow = Recorder()
+    slow.gate.clear()
+    fast = Recorder()
+    overflowed = asyncio.Event()
+
+    async def on_overflow():
+        overflowed.set()
+
+    pub_sub.subscribe(
+        slow, OverflowPolicy.DISCONNECT, max_queue_size=2, on_overflow=on_overflow
+    )
+    pub_sub.subscribe(fast, max_queue_size=None)
+    events = [create_event(str(i)) for i in range(3)]
+    for event in events:
+        await pub_sub(event)
+    await asyncio.wait_for(overflowed.wait(), 5)
+    assert pub_sub.callback_count == 1
+    # Delivery to other subscribers is not affected
+    await wait_for_delivery(fast, 3)
+    assert fast.events == events
+    assert slow.events == []
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_does_not_delay_others():
+    pub_sub = PubSub()
+    slow = Recorder()
+    slow.gate.clear()
+    fast = Recorder()
+    pub_sub.subscribe(slow)
+    pub_sub.subscribe(fast)
+    event = create_event("hi")
+    await pub_sub(event)
+    await wait_for_delivery(fast, 1)
+    assert slow.events == []
+    slow.gate.set()
+    await wait_for_delivery(slow, 1)
+    pub_sub.clear()
+    assert pub_sub.callback_count == 0
+
+
+@pytest.mark.asyncio
+async def test_coalesce_does_not_merge_distinct_events():
+    pub_sub = PubSub()
+    recorder = Recorder()
+    pub_sub.subscribe(recorder, OverflowPolicy.COALESCE, max_queue_size=3)
+    status = create_event("status", ConversationStateUpdateEvent)
+    messages = [create_event(str(i)) for i in range(3)]
+    for event in [status, *messages]:
+        await pub_sub(event)
+    await wait_for_delivery(recorder, 3)
+    # Messages are not snapshots, so the oldest event is dropped instead
+    assert recorder.events == messages
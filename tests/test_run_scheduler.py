@@ -0,0 +1,32 @@
+import asyncio
+import threading
+from uuid import uuid4
+
+import pytest
+
+from openhands_server.sdk_server.models import RunQueueState
+from openhands_server.sdk_server.run_scheduler import RunScheduler
+
+
+@pytest.mark.asyncio
+async def test_queued_runs_start_by_priority():
+    scheduler = RunScheduler(max_running=1)
+    gate = threading.Event()
+    started = []
+    blocking = scheduler.submit_run(uuid4(), lambda: gate.wait(5))
+    runs = []
+    for priority in (5, 0, 1):
+        conversation_id = uuid4()
+        runs.append(
+            scheduler.submit_run(
+                conversation_id,
+                lambda priority=priority: started.append(priority),
+                priority,
+            )
+        )
+    info = scheduler.get_queue_info(conversation_id)
+    assert info.state == RunQueueState.QUEUED and info.position == 1
+    gate.set()
+    await asyncio.gather(blocking, *runs)
+    assert started == [0, 1, 5]
+    scheduler.shutdown()
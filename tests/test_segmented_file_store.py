@@ -0,0 +1,225 @@
+import os
+import struct
+import threading
+
+import pytest
+
+from openhands.sdk.io import LocalFileStore
+from openhands_server.sdk_server.segmented_file_store import (
+    IMPORTED_DIR,
+    INDEX_FILE,
+    LOG_DIR,
+    SegmentedFileStore,
+)
+
+
+def reopen(store: SegmentedFileStore, **kwargs) -> SegmentedFileStore:
+    store.close()
+    return SegmentedFileStore(str(store.root), **kwargs)
+
+
+def get_segments(tmp_path) -> list:
+    return sorted((tmp_path / LOG_DIR).glob("*.seg"))
+
+
+def test_write_overwrite_delete_reopen(tmp_path):
+    store = SegmentedFileStore(str(tmp_path))
+    for i in range(5):
+        store.write(f"events/{i}.json", f"event {i}")
+    store.write("events/1.json", "replaced")
+    store.delete("events/2.json")
+    store.write("base_state.json", "{}")
+    store = reopen(store)
+    assert store.read("events/0.json") == "event 0"
+    assert store.read("events/1.json") == "replaced"
+    with pytest.raises(FileNotFoundError):
+        store.read("events/2.json")
+    assert store.get_count() == 4
+    # Files outside the log prefixes are regular files
+    assert (tmp_path / "base_state.json").read_text() == "{}"
+    store.delete("events")
+    store = reopen(store)
+    assert store.get_count() == 0
+    store.close()
+
+
+def test_torn_tail_record_truncated(tmp_path):
+    store = SegmentedFileStore(str(tmp_path))
+    for i in range(3):
+        store.write(f"events/{i}.json", f"event {i}")
+    store.close()
+    (segment,) = get_segments(tmp_path)
+    size = segment.stat().st_size
+    with open(segment, "ab") as file:
+        file.write(b"\x10\x00\x00")
+    store = SegmentedFileStore(str(tmp_path))
+    assert [store.read(f"events/{i}.json") for i in range(3)] == [
+        "event 0",
+        "event 1",
+        "event 2",
+    ]
+    assert segment.stat().st_size == size
+    store.close()
+
+
+def test_corrupt_unindexed_tail_record_truncated(tmp_path):
+    store = SegmentedFileStore(str(tmp_path))
+    for i in range(3):
+        store.write(f"events/{i}.json", f"event {i}")
+    store.close()
+    # As if the last record was written but not its index entry, and corrupted
+    index_path = tmp_path / LOG_DIR / INDEX_FILE
+    index = bytearray(index_path.read_bytes())
+    struct.pack_into("<Q", index, 8, 2)
+    index_path.write_bytes(index)
+    (segment,) = get_segments(tmp_path)
+    contents = bytearray(segment.read_bytes())
+    contents[-1] ^= 0xFF
+    segment.write_bytes(contents)
+    store = SegmentedFileStore(str(tmp_path))
+    assert store.get_count() == 2
+    with pytest.raises(FileNotFoundError):
+        store.read("events/2.json")
+    store.write("events/3.json", "event 3")
+    store = reopen(store)
+    assert store.read("events/1.json") == "event 1"
+    assert store.read("events/3.json") == "event 3"
+    store.close()
+
+
+@pytest.mark.parametrize("damage", ["missing", "invalid"])
+def test_index_rebuilt_from_segments(tmp_path, damage):
+    LocalFileStore(str(tmp_path)).write("events/imported.json", "imported")
+    store = SegmentedFileStore(str(tmp_path))
+    store.write("events/imported.json", "newer")
+    store.write("events/0.json", "event 0")
+    store.delete("events/0.json")
+    store.close()
+    index_path = tmp_path / LOG_DIR / INDEX_FILE
+    if damage == "missing":
+        index_path.unlink()
+    else:
+        index_path.write_bytes(b"garbage" * 100)
+    store = SegmentedFileStore(str(tmp_path))
+    # Rebuilt rather than imported again
+    assert store.read("events/imported.json") == "newer"
+    assert store.get_count() == 1
+    store.close()
+
+
+def test_compaction_then_reopen(tmp_path):
+    store = SegmentedFileStore(str(tmp_path), segment_size=1024, compaction_threshold=2)
+    for i in range(50):
+        store.write(f"events/{i % 5}.json", f"event {i}" * 10)
+    store.compaction_threshold = 0.5
+    assert store._get_compactable_segments()
+    assert store.compact() > 0
+    store.compaction_threshold = 2
+    dead_bytes = dict(store._dead_bytes)
+    store = reopen(store, segment_size=1024, compaction_threshold=2)
+    assert [store.read(f"events/{i}.json") for i in range(5)] == [
+        f"event {i}" * 10 for i in range(45, 50)
+    ]
+    # Dead bytes are recounted from the segments, including records dropped
+    # from the index when it was rewritten
+    assert store._dead_bytes == dead_bytes
+    assert store.get_count() == 5
+    store.close()
+
+
+def test_read_not_blocked_by_writes_or_compaction(tmp_path, monkeypatch):
+    store = SegmentedFileStore(str(tmp_path), segment_size=256, compaction_threshold=2)
+    store.write("events/live.json", "live")
+    for i in range(20):
+        store.write("events/0.json", f"event {i}")
+    reading = threading.Event()
+    gate = threading.Event()
+    pread = os.pread
+
+    def blocking_pread(fd: int, length: int, offset: int) -> bytes:
+        if threading.current_thread().name == "reader":
+            reading.set()
+            gate.wait(5)
+        return pread(fd, length, offset)
+
+    monkeypatch.setattr(os, "pread", blocking_pread)
+    results = []
+    reader = threading.Thread(
+        target=lambda: results.append(store.read("events/live.json")), name="reader"
+    )
+    reader.start()
+    assert reading.wait(5)
+    # Writes and compaction of the segment being read go ahead during the read
+    writer = threading.Thread(target=store.write, args=("events/1.json", "event"))
+    writer.start()
+    writer.join(1)
+    assert not writer.is_alive()
+    store.compaction_threshold = 0.5
+    assert store.compact() > 0
+    assert store._retired_fds
+    gate.set()
+    reader.join(5)
+    assert results == ["live"]
+    assert not store._retired_fds and not store._fd_readers
+    assert store.read("events/live.json") == "live"
+    store.close()
+
+
+def test_dead_bytes_survive_reopen(tmp_path):
+    store = SegmentedFileStore(str(tmp_path), segment_size=256)
+    for i in range(20):
+        store.write("events/0.json", f"event {i}")
+    store.compaction_threshold = 2
+    dead_bytes = dict(store._dead_bytes)
+    store._rewrite_index()
+    store = reopen(store, segment_size=256)
+    assert store._dead_bytes == dead_bytes
+    store.close()
+
+
+def test_list_matches_local_file_store(tmp_path):
+    local = LocalFileStore(str(tmp_path / "local"))
+    store = SegmentedFileStore(str(tmp_path / "segmented"))
+    for path in [
+        "events/0.json",
+        "events/1.json",
+        "events/nested/2.json",
+        "base_state.json",
+    ]:
+        local.write(path, "contents")
+        store.write(path, "contents")
+    for path in ["events", "events/", "events/nested", "/events", ""]:
+        assert sorted(store.list(path)) == sorted(local.list(path)), path
+    for file_store in (local, store):
+        with pytest.raises(FileNotFoundError):
+            file_store.list("missing")
+    store.close()
+
+
+def test_import_keeps_source_files(tmp_path):
+    local = LocalFileStore(str(tmp_path))
+    for i in range(3):
+        local.write(f"events/{i}.json", f"event {i}")
+    assert not SegmentedFileStore.is_segmented_store(tmp_path)
+    store = SegmentedFileStore(str(tmp_path))
+    assert [store.read(f"events/{i}.json") for i in range(3)] == [
+        f"event {i}" for i in range(3)
+    ]
+    assert not (tmp_path / "events").exists()
+    imported = tmp_path / LOG_DIR / IMPORTED_DIR / "events"
+    assert sorted(path.name for path in imported.iterdir()) == [
+        "0.json",
+        "1.json",
+        "2.json",
+    ]
+    assert sorted(store.list("events")) == [f"events/{i}.json" for i in range(3)]
+    assert SegmentedFileStore.is_segmented_store(tmp_path)
+    store.close()
+
+
+def test_fsync(tmp_path):
+    store = SegmentedFileStore(str(tmp_path), fsync=True)
+    store.write("events/0.json", "event 0")
+    store = reopen(store, fsync=True)
+    assert store.read("events/0.json") == "event 0"
+    store.close()
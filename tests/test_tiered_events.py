@@ -0,0 +1,93 @@
+import asyncio
+import threading
+
+import pytest
+
+from openhands.sdk import Message, MessageEvent, TextContent
+from openhands.sdk.io import LocalFileStore
+from openhands_server.sdk_server.event_index import EventIndex
+from openhands_server.sdk_server.tiered_events import EVENTS_DIR, TieredEvents
+
+
+class BlockingListFileStore(LocalFileStore):
+    """Blocks listing until the gate is set, so events may be published while a
+    load is in progress"""
+
+    def __init__(self, root: str):
+        super().__init__(root)
+        self.listing = threading.Event()
+        self.gate = threading.Event()
+
+    def list(self, path: str) -> list[str]:
+        names = super().list(path)
+        self.listing.set()
+        assert self.gate.wait(5)
+        return names
+
+
+def create_event(text: str) -> MessageEvent:
+    return MessageEvent(
+        source="user",
+        llm_message=Message(role="user", content=[TextContent(text=text)]),
+    )
+
+
+def persist(file_store: LocalFileStore, position: int, event: MessageEvent):
+    name = f"{EVENTS_DIR}/event-{position:05d}-{event.id}.json"
+    file_store.write(name, event.model_dump_json())
+
+
+@pytest.mark.asyncio
+async def test_events_beyond_hot_tail_read_from_disk(tmp_path):
+    file_store = LocalFileStore(str(tmp_path))
+    persisted = [create_event(str(i)) for i in range(10)]
+    for position, event in enumerate(persisted):
+        persist(file_store, position, event)
+    events = TieredEvents(lambda: file_store, EventIndex(), hot_size=4, cache_size=2)
+    assert [event.id for event in events] == [event.id for event in persisted]
+    assert events.get_resident_count() <= 2
+
+    published = create_event("published")
+    persist(file_store, 10, published)
+    await events(published)
+    assert events[-1] is published
+    assert events.find(persisted[3].id).id == persisted[3].id
+    # Kinds are read without being cached
+    cached = events.get_resident_count()
+    assert events.get_kind(0) == type(events[0]).__name__
+    assert events.get_resident_count() == cached
+
+
+@pytest.mark.asyncio
+async def test_publish_does_not_wait_for_load(tmp_path):
+    file_store = BlockingListFileStore(str(tmp_path))
+    listed = create_event("listed")
+    persist(file_store, 0, listed)
+    index = EventIndex()
+    events = TieredEvents(lambda: file_store, index)
+    load = asyncio.create_task(asyncio.to_thread(events.load))
+    assert await asyncio.to_thread(file_store.listing.wait, 5)
+
+    # Persisted after the listing, and published while the load is in progress
+    published = create_event("published")
+    persist(file_store, 1, published)
+    await asyncio.wait_for(events(published), 1)
+    # Persisted before the listing, but published while the load is in progress
+    await asyncio.wait_for(events(listed), 1)
+    assert not load.done()
+
+    file_store.gate.set()
+    await load
+    assert [event.id for event in events] == [listed.id, published.id]
+    assert events[1] is published
+    assert index.get_position(published.id) == 1
+
+
+@pytest.mark.asyncio
+async def test_publish_before_load_is_picked_up_by_load(tmp_path):
+    file_store = LocalFileStore(str(tmp_path))
+    events = TieredEvents(lambda: file_store, EventIndex())
+    event = create_event("hi")
+    persist(file_store, 0, event)
+    await events(event)
+    assert [item.id for item in events] == [event.id]